@@ -1,6 +1,17 @@
+import argparse
+
 import pandas as pd
 import numpy as np
 
+from experiment_spec import load_spec
+
+parser = argparse.ArgumentParser(description="Explain the two accuracy measures used in the analyses.")
+parser.add_argument('--spec', metavar='JSON',
+                    help="experiment spec whose strategies and models to report (default: experiment_spec.json if present)")
+args = parser.parse_args()
+spec = load_spec(args.spec)
+spec.install()  # in effect until the script exits
+
 # Load the data
 df = pd.read_csv('TutoringExperiment_evaluation_20250719.csv')
 
@@ -17,8 +28,8 @@ print("Logic: Higher-rated responses indicate better tutoring regardless of")
 print("       whether the student's original answer was correct or incorrect")
 
 # Demonstrate rating-based approach
-models = ['claude_haiku', 'gpt4o_mini', 'phi3_mini']
-approaches = ['zero_shot', 'few_shot', 'cot']
+models = sorted(spec.model_keys())
+approaches = spec.strategy_names()
 
 print("\nExample calculation for Few-shot GPT-4o Mini:")
 rating_col = "few_shot_gpt4o_mini_rating"
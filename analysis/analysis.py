@@ -1,16 +1,79 @@
+import argparse
+
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 
-# Load the data
-df = pd.read_csv('TutoringExperiment_evaluation_20250719.csv')
+from experiment_spec import load_spec
+from blob_store import offset_columns, read_results, text_columns
+from pricing import DEFAULT_SCENARIO, PRICING, apply_pricing
+from rater_agreement import apply_consensus, consensus, load_store
+from near_duplicates import dedup_aware_ratings, dedup_cells_for
+from pairwise_ranking import rank
+from pareto import ALL_SUBJECTS, combination_metrics
+from response_features import parse_failure_rates, ratings_long
+from run_registry import REGISTRY_PATH, blobs_for, resolve_output
+import profiling
+from profiling import stage
+
+parser = argparse.ArgumentParser(description="Summarise tutoring model performance.")
+parser.add_argument('--pricing', metavar='SCENARIO',
+                    help=f"recompute costs under a pricing scenario ({', '.join(sorted(PRICING))})")
+parser.add_argument('--pricing-file', help="JSON file with extra pricing scenarios")
+parser.add_argument('--run', metavar='RUN_ID',
+                    help="analyse a registered run's evaluation file ('latest' for the newest rated run)")
+parser.add_argument('--registry', default=REGISTRY_PATH, help="run registry for --run")
+parser.add_argument('--blobs', help="blob file holding the text of an offset-only evaluation CSV (default: the registered run's)")
+parser.add_argument('--ratings', metavar='RATINGS_CSV',
+                    help="use consensus ratings from a multi-rater store (see rater_agreement.py)")
+parser.add_argument('--debias', action='store_true', help="with --ratings, remove each rater's bias first")
+parser.add_argument('--spec', metavar='JSON',
+                    help="experiment spec whose strategies and models to report (default: experiment_spec.json if present)")
+parser.add_argument('--dedup', action='store_true',
+                    help="also report mean ratings with near-duplicate responses counted once")
+profiling.add_arguments(parser)
+args = parser.parse_args()
+profiling.start_from_args(args)
+spec = load_spec(args.spec)
+spec.install()  # in effect until the script exits
+evaluation_csv = (resolve_output(args.run, 'evaluation', args.registry) if args.run
+                  else 'TutoringExperiment_evaluation_20250719.csv')
+blob_path = args.blobs or blobs_for(evaluation_csv, args.registry)
+
+# Load the data, decoding only the text that is read below: --dedup
+# clusters responses, token counts missing from the file are estimated from
+# responses (--pricing, Pareto set) and the parse-failure report tells
+# answers from API errors by their text. The last two are skipped rather
+# than fail when that text is offloaded and no blob file is known.
+stage('load')
+header = pd.read_csv(evaluation_csv, nrows=0).columns
+offloaded = offset_columns(header)
+texts = [column for column, *_ in text_columns(header)] + offloaded
+untokenized = {column for column in texts if column.endswith('_response')
+               and f"{column[:-len('_response')]}_input_tokens" not in header}
+parsed = {f"{column[:-len('_parse_error')]}_response" for column in header if column.endswith('_parse_error')}
+unreadable = set() if blob_path else (untokenized | parsed) & set(offloaded)
+needed = (untokenized | parsed) - unreadable
+if args.pricing:
+    needed.update(untokenized)
+if args.dedup:
+    needed.update(column for column in texts if column.endswith(('_response', '_final')))
+df = read_results(evaluation_csv, blob_path, [column for column in texts if column in needed])
 print(f"Loaded {len(df)} test cases")
+if args.pricing:
+    df = apply_pricing(df, args.pricing, args.pricing_file)
+if args.ratings:
+    agreed = consensus(load_store(args.ratings), debias=args.debias)
+    df = apply_consensus(df, agreed)
+    print(f"🤝 Consensus ratings for {len(agreed)} cells from {args.ratings} "
+          f"(mean {agreed['n_raters'].mean():.1f} raters per cell)")
 print(f"\nColumns: {list(df.columns)}")
 
 # Extract performance data
-models = ['claude_haiku', 'gpt4o_mini', 'phi3_mini']
-approaches = ['zero_shot', 'few_shot', 'cot']
+stage('performance_summary')
+models = sorted(spec.model_keys())
+approaches = spec.strategy_names()
 
 performance_data = []
 
@@ -37,6 +100,12 @@ for approach in approaches:
 
 perf_df = pd.DataFrame(performance_data)
 
+if args.dedup:
+    stage('dedup_ratings')
+    dedup = dedup_aware_ratings(dedup_cells_for(df), ratings_long(df))
+    dedup = dedup.rename(columns={'experiment': 'approach'})[['approach', 'model', 'dedup_mean_rating', 'effective_n']]
+    perf_df = perf_df.merge(dedup, on=['approach', 'model'], how='left')
+
 print("\n" + "="*80)
 print("TUTORING MODEL EVALUATION SUMMARY")
 print("="*80)
@@ -55,6 +124,14 @@ best = perf_df.nlargest(3, 'mean_rating')[['model', 'approach', 'mean_rating', '
 for idx, row in best.iterrows():
     print(f"{row['approach']} + {row['model']}: Rating {row['mean_rating']:.2f}, Cost ${row['mean_cost']:.4f}")
 
+print(f"\n🥊 PAIRED RANKING (Bradley–Terry on shared dialogues, 95% CI)")
+stage('pairwise_ranking')
+ranking, _ = rank(df, n_bootstrap=500)
+for idx, row in ranking.iterrows():
+    print(f"{row['approach']} + {row['model']}: Elo {row['elo']:.0f} [{row['elo_low']:.0f}, {row['elo_high']:.0f}], "
+          f"win rate {row['win_rate']:.2f}")
+
+stage('cost_analysis')
 print(f"\n💰 COST ANALYSIS")
 total_cost = perf_df['total_cost'].sum()
 print(f"Total cost: ${total_cost:.4f}")
@@ -67,6 +144,32 @@ efficient = perf_df.nlargest(3, 'cost_effectiveness')[['model', 'approach', 'mea
 for idx, row in efficient.iterrows():
     print(f"{row['approach']} + {row['model']}: Rating {row['mean_rating']:.2f}, Cost ${row['mean_cost']:.4f}, Effectiveness {row['cost_effectiveness']:.1f}")
 
+# Cost effectiveness ignores latency and favours the cheapest model, so also
+# list the combinations no other beats on rating, cost and p95 latency at once
+stage('pareto')
+print(f"\n⚖️  PARETO SET (rating / cost / p95 latency)")
+if untokenized & unreadable:
+    print("ℹ️  Skipped: token counts must be estimated from offloaded responses (pass --blobs)")
+else:
+    pareto = combination_metrics(df, [args.pricing or DEFAULT_SCENARIO])
+    if pareto.attrs['estimated_latency']:
+        print("ℹ️  Latency estimated from output tokens (no _latency columns in this file)")
+    front = pareto[(pareto['subject'] == ALL_SUBJECTS) & pareto['pareto']].sort_values('cost_per_1k_sessions')
+    for idx, row in front.iterrows():
+        print(f"{row['approach']} + {row['model']}: Rating {row['mean_rating']:.2f}, "
+              f"${row['cost_per_1k_sessions']:.3f} per 1k sessions, p95 latency {row['p95_latency']:.1f}s")
+
+parse_failures = parse_failure_rates(df)
+if parsed & unreadable:
+    print(f"\nℹ️  Parse failures not reported: responses are offloaded (pass --blobs)")
+elif len(parse_failures):
+    stage('parse_failures')
+    print(f"\n🧩 PARSE FAILURES (CoT / structured output)")
+    for idx, row in parse_failures.iterrows():
+        print(f"{row['experiment']} + {row['model']}: {row['failures']}/{row['responses']} "
+              f"({row['failure_rate']:.0%}){' - ' + row['reasons'] if row['reasons'] else ''}")
+
+stage('subject_analysis')
 print(f"\n📚 SUBJECT ANALYSIS")
 subject_perf = []
 for subject in df['math_level'].unique():
@@ -93,5 +196,6 @@ for idx, row in subject_df.iterrows():
     print(f"{row['subject']}: {row['avg_rating']:.2f} ({row['n_cases']} cases)")
 
 # Save results
+stage('save')
 perf_df.to_csv('performance_summary.csv', index=False)
 print(f"\n✅ Analysis complete! Saved performance_summary.csv")
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmarks on synthetic data at multiples of the sample size.
+
+Each stage (conversation formatting, prompt building, CoT parsing, export,
+loading and the analysis aggregations) is timed against the dialogues and
+tables from ``synthetic_data.py``; missing scales are generated on first use
+and reused afterwards. Results are written as JSON and compared with a stored
+baseline: a stage is flagged when it is more than ``--tolerance`` slower and
+the difference exceeds ``--min-delta`` seconds. The exit status is 1 when
+anything regressed, so the suite can gate CI.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from near_duplicates import find_near_duplicates
+from pairwise_ranking import rank
+from pareto import best_under, combination_metrics
+from pricing import PRICING, scenario_costs
+from response_features import extract_features, long_responses, ratings_long
+from run_registry import git_revision
+from result_records import ResultTable
+from synthetic_data import SyntheticCorpus, generate
+
+
+class Workload:
+    """Synthetic files for one scale, loaded lazily and shared by stages."""
+
+    def __init__(self, paths):
+        self.paths = paths
+        self._cache = {}
+
+    def _get(self, name, load):
+        if name not in self._cache:
+            self._cache[name] = load()
+        return self._cache[name]
+
+    def _load_dialogues(self):
+        with open(self.paths['dialogues']) as f:
+            return json.load(f)
+
+    @property
+    def dialogues(self):
+        return self._get('dialogues', self._load_dialogues)
+
+    @property
+    def results(self):
+        return self._get('results', lambda: pd.read_csv(self.paths['results']))
+
+    @property
+    def evaluation(self):
+        return self._get('evaluation', lambda: pd.read_csv(self.paths['evaluation']))
+
+    @property
+    def cells(self):
+        return self._get('cells', lambda: long_responses(self.evaluation))
+
+    @property
+    def table(self):
+        from run_experiment import MODELS, PROMPT_TEMPLATES
+        return self._get('table', lambda: ResultTable.from_csv(self.paths['results'], PROMPT_TEMPLATES, MODELS))
+
+
+def _runner():
+    from run_experiment import ExperimentRunner
+    return ExperimentRunner()
+
+
+def stage_load_dialogues(work):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return len(_runner().load_dialogues(work.paths['dialogues']))
+
+
+def stage_format_conversation(work):
+    runner = _runner()
+    for dialogue in work.dialogues:
+        runner.format_conversation(dialogue)
+    return len(work.dialogues)
+
+
+def stage_create_prompts(work):
+    runner = _runner()
+    for dialogue in work.dialogues:
+        conversation = runner.get_conversation(dialogue)
+        runner.create_zero_shot_prompt(conversation)
+        runner.create_few_shot_prompt(conversation)
+        runner.create_cot_prompt(conversation)
+    return 3 * len(work.dialogues)
+
+
+def stage_parse_cot_response(work):
+    runner = _runner()
+    responses = [(text, column[len('cot_'):-len('_response')]) for column in work.results.columns
+                 if column.startswith('cot_') and column.endswith('_response')
+                 for text in work.results[column].dropna()]
+    for text, model_key in responses:
+        runner.parse_cot_response(text, model_key)
+    return len(responses)
+
+
+def stage_export_results(work):
+    table = work.table
+    runner = _runner()
+    with tempfile.TemporaryDirectory() as directory:
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                runner.export_results(table)
+        finally:
+            os.chdir(cwd)
+    return len(table)
+
+
+def stage_read_evaluation(work):
+    return len(pd.read_csv(work.paths['evaluation']))
+
+
+def stage_rating_summary(work):
+    ratings = ratings_long(work.evaluation)
+    ratings.groupby(['experiment', 'model'])['rating'].agg(['mean', 'median', 'std', 'count'])
+    return len(ratings)
+
+
+def stage_scenario_costs(work):
+    scenario_costs(work.evaluation, list(PRICING))
+    return len(work.evaluation)
+
+
+def stage_response_features(work):
+    return len(extract_features(work.cells))
+
+
+def stage_pairwise_ranking(work):
+    rank(work.evaluation, n_bootstrap=200)
+    return len(work.evaluation)
+
+
+def stage_pareto(work):
+    metrics = combination_metrics(work.evaluation, list(PRICING))
+    best_under(metrics, np.geomspace(0.01, 10, 20), np.linspace(1, 30, 20))
+    return len(work.evaluation)
+
+
+def stage_near_duplicates(work):
+    return len(find_near_duplicates(work.cells))
+
+
+STAGES = {
+    'load_dialogues': stage_load_dialogues,
+    'format_conversation': stage_format_conversation,
+    'create_prompts': stage_create_prompts,
+    'parse_cot_response': stage_parse_cot_response,
+    'export_results': stage_export_results,
+    'read_evaluation': stage_read_evaluation,
+    'rating_summary': stage_rating_summary,
+    'scenario_costs': stage_scenario_costs,
+    'response_features': stage_response_features,
+    'pairwise_ranking': stage_pairwise_ranking,
+    'pareto': stage_pareto,
+    'near_duplicates': stage_near_duplicates
+}
+
+
+def time_stage(stage, work, repeat=3, budget=5.0):
+    """Best and median wall time over up to ``repeat`` runs (one if slow)."""
+    timings = []
+    items = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        items = stage(work)
+        timings.append(time.perf_counter() - started)
+        if sum(timings) > budget:
+            break
+    best = min(timings)
+    return {'seconds': best, 'median_seconds': statistics.median(timings), 'runs': len(timings),
+            'items': items, 'per_item_us': best / max(items, 1) * 1e6}
+
+
+def compare(results, baseline, tolerance=0.25, min_delta=0.01):
+    """Rows of (stage, scale, seconds, baseline seconds, ratio, regressed)."""
+    rows = []
+    for stage, scales in results['results'].items():
+        for scale, current in scales.items():
+            previous = baseline.get('results', {}).get(stage, {}).get(scale)
+            if previous is None:
+                continue
+            ratio = current['seconds'] / max(previous['seconds'], 1e-9)
+            regressed = ratio > 1 + tolerance and current['seconds'] - previous['seconds'] > min_delta
+            rows.append((stage, scale, current['seconds'], previous['seconds'], ratio, regressed))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline on synthetic data.")
+    parser.add_argument('--scale', type=int, action='append',
+                        help="multiple of the sample size (repeatable; default 10 and 100)")
+    parser.add_argument('--stage', action='append', choices=sorted(STAGES),
+                        help="only run these stages (repeatable)")
+    parser.add_argument('--data-dir', default='synthetic', help="where synthetic files are cached")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', default='benchmark_baseline.json')
+    parser.add_argument('--save-baseline', action='store_true', help="store these results as the baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed slowdown before flagging")
+    parser.add_argument('--min-delta', type=float, default=0.01, help="ignore slowdowns below this many seconds")
+    args = parser.parse_args()
+
+    corpus = None
+    results = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'seed': args.seed,
+        'results': {}
+    }
+    for scale in args.scale or [10, 100]:
+        paths = {kind: os.path.join(args.data_dir, f'{kind}_{scale}x.{"json" if kind == "dialogues" else "csv"}')
+                 for kind in ('dialogues', 'results', 'evaluation')}
+        if not all(os.path.exists(path) for path in paths.values()):
+            corpus = corpus or SyntheticCorpus.from_csv('tutoring_results_20250719_140215.csv',
+                                                        'TutoringExperiment_evaluation_20250719.csv')
+            print(f"🧪 Generating {scale}x synthetic data in {args.data_dir}/")
+            paths = generate(corpus, scale, args.data_dir, args.seed)
+        work = Workload(paths)
+        print(f"\n⏱️  {scale}x")
+        for name in args.stage or STAGES:
+            timing = time_stage(STAGES[name], work, args.repeat)
+            results['results'].setdefault(name, {})[str(scale)] = timing
+            print(f"  {name:<20} {timing['seconds']:9.4f}s  {timing['per_item_us']:10.1f} µs/item  "
+                  f"({timing['items']:,} items)")
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\n✅ Saved {args.output}")
+
+    regressions = 0
+    if not os.path.exists(args.baseline) and not args.save_baseline:
+        print(f"\nℹ️  No baseline at {args.baseline}; record one with --save-baseline")
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"\n📏 Against {args.baseline} (revision {baseline.get('git_revision', '?')})")
+        for stage, scale, seconds, previous, ratio, regressed in compare(results, baseline, args.tolerance,
+                                                                         args.min_delta):
+            regressions += regressed
+            flag = '⚠️  REGRESSION' if regressed else '✅'
+            print(f"  {stage:<20} {scale:>6}x  {previous:8.4f}s → {seconds:8.4f}s  ({ratio:5.2f}x)  {flag}")
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"📌 Baseline saved to {args.baseline}")
+    if regressions:
+        raise SystemExit(f"❌ {regressions} stage(s) regressed beyond {args.tolerance:.0%}")
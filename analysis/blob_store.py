@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Append-only blob store for response, scratchpad and final-answer text.
+
+Text lives in one ``.blob`` file of concatenated UTF-8 strings; results
+tables carry ``{column}_offset`` / ``{column}_length`` integers instead of
+the text itself, so numeric-only analysis never reads response bytes. A
+sidecar ``.idx`` file keeps one line per stored cell keyed by
+(test_id, experiment, model, field) for lookups without the table.
+
+Readers memory-map the blob and decode only the cells they ask for.
+
+A blob can instead hold every cell as its own zstd frame compressed with a
+dictionary trained on earlier responses (``.dict`` sidecar, needs the
+optional ``zstandard`` package). Cells stay independently addressable, and
+readers pick the dictionary up automatically.
+"""
+
+import argparse
+import mmap
+import os
+
+import numpy as np
+import pandas as pd
+
+from experiment_spec import EXPERIMENTS
+
+TEXT_FIELDS = ('response', 'scratchpad', 'final')
+INDEX_COLUMNS = ['test_id', 'experiment', 'model', 'field', 'offset', 'length']
+DICTIONARY_SIZE = 64 * 1024
+COMPRESSION_LEVEL = 9
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("compressed blobs need the zstandard package: pip install zstandard")
+    return zstandard
+
+
+def train_dictionary(texts, size=DICTIONARY_SIZE):
+    """zstd dictionary trained on a sample of response texts."""
+    samples = [str(text).encode('utf-8') for text in texts if isinstance(text, str) and text]
+    return _zstandard().train_dictionary(size, samples, level=COMPRESSION_LEVEL).as_bytes()
+
+
+def read_dictionary(blob_path):
+    """Dictionary bytes for a compressed blob, or ``None`` for a plain one."""
+    path = f'{blob_path}.dict'
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def text_columns(columns):
+    """(column, experiment, model, field) for every text cell column."""
+    found = []
+    for column in columns:
+        for experiment in EXPERIMENTS:
+            prefix = f'{experiment}_'
+            if not column.startswith(prefix):
+                continue
+            for field in TEXT_FIELDS:
+                suffix = f'_{field}'
+                if column.endswith(suffix) and len(column) > len(prefix) + len(suffix):
+                    found.append((column, experiment, column[len(prefix):-len(suffix)], field))
+    return found
+
+
+def offset_columns(columns):
+    """Text column names that are stored as offsets in ``columns``."""
+    columns = set(columns)
+    return sorted(column[:-len('_offset')] for column in columns
+                  if column.endswith('_offset') and f"{column[:-len('_offset')]}_length" in columns)
+
+
+class BlobWriter:
+    """Append text cells to a blob file and its sidecar index.
+    
+    Passing ``dictionary`` to a new blob makes it a compressed one; an
+    existing blob keeps whatever dictionary it was created with.
+    """
+
+    def __init__(self, path, dictionary=None):
+        self.path = path
+        existing = read_dictionary(path)
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        if dictionary is not None and existing is None:
+            if not is_new:
+                raise ValueError(f"{path} already holds uncompressed cells")
+            with open(f'{path}.dict', 'wb') as f:
+                f.write(dictionary)
+            existing = dictionary
+        elif dictionary is not None and dictionary != existing:
+            raise ValueError(f"{path} was written with a different dictionary")
+        self._compressor = None
+        if existing is not None:
+            zstandard = _zstandard()
+            self._compressor = zstandard.ZstdCompressor(
+                level=COMPRESSION_LEVEL, dict_data=zstandard.ZstdCompressionDict(existing))
+        self._blob = open(path, 'ab')
+        self._index = open(f'{path}.idx', 'a', encoding='utf-8')
+        self.offset = self._blob.tell()
+
+    def append(self, test_id, experiment, model, field, text):
+        """Store one cell and return its (offset, length) in bytes."""
+        data = str(text).encode('utf-8')
+        if self._compressor is not None:
+            data = self._compressor.compress(data)
+        offset = self.offset
+        self._blob.write(data)
+        self.offset += len(data)
+        self._index.write(f'{test_id}\t{experiment}\t{model}\t{field}\t{offset}\t{len(data)}\n')
+        return offset, len(data)
+
+    def close(self):
+        self._blob.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class BlobStore:
+    """Memory-mapped read access to a blob file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        self._index = None
+        self._decompressor = None
+        dictionary = read_dictionary(path)
+        if dictionary is not None:
+            zstandard = _zstandard()
+            self._decompressor = zstandard.ZstdDecompressor(dict_data=zstandard.ZstdCompressionDict(dictionary))
+
+    def read(self, offset, length):
+        data = self._map[int(offset):int(offset) + int(length)]
+        if self._decompressor is not None:
+            data = self._decompressor.decompress(data)
+        return data.decode('utf-8')
+
+    def read_many(self, offsets, lengths):
+        """Decode an array of cells; missing (NaN) offsets stay NaN."""
+        offsets = np.asarray(offsets, dtype=float)
+        lengths = np.asarray(lengths, dtype=float)
+        texts = np.full(len(offsets), np.nan, dtype=object)
+        for i in np.flatnonzero(~np.isnan(offsets)):
+            texts[i] = self.read(offsets[i], lengths[i])
+        return texts
+
+    @property
+    def index(self):
+        """Sidecar index as a frame keyed by (test_id, experiment, model, field)."""
+        if self._index is None:
+            index = pd.read_csv(f'{self.path}.idx', sep='\t', names=INDEX_COLUMNS,
+                                dtype={'test_id': str}, quoting=3, keep_default_na=False)
+            # later appends win when a cell was stored twice
+            self._index = index.drop_duplicates(INDEX_COLUMNS[:4], keep='last').set_index(INDEX_COLUMNS[:4])
+        return self._index
+
+    def get(self, test_id, experiment, model, field='response'):
+        offset, length = self.index.loc[(str(test_id), experiment, model, field)]
+        return self.read(offset, length)
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def offloaded_fieldnames(fieldnames):
+    """Sorted column names once text columns are replaced by offsets."""
+    text = {column for column, *_ in text_columns(fieldnames)}
+    names = [name for name in fieldnames if name not in text]
+    names += [f'{column}_{part}' for column in text for part in ('offset', 'length')]
+    return sorted(names)
+
+
+def offload_record(record, writer):
+    """Copy of one result dict with its text cells moved into ``writer``."""
+    stored = dict(record)
+    for column, experiment, model, field in text_columns(record):
+        text = stored.pop(column)
+        if text is None:
+            continue
+        stored[f'{column}_offset'], stored[f'{column}_length'] = writer.append(
+            record.get('test_id', ''), experiment, model, field, text)
+    return stored
+
+
+def offload_text(df, blob_path, dictionary=None):
+    """Table with text columns replaced by blob offsets (appends to ``blob_path``)."""
+    df = df.copy()
+    test_ids = df['test_id'].astype(str).to_numpy() if 'test_id' in df.columns else np.full(len(df), '')
+    with BlobWriter(blob_path, dictionary) as writer:
+        for column, experiment, model, field in text_columns(df.columns):
+            offsets = np.full(len(df), np.nan)
+            lengths = np.full(len(df), np.nan)
+            values = df[column].to_numpy()
+            for i in np.flatnonzero(pd.notna(values)):
+                offsets[i], lengths[i] = writer.append(test_ids[i], experiment, model, field, values[i])
+            position = df.columns.get_loc(column)
+            df = df.drop(columns=column)
+            df.insert(position, f'{column}_length', pd.array(lengths, dtype='Int64'))
+            df.insert(position, f'{column}_offset', pd.array(offsets, dtype='Int64'))
+    return df
+
+
+def attach_text(df, blob_path, columns=None):
+    """Decode offset columns back into text columns.
+
+    ``columns`` limits decoding to the named text columns; everything else
+    stays as offsets and is never read from the blob. Raises ``ValueError``
+    when text to decode is offloaded but ``blob_path`` is empty, rather than
+    handing back a table without it.
+    """
+    wanted = offset_columns(df.columns)
+    if columns is not None:
+        wanted = [column for column in wanted if column in set(columns)]
+    if not wanted:
+        return df
+    if not blob_path:
+        raise ValueError(f"{len(wanted)} text columns (e.g. '{wanted[0]}') are stored as blob offsets; "
+                         f"pass the blob file they were written to (--blobs)")
+    df = df.copy()
+    with BlobStore(blob_path) as store:
+        for column in wanted:
+            offsets = pd.to_numeric(df[f'{column}_offset'], errors='coerce')
+            lengths = pd.to_numeric(df[f'{column}_length'], errors='coerce')
+            position = df.columns.get_loc(f'{column}_offset')
+            df.insert(position, column, pd.Series(store.read_many(offsets, lengths), index=df.index).infer_objects())
+            df = df.drop(columns=[f'{column}_offset', f'{column}_length'])
+    return df
+
+
+def read_results(path, blob_path=None, columns=None):
+    """Load a results CSV, decoding text from ``blob_path`` when it uses offsets.
+
+    ``columns`` names the text columns to load; the other text columns,
+    inline or as offsets, are not read at all, so ``columns=()`` loads only
+    numeric and key columns and never needs the blob.
+    """
+    if columns is None:
+        return attach_text(pd.read_csv(path), blob_path)
+    columns = set(columns)
+    header = pd.read_csv(path, nrows=0).columns
+    skipped = {column for column, *_ in text_columns(header) if column not in columns}
+    skipped.update(f'{column}_{part}' for column in offset_columns(header) if column not in columns
+                   for part in ('offset', 'length'))
+    return attach_text(pd.read_csv(path, usecols=[column for column in header if column not in skipped]),
+                       blob_path, columns)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move response text between results CSVs and a blob store.")
+    parser.add_argument('command', choices=['pack', 'unpack', 'train'])
+    parser.add_argument('csv', nargs='+', help="results CSV to convert (train: CSVs to learn from)")
+    parser.add_argument('--blobs', default='responses.blob', help="blob file to append to / read from")
+    parser.add_argument('--dict', help="zstd dictionary to compress a new blob with (train: file to write)")
+    parser.add_argument('--compress', action='store_true',
+                        help="pack: train a dictionary on this CSV's own text when --dict is not given")
+    parser.add_argument('--output', help="converted CSV (default: <csv>_packed.csv / <csv>_unpacked.csv)")
+    args = parser.parse_args()
+
+    if args.command == 'train':
+        texts = [text for path in args.csv
+                 for column, *_ in text_columns(pd.read_csv(path, nrows=0).columns)
+                 for text in pd.read_csv(path, usecols=[column])[column]]
+        dictionary = train_dictionary(texts)
+        output = args.dict or 'responses.dict'
+        with open(output, 'wb') as f:
+            f.write(dictionary)
+        print(f"✅ Trained a {len(dictionary):,}-byte dictionary on {len(texts)} cells → {output}")
+        raise SystemExit
+
+    df = pd.read_csv(args.csv[0])
+    stem = os.path.splitext(args.csv[0])[0]
+    if args.command == 'pack':
+        dictionary = None
+        if args.dict:
+            with open(args.dict, 'rb') as f:
+                dictionary = f.read()
+        elif args.compress:
+            dictionary = train_dictionary(df[[column for column, *_ in text_columns(df.columns)]].stack())
+        converted = offload_text(df, args.blobs, dictionary)
+        output = args.output or f'{stem}_packed.csv'
+    else:
+        converted = attach_text(df, args.blobs)
+        output = args.output or f'{stem}_unpacked.csv'
+    converted.to_csv(output, index=False)
+
+    print(f"✅ {args.command}ed {len(df)} rows: {os.path.getsize(args.csv[0]):,} → {os.path.getsize(output):,} bytes in {output}")
+    if args.command == 'pack':
+        print(f"📦 {args.blobs}: {os.path.getsize(args.blobs):,} bytes")
@@ -0,0 +1,3 @@
+# openrouter_test.py calls the live API and test_basic.py checks the old
+# framework layout; both are scripts, not pytest tests.
+collect_ignore = ['openrouter_test.py', 'test_basic.py']
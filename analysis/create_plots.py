@@ -1,16 +1,50 @@
+import argparse
+
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
 
+from blob_store import read_results
+from experiment_spec import load_spec
+from pricing import PRICING, apply_pricing
+from run_registry import REGISTRY_PATH, blobs_for, resolve_output
+import profiling
+from profiling import stage
+
+parser = argparse.ArgumentParser(description="Plot tutoring model performance.")
+parser.add_argument('--pricing', metavar='SCENARIO',
+                    help=f"recompute costs under a pricing scenario ({', '.join(sorted(PRICING))})")
+parser.add_argument('--pricing-file', help="JSON file with extra pricing scenarios")
+parser.add_argument('--run', metavar='RUN_ID',
+                    help="plot a registered run's evaluation file ('latest' for the newest rated run)")
+parser.add_argument('--registry', default=REGISTRY_PATH, help="run registry for --run")
+parser.add_argument('--blobs', help="blob file holding the text of an offset-only evaluation CSV (default: the registered run's)")
+parser.add_argument('--spec', metavar='JSON',
+                    help="experiment spec whose strategies and models to plot (default: experiment_spec.json if present)")
+profiling.add_arguments(parser)
+args = parser.parse_args()
+profiling.start_from_args(args)
+spec = load_spec(args.spec)
+spec.install()  # in effect until the script exits
+evaluation_csv = (resolve_output(args.run, 'evaluation', args.registry) if args.run
+                  else 'TutoringExperiment_evaluation_20250719.csv')
+blob_path = args.blobs or blobs_for(evaluation_csv, args.registry)
+
 # Set style
 plt.style.use('default')
 sns.set_palette("husl")
 
 # Load the performance summary
+stage('load')
 perf_df = pd.read_csv('performance_summary.csv')
+if args.pricing:
+    repriced = apply_pricing(pd.read_csv(evaluation_csv), args.pricing, args.pricing_file, blob_path)
+    perf_df['mean_cost'] = [repriced[f"{row['approach']}_{row['model']}_cost"].mean()
+                            for _, row in perf_df.iterrows()]
 
 # Create visualizations
+stage('overview_plots')
 fig, axes = plt.subplots(2, 2, figsize=(15, 12))
 
 # 1. Performance by Model and Approach
@@ -63,7 +97,8 @@ plt.savefig('tutoring_analysis_plots.png', dpi=300, bbox_inches='tight')
 plt.show()
 
 # Create a second figure for subject analysis
-df = pd.read_csv('TutoringExperiment_evaluation_20250719.csv')
+stage('subject_plots')
+df = pd.read_csv(evaluation_csv)
 fig2, axes2 = plt.subplots(1, 2, figsize=(15, 6))
 
 # Subject difficulty
@@ -1,18 +1,38 @@
+import argparse
+
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+from blob_store import read_results
+from experiment_spec import load_spec
+from response_features import long_responses, extract_features
+from run_registry import REGISTRY_PATH, blobs_for, resolve_output
+
+parser = argparse.ArgumentParser(description="Answer-acceptance proxy and qualitative checks per approach and model.")
+parser.add_argument('--run', metavar='RUN_ID',
+                    help="analyse a registered run's evaluation file ('latest' for the newest rated run)")
+parser.add_argument('--registry', default=REGISTRY_PATH, help="run registry for --run")
+parser.add_argument('--blobs', help="blob file holding the text of an offset-only evaluation CSV (default: the registered run's)")
+parser.add_argument('--spec', metavar='JSON',
+                    help="experiment spec whose strategies and models to report (default: experiment_spec.json if present)")
+args = parser.parse_args()
+spec = load_spec(args.spec)
+spec.install()  # in effect until the script exits
+evaluation_csv = (resolve_output(args.run, 'evaluation', args.registry) if args.run
+                  else 'TutoringExperiment_evaluation_20250719.csv')
+
 # Load the data
-df = pd.read_csv('TutoringExperiment_evaluation_20250719.csv')
+df = read_results(evaluation_csv, args.blobs or blobs_for(evaluation_csv, args.registry))
 performance_df = pd.read_csv('performance_summary.csv')
 
 print(f"Loaded {len(df)} test cases")
 print(f"Dataset columns: {list(df.columns)}")
 
 # Extract answer correctness data
-models = ['claude_haiku', 'gpt4o_mini', 'phi3_mini']
-approaches = ['zero_shot', 'few_shot', 'cot']
+models = sorted(spec.model_keys())
+approaches = spec.strategy_names()
 
 correctness_data = []
 
@@ -112,6 +132,17 @@ print("2. Hallucination Concerns:")
 print("   • Zero-shot and few-shot occasionally create non-existent conversation turns")
 print("   • May confuse students with fabricated dialogue")
 print()
+
+# Check the qualitative claims against heuristic features of every response
+features = extract_features(long_responses(df))
+measured = features.groupby('experiment')[['hallucinated_turns', 'leaked_answer', 'scratchpad_leak']].mean()
+print("Measured across all responses (response_features.py):")
+print(f"{'Approach':<10} {'Fabricated turns':<17} {'Leaked answer':<14} {'Scratchpad shown':<16}")
+for approach in approaches:
+    if approach in measured.index:
+        row = measured.loc[approach]
+        print(f"{approach:<10} {row['hallucinated_turns']:<17.0%} {row['leaked_answer']:<14.0%} {row['scratchpad_leak']:<16.0%}")
+print()
 print("3. Few-shot GPT-4o Mini Excellence:")
 print("   • Demonstrates optimal balance of brevity, empathy, and accuracy")
 print("   • Highest performance rating (3.60) in the evaluation")
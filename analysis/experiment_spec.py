@@ -0,0 +1,532 @@
+#!/usr/bin/env python3
+"""
+Declarative experiment matrix: models, prompt strategies, parsers and
+generation parameters in one spec.
+
+The built-in spec mirrors ``MODELS`` and ``PROMPT_TEMPLATES`` in
+``run_experiment.py``. A JSON file (``experiment_spec.json`` in the working
+directory is picked up automatically) can add or override models and
+strategies:
+
+    {
+      "models": {"llama_8b": {"name": "Llama 3.1 8B", "model_id": "meta-llama/llama-3.1-8b-instruct",
+                              "cost_per_1k_input": 0.00002, "cost_per_1k_output": 0.00005,
+                              "rate_limit_rpm": 200}},
+      "strategies": {"socratic": {"extends": "few_shot", "head": "...", "temperature": 0.3},
+                     "strict_cot": {"extends": "cot", "max_tokens": 800}},
+      "generation": {"max_tokens": 2000, "temperature": 0.0},
+      "exclude": [["cot", "phi3_mini"]]
+    }
+
+``install()`` makes the spec the one every script sees: it updates
+``MODELS``, ``PROMPT_TEMPLATES`` and the shared ``EXPERIMENTS`` list in
+place, as ``pricing.load_scenarios`` does for ``PRICING``, and returns a
+handle that puts the previous tables back (``with spec.install(): ...``
+scopes a spec to a block). Strategy names
+must not start with another strategy's name plus ``_``, so wide column names
+(``{strategy}_{model}_{field}``) stay unambiguous.
+
+CoT output is parsed with ``ScratchpadStream``, which splits scratchpad and
+final answer as text arrives. A strategy with ``"stream": true`` streams the
+response and closes it as soon as the final answer is complete (followed by
+a fabricated turn, a new prompt section or a second scratchpad), so those
+tokens are neither generated nor billed. With ``"structured": true``, models
+flagged ``structured_output`` are asked for a JSON object with
+``scratchpad`` and ``response`` fields under a strict schema instead; other
+models keep the tag format. Parsers return an error code (e.g.
+``unclosed_scratchpad``) instead of passing the raw text off as the final
+answer.
+
+``plan()`` expands the matrix over dialogues into API tasks. Cells whose
+request would be identical (same model id, rendered prompt and generation
+parameters, e.g. strategies that differ only in their parser, or repeated
+dialogues) share one task when generation is deterministic (temperature 0
+or a fixed ``seed``); sampled cells each get their own. Cells already in
+``done`` are skipped. Tasks
+are ordered by each model's virtual finish time under its
+``rate_limit_rpm``, so a worker pool draws from every model in proportion to
+its limit instead of exhausting one model's quota at a time.
+"""
+
+import argparse
+import copy
+import hashlib
+import itertools
+import json
+import os
+
+DEFAULT_SPEC_PATH = 'experiment_spec.json'
+DEFAULT_RATE_LIMIT_RPM = 60
+DEFAULT_GENERATION = {'max_tokens': 2000, 'temperature': 0.0}
+GENERATION_KEYS = ('max_tokens', 'temperature', 'top_p', 'stop', 'seed')
+
+SCRATCHPAD_OPEN = '<scratchpad>'
+SCRATCHPAD_CLOSE = '</scratchpad>'
+# After the final answer has started, any of these means the model has moved
+# on to text nobody reads.
+FINAL_STOP_MARKERS = ('\nStudent:', '\nTutor:', '\n### ', SCRATCHPAD_OPEN)
+
+JSON_TAIL = """
+
+Reply with only a JSON object with two string fields: "scratchpad", your analysis of the questions above, and "response", your tutor response."""
+JSON_RESPONSE_FORMAT = {
+    'type': 'json_schema',
+    'json_schema': {
+        'name': 'tutor_reply',
+        'strict': True,
+        'schema': {
+            'type': 'object',
+            'properties': {'scratchpad': {'type': 'string'}, 'response': {'type': 'string'}},
+            'required': ['scratchpad', 'response'],
+            'additionalProperties': False
+        }
+    }
+}
+
+# Strategy names, shared by every module that splits wide column names.
+# ``ExperimentSpec.install`` replaces the contents in place.
+EXPERIMENTS = ['zero_shot', 'few_shot', 'cot']
+
+
+class ScratchpadStream:
+    """Incremental scratchpad/final-answer split of tag-based CoT output.
+
+    ``feed`` takes text as it arrives and returns True once the final answer
+    is complete, i.e. non-empty final text is followed by one of
+    ``stop_markers``; the caller can stop generating there. Output that
+    starts inside the scratchpad (the CoT prompt ends with the opening tag,
+    ``opened``) is recognised by a closing tag that comes first. Each chunk
+    is scanned once, together with the unmatched end of the text before it
+    (long enough to hold a tag or marker split across chunks).
+    """
+
+    def __init__(self, stop_markers=FINAL_STOP_MARKERS, opened=False):
+        self.stop_markers = tuple(stop_markers)
+        self.opened = opened
+        self.reset()
+
+    def reset(self):
+        self.chunks = []
+        self.length = 0
+        self.state = 'before'
+        self.scratchpad_start = 0
+        self.scratchpad_end = self.final_start = self.final_end = None
+        self._tail = ''
+        self._final_seen = False
+
+    @property
+    def text(self):
+        if len(self.chunks) > 1:
+            self.chunks[:] = [''.join(self.chunks)]
+        return self.chunks[0] if self.chunks else ''
+
+    def feed(self, chunk):
+        if self.state == 'done':
+            self.chunks.append(chunk)
+            self.length += len(chunk)
+            return True
+        window = self._tail + chunk
+        base = self.length - len(self._tail)
+        self.chunks.append(chunk)
+        self.length += len(chunk)
+        position = 0
+        if self.state == 'before':
+            opened, closed = window.find(SCRATCHPAD_OPEN), window.find(SCRATCHPAD_CLOSE)
+            if closed >= 0 and (opened < 0 or closed < opened):
+                position = self._close(base, closed)
+            elif opened >= 0:
+                self.state = 'scratchpad'
+                position = opened + len(SCRATCHPAD_OPEN)
+                self.scratchpad_start = base + position
+            else:
+                return self._keep(window, position, len(SCRATCHPAD_CLOSE))
+        if self.state == 'scratchpad':
+            closed = window.find(SCRATCHPAD_CLOSE, position)
+            if closed < 0:
+                return self._keep(window, position, len(SCRATCHPAD_CLOSE))
+            position = self._close(base, closed)
+        while True:
+            hits = [found for found in (window.find(marker, position) for marker in self.stop_markers) if found >= 0]
+            if not hits:
+                break
+            found = min(hits)
+            if self._final_seen or window[position:found].strip():
+                self.final_end = base + found
+                self.state = 'done'
+                return True
+            # a marker before any final text is part of the answer
+            self._final_seen = bool(window[found:found + 1].strip())
+            position = found + 1
+        return self._keep(window, position, max(map(len, self.stop_markers), default=1))
+
+    def _close(self, base, found):
+        self.scratchpad_end = base + found
+        self.final_start = base + found + len(SCRATCHPAD_CLOSE)
+        self.state = 'final'
+        return found + len(SCRATCHPAD_CLOSE)
+
+    def _keep(self, window, position, longest):
+        """Hold back the end of ``window`` that could start a tag or marker; False (not done)."""
+        keep = max(position, len(window) - longest + 1)
+        if self.state == 'final' and window[position:keep].strip():
+            self._final_seen = True
+        self._tail = window[keep:]
+        return False
+
+    def result(self):
+        """(scratchpad, final response, error code or None) for the text so far."""
+        text = self.text
+        if self.state == 'before' and self.opened:
+            return text.strip(), '', 'unclosed_scratchpad'
+        if self.state == 'before':
+            return '', '', 'missing_tags'
+        if self.state == 'scratchpad':
+            return text[self.scratchpad_start:].strip(), '', 'unclosed_scratchpad'
+        scratchpad = text[self.scratchpad_start:self.scratchpad_end].strip()
+        final = text[self.final_start:self.final_end].strip()
+        return scratchpad, final, None if final else 'empty_final'
+
+
+def parse_plain(content):
+    return None, content.strip(), None
+
+
+def parse_scratchpad(content, stop_markers=(), opened=False):
+    """(scratchpad, final response, error) from ``<scratchpad>...</scratchpad>`` output.
+
+    The final answer runs to the end unless ``stop_markers`` cut it short.
+    """
+    stream = ScratchpadStream(stop_markers, opened)
+    stream.feed(content)
+    return stream.result()
+
+
+def parse_json(content):
+    """(scratchpad, final response, error) from a ``JSON_RESPONSE_FORMAT`` reply."""
+    try:
+        reply = json.loads(content[content.find('{'):content.rfind('}') + 1])
+        scratchpad, final = str(reply['scratchpad']).strip(), str(reply['response']).strip()
+    except (ValueError, TypeError, KeyError):
+        return '', '', 'invalid_json'
+    return scratchpad, final, None if final else 'empty_final'
+
+
+# name -> content -> (scratchpad or None, final response, error code or None)
+PARSERS = {
+    'plain': parse_plain,
+    'scratchpad': parse_scratchpad,
+    'json': parse_json
+}
+
+
+class Task:
+    """One API request and every (test_id, strategy, model) cell it fills.
+
+    The conversation and the strategy's (head, tail) are shared with other
+    tasks; ``prompt`` joins them only when the request is sent.
+    """
+
+    __slots__ = ('model', 'strategy', 'dialogue', 'conversation', 'parts', 'generation', 'cells', 'due')
+
+    def __init__(self, model, strategy, dialogue, conversation, parts, generation):
+        self.model = model
+        self.strategy = strategy
+        self.dialogue = dialogue
+        self.conversation = conversation
+        self.parts = parts
+        self.generation = generation
+        self.cells = []
+        self.due = 0.0
+
+    @property
+    def prompt(self):
+        head, tail = self.parts
+        return "".join((head, self.conversation, tail))
+
+
+class Installed:
+    """The tables ``ExperimentSpec.install`` replaced; ``restore()`` or leaving a ``with`` block puts them back."""
+
+    def __init__(self, tables):
+        self.saved = [(table, copy.copy(table)) for table in tables]
+
+    def restore(self):
+        for table, contents in self.saved:
+            if isinstance(table, list):
+                table[:] = contents
+            else:
+                table.clear()
+                table.update(contents)
+        self.saved = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.restore()
+        return False
+
+
+class ExperimentSpec:
+    """Models, strategies and the (strategy, model) cells to run."""
+
+    def __init__(self, models, strategies, generation=None, cells=None, exclude=()):
+        self.models = models
+        self.strategies = strategies
+        self.generation = dict(DEFAULT_GENERATION, **(generation or {}))
+        exclude = {tuple(cell) for cell in exclude}
+        cells = cells or itertools.product(strategies, models)
+        self._cells = [tuple(cell) for cell in cells if tuple(cell) not in exclude]
+        self.validate()
+
+    @classmethod
+    def default(cls, models=None, templates=None):
+        """Spec for ``MODELS`` and ``PROMPT_TEMPLATES`` (those of ``run_experiment`` unless given)."""
+        if models is None or templates is None:
+            from run_experiment import MODELS, PROMPT_TEMPLATES
+            models, templates = MODELS, PROMPT_TEMPLATES
+
+        strategies = {name: {'head': head, 'tail': tail, 'parser': 'scratchpad' if name == 'cot' else 'plain'}
+                      for name, (head, tail) in templates.items()}
+        return cls(copy.deepcopy(models), strategies)
+
+    @classmethod
+    def from_dict(cls, data, base=None):
+        """Spec from a JSON-shaped dict layered over ``base`` (the built-in spec by default)."""
+        base = base or cls.default()
+        models = copy.deepcopy(base.models)
+        for key, model in data.get('models', {}).items():
+            models[key] = dict(models.get(key, {}), **model)
+        strategies = copy.deepcopy(base.strategies)
+        for name, strategy in data.get('strategies', {}).items():
+            parent = strategies.get(strategy.get('extends', name), {})
+            strategies[name] = dict(parent, **{k: v for k, v in strategy.items() if k != 'extends'})
+        return cls(models, strategies, dict(base.generation, **data.get('generation', {})), data.get('cells'),
+                   data.get('exclude', ()))
+
+    @classmethod
+    def from_file(cls, path, base=None):
+        with open(path, 'r') as f:
+            return cls.from_dict(json.load(f), base)
+
+    def validate(self):
+        for name, strategy in self.strategies.items():
+            if 'head' not in strategy or 'tail' not in strategy:
+                raise ValueError(f"Strategy '{name}' needs 'head' and 'tail' text (or 'extends')")
+            if strategy.get('parser', 'plain') not in PARSERS:
+                raise ValueError(f"Strategy '{name}' uses unknown parser '{strategy['parser']}' "
+                                 f"(available: {', '.join(sorted(PARSERS))})")
+            clashes = [other for other in self.strategies if other != name and name.startswith(f'{other}_')]
+            if clashes:
+                raise ValueError(f"Strategy '{name}' starts with '{clashes[0]}_', which makes "
+                                 f"'{name}_<model>' columns ambiguous; rename it")
+        for key, model in self.models.items():
+            missing = [field for field in ('model_id', 'cost_per_1k_input', 'cost_per_1k_output') if field not in model]
+            if missing:
+                raise ValueError(f"Model '{key}' is missing {', '.join(missing)}")
+        for strategy, model in self._cells:
+            if strategy not in self.strategies or model not in self.models:
+                raise ValueError(f"Cell ({strategy}, {model}) names an unknown strategy or model")
+
+    def cells(self):
+        """(strategy, model) pairs, in spec order."""
+        return list(self._cells)
+
+    def strategy_names(self):
+        return list(dict.fromkeys(strategy for strategy, _ in self._cells))
+
+    def model_keys(self):
+        return list(dict.fromkeys(model for _, model in self._cells))
+
+    def template(self, strategy):
+        return self.strategies[strategy]['head'], self.strategies[strategy]['tail']
+
+    def output_format(self, strategy, model=None):
+        """Parser name for a cell: ``json`` where structured output applies, else the strategy's."""
+        config = self.strategies[strategy]
+        if model is not None and config.get('structured') and self.models[model].get('structured_output'):
+            return 'json'
+        return config.get('parser', 'plain')
+
+    def prompt(self, strategy, conversation, model=None):
+        """Prompt text for ``strategy`` around a formatted conversation.
+
+        Without ``model`` the strategy's own format is used (rollouts and
+        sampling send no structured-output schema).
+        """
+        head, tail = self.prompt_parts(strategy, model)
+        return "".join((head, conversation, tail))
+
+    def prompt_parts(self, strategy, model=None):
+        """(head, tail) that ``prompt`` puts around the conversation."""
+        head, tail = self.template(strategy)
+        if self.output_format(strategy, model) == 'json':
+            tail = self.strategies[strategy].get('json_tail', JSON_TAIL)
+        return head, tail
+
+    def parse(self, strategy, content, model=None):
+        """(scratchpad or None, final response, error code or None) for one response.
+
+        Stop markers end the final answer only for cells that stream with
+        early stopping, where the text after them was never meant to be kept.
+        """
+        output_format = self.output_format(strategy, model)
+        if output_format == 'scratchpad':
+            stream = self.stream_parser(strategy, model) or self.scratchpad_stream(strategy, ())
+            stream.feed(content)
+            return stream.result()
+        return PARSERS[output_format](content)
+
+    def scratchpad_stream(self, strategy, stop_markers=None):
+        """``ScratchpadStream`` for the strategy's prompt prefill and stop markers (unless given)."""
+        config = self.strategies[strategy]
+        if stop_markers is None:
+            stop_markers = config.get('final_stop', FINAL_STOP_MARKERS)
+        return ScratchpadStream(stop_markers,
+                                opened=config['tail'].rstrip().endswith(SCRATCHPAD_OPEN))
+
+    def stream_parser(self, strategy, model):
+        """A ``ScratchpadStream`` when the cell streams tag-based output, else None."""
+        if self.strategies[strategy].get('stream') and self.output_format(strategy, model) == 'scratchpad':
+            return self.scratchpad_stream(strategy)
+        return None
+
+    def generation_for(self, strategy, model):
+        """Generation parameters for one cell: spec, then model, then strategy overrides."""
+        params = dict(self.generation)
+        for source in (self.models[model], self.strategies[strategy]):
+            params.update({key: source[key] for key in GENERATION_KEYS if key in source})
+        if self.output_format(strategy, model) == 'json':
+            params['response_format'] = JSON_RESPONSE_FORMAT
+        return params
+
+    def install(self, models=None, templates=None):
+        """Make this spec the one the runner and the analysis modules use.
+
+        Updates ``models``/``templates`` (``run_experiment``'s ``MODELS`` and
+        ``PROMPT_TEMPLATES`` unless given) and ``EXPERIMENTS`` in place.
+        Pricing scenarios that do not list a spec model price it at the
+        spec's rates. Returns an ``Installed`` handle that restores all of
+        them.
+        """
+        from pricing import PRICING
+
+        if models is None or templates is None:
+            from run_experiment import MODELS, PROMPT_TEMPLATES
+            models, templates = MODELS, PROMPT_TEMPLATES
+
+        installed = Installed([models, templates, EXPERIMENTS]
+                              + [scenario['models'] for scenario in PRICING.values()])
+        models.clear()
+        models.update(self.models)
+        templates.clear()
+        templates.update({name: self.template(name) for name in self.strategies})
+        EXPERIMENTS[:] = list(self.strategies)
+        for scenario in PRICING.values():
+            for key, model in self.models.items():
+                scenario['models'].setdefault(key, {'input': model['cost_per_1k_input'],
+                                                    'output': model['cost_per_1k_output']})
+        return installed
+
+    def request_cells(self):
+        """(strategy, model, signature id, deterministic, (head, tail), generation) per cell.
+
+        Cells with the same signature id send the same request for the same
+        conversation; ``deterministic`` (temperature 0 or a fixed ``seed``)
+        says whether they may share one.
+        """
+        signatures = {}
+        cells = []
+        for strategy, model in self._cells:
+            parts = self.prompt_parts(strategy, model)
+            generation = self.generation_for(strategy, model)
+            stream = self.stream_parser(strategy, model)
+            signature = json.dumps([self.models[model]['model_id'], parts, generation, stream and stream.stop_markers],
+                                   sort_keys=True)
+            deterministic = generation.get('temperature') == 0 or 'seed' in generation
+            cells.append((strategy, model, signatures.setdefault(signature, len(signatures)), deterministic,
+                          parts, generation))
+        return cells
+
+    def plan(self, dialogues, conversation_text, done=()):
+        """Deduplicated tasks for every cell of every dialogue, in rate-limit order.
+
+        ``conversation_text(dialogue)`` renders a dialogue as the prompts
+        embed it; ``done`` holds (test_id, strategy, model) cells to skip.
+        """
+        done = {(str(test_id), strategy, model) for test_id, strategy, model in done}
+        cells = self.request_cells()
+        tasks = {}
+        for dialogue in dialogues:
+            test_id = str(dialogue.get('test_id'))
+            conversation = conversation_text(dialogue)
+            digest = hashlib.sha1(conversation.encode('utf-8')).digest()
+            for strategy, model, signature, deterministic, parts, generation in cells:
+                if (test_id, strategy, model) in done:
+                    continue
+                # sampled outputs are not interchangeable, so only deterministic requests are shared
+                key = (signature, digest) if deterministic else (signature, digest, test_id, strategy)
+                task = tasks.get(key)
+                if task is None:
+                    task = tasks[key] = Task(model, strategy, dialogue, conversation, parts, generation)
+                task.cells.append((dialogue, strategy, model))
+
+        # weighted fair queueing: the k-th task of a model is due at k / rpm
+        issued = dict.fromkeys(self.models, 0)
+        for task in tasks.values():
+            issued[task.model] += 1
+            task.due = issued[task.model] / self.models[task.model].get('rate_limit_rpm', DEFAULT_RATE_LIMIT_RPM)
+        order = {model: i for i, model in enumerate(self.models)}
+        return sorted(tasks.values(), key=lambda task: (task.due, order[task.model]))
+
+    def plan_summary(self, tasks):
+        """Per-model task and cell counts and the minutes each needs at its rate limit."""
+        rows = {}
+        for task in tasks:
+            row = rows.setdefault(task.model, {'model': task.model, 'tasks': 0, 'cells': 0})
+            row['tasks'] += 1
+            row['cells'] += len(task.cells)
+        for row in rows.values():
+            row['rate_limit_rpm'] = self.models[row['model']].get('rate_limit_rpm', DEFAULT_RATE_LIMIT_RPM)
+            row['minutes_at_limit'] = row['tasks'] / row['rate_limit_rpm']
+        return list(rows.values())
+
+    def to_dict(self):
+        return {'models': self.models, 'strategies': self.strategies, 'generation': self.generation,
+                'cells': [list(cell) for cell in self._cells]}
+
+
+def load_spec(path=None, base=None):
+    """Spec from ``path``, else ``experiment_spec.json`` if present, else ``base`` or the built-in one."""
+    if path is None and os.path.exists(DEFAULT_SPEC_PATH):
+        path = DEFAULT_SPEC_PATH
+    if path:
+        return ExperimentSpec.from_file(path, base)
+    return base or ExperimentSpec.default()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show an experiment spec and its task plan.")
+    parser.add_argument('--spec', help=f"spec JSON (default: {DEFAULT_SPEC_PATH} if present)")
+    parser.add_argument('--data', default='../comta_evaluation_sample.json', help="dialogue sample JSON")
+    parser.add_argument('--dump', action='store_true', help="print the resolved spec as JSON")
+    args = parser.parse_args()
+
+    spec = load_spec(args.spec)
+    if args.dump:
+        print(json.dumps(spec.to_dict(), indent=2))
+        raise SystemExit
+
+    from run_experiment import Conversation
+
+    with open(args.data) as f:
+        dialogues = json.load(f)
+    tasks = spec.plan(dialogues, lambda dialogue: Conversation(dialogue.get('full_dialogue', [])).formatted())
+    n_cells = sum(len(task.cells) for task in tasks)
+    print(f"🧩 {len(spec.strategy_names())} strategies × {len(spec.model_keys())} models = "
+          f"{len(spec.cells())} cells per dialogue")
+    print(f"📋 {len(dialogues)} dialogues → {n_cells} cells in {len(tasks)} API calls "
+          f"({n_cells - len(tasks)} duplicates shared)")
+    for row in spec.plan_summary(tasks):
+        print(f"  {row['model']:<14} {row['tasks']:>6} calls  {row['rate_limit_rpm']:>5} rpm  "
+              f"≥ {row['minutes_at_limit']:.1f} min")
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+LLM-as-judge rating stage.
+
+Scores every tutor response in a results CSV on the five criteria from the
+``EVALUATION_CRITERIA`` row (mistake diagnosis, teaching strategy, feedback
+quality, clarity, support & encouragement) and writes the average, rounded
+to the half-point scale used by human raters, into the
+``{approach}_{model}_rating`` columns the analysis scripts read.
+
+Responses for the same dialogue are judged together in one call (the
+conversation is sent once per batch), batches run concurrently, and scores
+are cached on disk by a hash of the judge, prompt version, conversation and
+response, so reruns only pay for new cells.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from blob_store import attach_text
+from run_experiment import ExperimentRunner, PROMPT_TEMPLATES
+from run_registry import REGISTRY_PATH, add_output, blobs_for, load_registry, run_id_for
+
+CRITERIA = ['mistake_diagnosis', 'teaching_strategy', 'feedback_quality', 'clarity', 'support']
+JUDGE_PROMPT_VERSION = 'v1'
+
+JUDGE_MODELS = {
+    'gpt4o_mini': {
+        'name': 'GPT-4o-mini',
+        'model_id': 'openai/gpt-4o-mini',
+        'cost_per_1k_input': 0.00015,
+        'cost_per_1k_output': 0.0006
+    },
+    'claude_haiku': {
+        'name': 'Claude 3.5 Haiku',
+        'model_id': 'anthropic/claude-3.5-haiku',
+        'cost_per_1k_input': 0.0008,
+        'cost_per_1k_output': 0.004
+    }
+}
+
+JUDGE_PROMPT_HEAD = """You are an expert evaluator of math tutoring. Rate each tutor response below as the tutor's next message in the conversation. Score every criterion from 1 (poor) to 5 (excellent):
+
+1) mistake_diagnosis: correctly judges whether the student is right and pinpoints any error
+2) teaching_strategy: guides the student to the answer instead of giving it away
+3) feedback_quality: feedback is specific, accurate and actionable
+4) clarity: clear and concise for the student's level
+5) support: encouraging and supportive
+
+### Conversation
+"""
+
+JUDGE_PROMPT_TAIL = """
+
+Return only JSON of the form {"ratings": [{"id": 1, "mistake_diagnosis": 3, "teaching_strategy": 4, "feedback_quality": 3, "clarity": 5, "support": 4}]} with one entry per response id."""
+
+JSON_PATTERN = re.compile(r"\{.*\}", re.S)
+
+
+class JudgeCache:
+    """Append-only JSON-lines cache of criterion scores keyed by content hash."""
+    
+    def __init__(self, path):
+        self.path = path
+        self.scores = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    entry = json.loads(line)
+                    self.scores[entry['key']] = entry['scores']
+    
+    def __contains__(self, key):
+        return key in self.scores
+    
+    def get(self, key):
+        return self.scores.get(key)
+    
+    def put_many(self, entries):
+        with self._lock:
+            self.scores.update(entries)
+            if self.path:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    for key, scores in entries.items():
+                        f.write(json.dumps({'key': key, 'scores': scores}) + "\n")
+
+
+def cell_key(judge_model_id, conversation, response):
+    digest = hashlib.sha256()
+    for part in (judge_model_id, JUDGE_PROMPT_VERSION, conversation, response):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def collect_cells(df, judge_model_id):
+    """One entry per non-error response: (row, experiment, model, conversation, text, key).
+    
+    CoT cells are judged on the final answer the student would see; cells
+    whose scratchpad or JSON could not be parsed are skipped like API errors.
+    """
+    cells = []
+    for experiment in PROMPT_TEMPLATES:
+        for column in df.columns:
+            prefix = f'{experiment}_'
+            if not (column.startswith(prefix) and column.endswith('_response')):
+                continue
+            model = column[len(prefix):-len('_response')]
+            final_column = f'{experiment}_{model}_final'
+            error_column = f'{experiment}_{model}_parse_error'
+            for row, response in df[column].items():
+                if not isinstance(response, str) or not response or response.startswith('ERROR:'):
+                    continue
+                parse_error = df.at[row, error_column] if error_column in df.columns else None
+                if isinstance(parse_error, str) and parse_error.strip():
+                    continue
+                final = df.at[row, final_column] if final_column in df.columns else None
+                text = final if isinstance(final, str) and final.strip() else response
+                conversation = df.at[row, 'conversation_text']
+                cells.append((row, experiment, model, conversation, text,
+                              cell_key(judge_model_id, conversation, text)))
+    return cells
+
+
+def parse_scores(content, expected_ids):
+    """Map id -> {criterion: score} for every well-formed entry in a judge reply."""
+    match = JSON_PATTERN.search(content or '')
+    if not match:
+        return {}
+    try:
+        ratings = json.loads(match.group(0)).get('ratings', [])
+    except (ValueError, AttributeError):
+        return {}
+    parsed = {}
+    for entry in ratings:
+        try:
+            scores = {criterion: float(entry[criterion]) for criterion in CRITERIA}
+            item_id = int(entry['id'])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if item_id in expected_ids and all(1 <= score <= 5 for score in scores.values()):
+            parsed[item_id] = scores
+    return parsed
+
+
+def overall_rating(scores):
+    """Mean of the five criteria on the half-point scale used by human raters."""
+    return round(np.mean([scores[criterion] for criterion in CRITERIA]) * 2) / 2
+
+
+class Judge:
+    """Concurrent, batched, cached judging of tutor responses."""
+    
+    def __init__(self, judge='gpt4o_mini', batch_size=9, max_workers=32, cache_path='judge_cache.jsonl'):
+        self.model_config = JUDGE_MODELS[judge]
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.cache = JudgeCache(cache_path)
+        self.runner = ExperimentRunner()
+        self.calls = 0
+        self.failures = 0
+        self.cost = 0.0
+        self._lock = threading.Lock()
+    
+    def build_prompt(self, conversation, texts):
+        items = "\n\n".join(f"[{i}]\n{text.strip()}" for i, text in enumerate(texts, 1))
+        return "".join((JUDGE_PROMPT_HEAD, conversation, "\n\n### Tutor responses\n", items, JUDGE_PROMPT_TAIL))
+    
+    def judge_batch(self, batch):
+        """Score one batch of cells sharing a conversation; retries misses singly."""
+        conversation = batch[0][3]
+        response = self.runner.make_api_request(
+            None, self.build_prompt(conversation, [cell[4] for cell in batch]),
+            max_tokens=60 * len(batch) + 50, model_config=self.model_config, experiment='judge')
+        with self._lock:
+            self.calls += 1
+            self.cost += response['cost']
+        
+        parsed = parse_scores(response['content'], set(range(1, len(batch) + 1))) if response['success'] else {}
+        found = {batch[i - 1][5]: scores for i, scores in parsed.items()}
+        if found:
+            self.cache.put_many(found)
+        
+        missing = [cell for i, cell in enumerate(batch, 1) if i not in parsed]
+        if missing and len(batch) > 1:
+            for cell in missing:
+                self.judge_batch([cell])
+        elif missing:
+            with self._lock:
+                self.failures += 1
+    
+    def rate(self, df, blob_path=None):
+        """Return ``df`` with judge scores and ``_rating`` columns filled in.
+        
+        Text stored as blob offsets is read from ``blob_path``.
+        """
+        df = attach_text(df[df['test_id'].astype(str) != 'EVALUATION_CRITERIA'], blob_path).copy()
+        history = df.get('conversation_history', pd.Series('', index=df.index)).fillna('').astype(str)
+        claims = df.get('student_claim', pd.Series('', index=df.index)).fillna('').astype(str)
+        df['conversation_text'] = history + np.where(claims != '', "\nStudent: " + claims, '')
+        
+        cells = collect_cells(df, self.model_config['model_id'])
+        pending = {}
+        cached = 0
+        for cell in cells:
+            if cell[5] in self.cache:
+                cached += 1
+            else:
+                # identical (conversation, response) cells in any row are judged once
+                pending.setdefault(cell[3], {})[cell[5]] = cell
+        batches = []
+        for group in pending.values():
+            unique = list(group.values())
+            batches.extend(unique[i:i + self.batch_size] for i in range(0, len(unique), self.batch_size))
+        
+        to_judge = sum(len(batch) for batch in batches)
+        print(f"⚖️  {len(cells)} cells: {cached} cached, {len(cells) - cached - to_judge} duplicates of another cell, "
+              f"{to_judge} to judge in {len(batches)} judge calls")
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            list(pool.map(self.judge_batch, batches))
+        
+        columns = {}
+        for row, experiment, model, _, _, key in cells:
+            scores = self.cache.get(key)
+            if scores is None:
+                continue
+            prefix = f'{experiment}_{model}'
+            for criterion in CRITERIA:
+                columns.setdefault(f'{prefix}_{criterion}', {})[row] = scores[criterion]
+            columns.setdefault(f'{prefix}_rating', {})[row] = overall_rating(scores)
+        for column, values in columns.items():
+            df[column] = pd.Series(values)
+        return df.drop(columns=['conversation_text'])
+
+
+if __name__ == "__main__":
+    import time
+    
+    parser = argparse.ArgumentParser(description="Rate tutor responses with a judge model.")
+    parser.add_argument('results_csv', help="tutoring_results_*.csv from run_experiment.py")
+    parser.add_argument('--output', help="rated CSV path (default: TutoringExperiment_evaluation_judged.csv)")
+    parser.add_argument('--judge', default='gpt4o_mini', choices=sorted(JUDGE_MODELS))
+    parser.add_argument('--batch-size', type=int, default=9, help="responses per judge call")
+    parser.add_argument('--workers', type=int, default=32, help="concurrent judge calls")
+    parser.add_argument('--cache', default='judge_cache.jsonl')
+    parser.add_argument('--registry', default=REGISTRY_PATH,
+                        help="record the output as the evaluation of the results file's registered run")
+    parser.add_argument('--blobs',
+                        help="blob file holding the text of an offset-only results CSV (default: the registered run's)")
+    parser.add_argument('--store', metavar='RATINGS_CSV',
+                        help="also add the ratings to a long-format store as rater 'judge:<judge>'")
+    args = parser.parse_args()
+    
+    judge = Judge(args.judge, args.batch_size, args.workers, args.cache)
+    started = time.perf_counter()
+    rated = judge.rate(pd.read_csv(args.results_csv), args.blobs or blobs_for(args.results_csv, args.registry))
+    elapsed = time.perf_counter() - started
+    
+    output = args.output or 'TutoringExperiment_evaluation_judged.csv'
+    rated.to_csv(output, index=False)
+    n_rated = sum(rated[c].notna().sum() for c in rated.columns if c.endswith('_rating'))
+    print(f"✅ {n_rated} ratings written to {output}")
+    run_id = run_id_for(args.results_csv)
+    if run_id in load_registry(args.registry):
+        add_output(run_id, 'evaluation', output, args.registry)
+        print(f"🗂️  Recorded as the evaluation of run {run_id}")
+    if args.store:
+        from rater_agreement import add_to_store, ingest_wide
+        add_to_store(args.store, ingest_wide(rated, f'judge:{args.judge}'))
+        print(f"🗂️  Ratings added to {args.store} as 'judge:{args.judge}'")
+    print(f"📈 {judge.calls} judge calls in {elapsed:.1f}s ({n_rated / max(elapsed, 1e-9) * 60:.0f} cells/min)")
+    if judge.failures:
+        print(f"⚠️  {judge.failures} cells could not be parsed from the judge's replies")
+    print(f"💰 Judge cost: ${judge.cost:.4f}")
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the OpenRouter chat-completions endpoint.
+
+Lets the runner and the LLM judge be exercised offline:
+
+    python mock_openrouter.py --port 8000 &
+    OPENROUTER_URL=http://127.0.0.1:8000/api/v1/chat/completions python llm_judge.py ...
+
+Tutor prompts get a short canned reply (with a scratchpad for CoT prompts),
+judge prompts get deterministic JSON scores derived from each response's
+text, and ``n`` returns several completions. Usage is reported at roughly
+four characters per token.
+
+CoT replies carry on with a fabricated student turn after the tutor
+response, and Phi models leave every fourth scratchpad unclosed, as the
+real models do. ``response_format`` gets a JSON reply, and ``stream``
+sends server-sent events (``--token-delay`` seconds per chunk); a client
+that disconnects stops the stream.
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+JUDGE_ITEM_PATTERN = re.compile(r"^\[(\d+)\]\n(.*?)(?=^\[\d+\]\n|\Z)", re.M | re.S)
+CRITERIA = ['mistake_diagnosis', 'teaching_strategy', 'feedback_quality', 'clarity', 'support']
+
+
+def prompt_text(messages):
+    """Flatten string or content-block messages into one string."""
+    parts = []
+    for message in messages:
+        content = message['content']
+        if isinstance(content, str):
+            parts.append(content)
+        else:
+            parts.extend(block.get('text', '') for block in content)
+    return "".join(parts)
+
+
+def judge_reply(prompt):
+    """Deterministic 1-5 scores per numbered response in a judge prompt."""
+    ratings = []
+    for item_id, text in JUDGE_ITEM_PATTERN.findall(prompt.split('### Tutor responses', 1)[-1]):
+        digest = hashlib.sha256(text.strip().encode()).digest()
+        scores = {criterion: 1 + digest[i] % 5 for i, criterion in enumerate(CRITERIA)}
+        ratings.append(dict(id=int(item_id), **scores))
+    return json.dumps({'ratings': ratings})
+
+
+def tutor_reply(prompt, index, model='', structured=False):
+    if structured:
+        return json.dumps({'scratchpad': "The student needs to check their work.",
+                           'response': f"Good effort! Can you walk me through your steps? ({index})"})
+    if prompt.rstrip().endswith('<scratchpad>'):
+        analysis = "The student needs to check their work. " * 8
+        if 'phi' in model and hashlib.sha256(prompt.encode()).digest()[0] % 4 == 0:
+            return analysis + "Next I would consider the pedagogical strategy. " * 8
+        rambling = "Student: I added first, then multiplied.\nTutor: Let's look at the order of operations.\n" * 4
+        return (f"{analysis}\n</scratchpad>\n"
+                f"Good effort! Can you walk me through your steps? ({index})\n{rambling}")
+    return f"Good effort! What do you think the first step should be? ({index})"
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    token_delay = 0.0
+    
+    def log_message(self, *args):
+        pass
+    
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        prompt = prompt_text(body.get('messages', []))
+        n = body.get('n', 1)
+        if self.latency:
+            time.sleep(self.latency)
+        
+        if '"ratings"' in prompt:
+            contents = [judge_reply(prompt)] * n
+        else:
+            contents = [tutor_reply(prompt, i, body.get('model', ''), 'response_format' in body) for i in range(n)]
+        usage = {
+            'prompt_tokens': len(prompt) // 4,
+            'completion_tokens': sum(len(content) for content in contents) // 4,
+            'prompt_tokens_details': {'cached_tokens': 0}
+        }
+        if body.get('stream'):
+            self.stream(body, contents[0], usage)
+            return
+        payload = json.dumps({
+            'id': 'mock',
+            'model': body.get('model'),
+            'choices': [{'index': i, 'message': {'role': 'assistant', 'content': content},
+                         'finish_reason': 'stop'} for i, content in enumerate(contents)],
+            'usage': usage
+        }).encode()
+        
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+    
+    def stream(self, body, content, usage):
+        """Send ``content`` as server-sent events in 16-character deltas, then usage."""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+        chunks = [{'choices': [{'index': 0, 'delta': {'content': content[i:i + 16]}}]}
+                  for i in range(0, len(content), 16)]
+        chunks.append({'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}], 'usage': usage})
+        try:
+            self.wfile.write(b': OPENROUTER PROCESSING\n\n')
+            for chunk in chunks:
+                if self.token_delay:
+                    time.sleep(self.token_delay)
+                self.wfile.write(f"data: {json.dumps(dict(chunk, model=body.get('model')))}\n\n".encode())
+                self.wfile.flush()
+            self.wfile.write(b'data: [DONE]\n\n')
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def start_server(port=8000, latency=0.0, token_delay=0.0):
+    """Serve in a background thread; returns the server (call ``shutdown()``)."""
+    handler = type('Handler', (MockHandler,), {'latency': latency, 'token_delay': token_delay})
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a mock OpenRouter endpoint.")
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds to wait per request")
+    parser.add_argument('--token-delay', type=float, default=0.0, help="seconds between streamed chunks")
+    args = parser.parse_args()
+    
+    server = ThreadingHTTPServer(('127.0.0.1', args.port),
+                                 type('Handler', (MockHandler,), {'latency': args.latency,
+                                                                  'token_delay': args.token_delay}))
+    print(f"🧪 Mock OpenRouter on http://127.0.0.1:{args.port}/api/v1/chat/completions")
+    server.serve_forever()
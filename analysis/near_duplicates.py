@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+MinHash / LSH near-duplicate detection across tutor responses.
+
+Every response is reduced to a set of hashed word shingles, sketched with
+``num_perm`` MinHash values and bucketed by LSH bands. Cells that share a
+bucket and whose estimated Jaccard similarity clears the threshold are
+merged into clusters with union-find, so the work grows roughly linearly
+with the number of responses instead of comparing every pair.
+
+All shingle hashing and MinHash computation runs as NumPy array operations
+over the concatenated shingles of every response at once.
+"""
+
+import argparse
+import re
+
+import numpy as np
+import pandas as pd
+
+from blob_store import read_results
+from response_features import KEYS, long_responses, ratings_long
+from run_registry import blobs_for
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+MASK_32 = np.uint64(0xFFFFFFFF)
+
+
+def shingle_hashes(texts, k=3):
+    """Concatenated 64-bit hashes of every word k-gram, plus per-text offsets.
+    
+    Texts shorter than ``k`` words contribute one shingle of all their words.
+    """
+    vocabulary = {}
+    word_ids = []
+    lengths = np.zeros(len(texts), dtype=np.int64)
+    for i, text in enumerate(texts):
+        ids = [vocabulary.setdefault(word, len(vocabulary) + 1)
+               for word in WORD_PATTERN.findall(str(text).lower())]
+        word_ids.append(ids)
+        lengths[i] = len(ids)
+    
+    flat = np.fromiter((w for ids in word_ids for w in ids), dtype=np.uint64, count=int(lengths.sum()))
+    word_starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    n_shingles = np.maximum(lengths - k + 1, np.minimum(lengths, 1))
+    offsets = np.concatenate(([0], np.cumsum(n_shingles)))
+    
+    # position of each shingle's first word in ``flat``
+    doc_of_shingle = np.repeat(np.arange(len(texts)), n_shingles)
+    rank_in_doc = np.arange(offsets[-1]) - offsets[doc_of_shingle]
+    first = word_starts[doc_of_shingle] + rank_in_doc
+    
+    rng = np.random.default_rng(12345)
+    multipliers = rng.integers(1, 2**63, size=k, dtype=np.uint64) | np.uint64(1)
+    hashes = np.zeros(offsets[-1], dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        for j in range(k):
+            position = first + j
+            valid = position < word_starts[doc_of_shingle] + lengths[doc_of_shingle]
+            words = np.where(valid, flat[np.minimum(position, len(flat) - 1)] if len(flat) else 0, 0)
+            hashes = hashes * np.uint64(1099511628211) + words.astype(np.uint64) * multipliers[j]
+    return hashes, offsets
+
+
+def minhash_signatures(hashes, offsets, num_perm=128, seed=1, chunk=1 << 12):
+    """(n_texts x num_perm) MinHash signatures via multiply-shift hashing."""
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 2**63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+    n_texts = len(offsets) - 1
+    signatures = np.full((n_texts, num_perm), np.iinfo(np.uint64).max, dtype=np.uint64)
+    doc_of_shingle = np.repeat(np.arange(n_texts), np.diff(offsets))
+    buffer = np.empty((chunk, num_perm), dtype=np.uint64)
+    
+    with np.errstate(over='ignore'):
+        for start in range(0, len(hashes), chunk):
+            part = hashes[start:start + chunk]
+            permuted = buffer[:len(part)]
+            np.multiply(part[:, None], a, out=permuted)
+            permuted += b
+            permuted >>= np.uint64(32)
+            docs = doc_of_shingle[start:start + chunk]
+            boundaries = np.flatnonzero(np.r_[True, docs[1:] != docs[:-1]])
+            minima = np.minimum.reduceat(permuted, boundaries, axis=0)
+            rows = docs[boundaries]
+            signatures[rows] = np.minimum(signatures[rows], minima)
+    return signatures.astype(np.uint32)
+
+
+def lsh_clusters(signatures, bands=16, threshold=0.8):
+    """Cluster id per text from banded LSH plus similarity verification.
+    
+    Each bucket member is verified against the bucket's first member and
+    joined to it when the estimated Jaccard similarity is at least
+    ``threshold``, which keeps the number of comparisons linear.
+    """
+    n_texts, num_perm = signatures.shape
+    rows_per_band = num_perm // bands
+    parent = np.arange(n_texts)
+    
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+    
+    rng = np.random.default_rng(7)
+    mix = rng.integers(1, 2**63, size=rows_per_band, dtype=np.uint64) | np.uint64(1)
+    for band in range(bands):
+        block = signatures[:, band * rows_per_band:(band + 1) * rows_per_band].astype(np.uint64)
+        with np.errstate(over='ignore'):
+            keys = (block * mix).sum(axis=1)
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        sizes = np.diff(np.r_[starts, len(order)])
+        for start, size in zip(starts[sizes > 1], sizes[sizes > 1]):
+            members = order[start:start + size]
+            head = members[0]
+            similarity = (signatures[members[1:]] == signatures[head]).mean(axis=1)
+            for member in members[1:][similarity >= threshold]:
+                root_a, root_b = find(head), find(member)
+                if root_a != root_b:
+                    parent[max(root_a, root_b)] = min(root_a, root_b)
+    return np.array([find(i) for i in range(n_texts)])
+
+
+def find_near_duplicates(cells, k=3, num_perm=128, bands=16, threshold=0.8, min_shingles=2):
+    """Add ``sketched``, ``cluster`` and ``cluster_size`` columns to a long cell frame.
+    
+    Exact copies are sketched once and always share a cluster. ``ERROR:``
+    placeholders and texts with fewer than ``min_shingles`` shingles (empty
+    or a few words) are not sketched: their shingle sets are empty or
+    trivially equal, so they would merge into one spurious cluster. Each
+    gets a cluster of its own.
+    """
+    text = cells['text'].astype(str)
+    words = text.str.lower().str.count(WORD_PATTERN.pattern).to_numpy()
+    shingles = np.maximum(words - k + 1, np.minimum(words, 1))
+    sketched = (shingles >= min_shingles) & ~text.str.startswith('ERROR:').to_numpy()
+    
+    codes, distinct = pd.factorize(text[sketched])
+    cluster = np.empty(len(cells), dtype=np.int64)
+    if len(distinct):
+        hashes, offsets = shingle_hashes(list(distinct), k)
+        signatures = minhash_signatures(hashes, offsets, num_perm)
+        cluster[sketched] = lsh_clusters(signatures, bands, threshold)[codes]
+    cluster[~sketched] = len(distinct) + np.arange((~sketched).sum())
+    
+    cells = cells.copy()
+    cells['sketched'] = sketched
+    cells['cluster'] = cluster
+    cells['cluster_size'] = cells.groupby('cluster')['cluster'].transform('size')
+    return cells
+
+
+def duplicate_report(cells):
+    """Duplicate rates per (experiment, model).
+    
+    ``duplicate_rate`` counts any near-duplicate; ``cross_model_rate`` only
+    those matching another model's response to the same dialogue and
+    ``cross_dialogue_rate`` those reused for a different dialogue.
+    """
+    cells = cells.copy()
+    cluster_models = cells.groupby(['cluster', 'test_id'])['model'].transform('nunique')
+    cluster_dialogues = cells.groupby('cluster')['test_id'].transform('nunique')
+    cells['is_duplicate'] = cells['cluster_size'] > 1
+    cells['cross_model'] = cluster_models > 1
+    cells['cross_dialogue'] = cluster_dialogues > 1
+    return cells.groupby(['experiment', 'model']).agg(
+        responses=('cluster', 'size'),
+        duplicate_rate=('is_duplicate', 'mean'),
+        cross_model_rate=('cross_model', 'mean'),
+        cross_dialogue_rate=('cross_dialogue', 'mean')
+    ).reset_index()
+
+
+def dedup_weights(cells):
+    """Weight 1 / (copies within the same experiment and model) per cell."""
+    copies = cells.groupby(['experiment', 'model', 'cluster'])['cluster'].transform('size')
+    return 1.0 / copies
+
+
+def dedup_aware_ratings(cells, ratings):
+    """Plain and dedup-weighted mean rating per (experiment, model).
+    
+    Near-identical responses within a combination count once in total, and
+    ``duplicate_rating_std`` shows how consistently raters scored copies of
+    the same response.
+    """
+    table = cells.merge(ratings, on=KEYS, how='inner').dropna(subset=['rating'])
+    table['weight'] = dedup_weights(table)
+    table['weighted'] = table['rating'] * table['weight']
+    summary = table.groupby(['experiment', 'model']).agg(
+        mean_rating=('rating', 'mean'),
+        weighted_sum=('weighted', 'sum'),
+        weight_total=('weight', 'sum')
+    )
+    summary['dedup_mean_rating'] = summary['weighted_sum'] / summary['weight_total']
+    summary['effective_n'] = summary['weight_total']
+    spread = table[table['cluster_size'] > 1].groupby('cluster')['rating'].std()
+    summary = summary.drop(columns=['weighted_sum', 'weight_total']).reset_index()
+    summary.attrs['duplicate_rating_std'] = float(spread.mean()) if len(spread) else float('nan')
+    return summary
+
+
+def dedup_cells_for(df, threshold=0.8, min_shingles=2):
+    """Cluster every response in a wide results/evaluation frame."""
+    return find_near_duplicates(long_responses(df), threshold=threshold, min_shingles=min_shingles)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find near-duplicate tutor responses.")
+    parser.add_argument('results_csv', nargs='?', default='TutoringExperiment_evaluation_20250719.csv')
+    parser.add_argument('--threshold', type=float, default=0.8, help="Jaccard similarity for a duplicate")
+    parser.add_argument('--min-shingles', type=int, default=2,
+                        help="leave out responses with fewer word 3-gram shingles (empty or a few words)")
+    parser.add_argument('--output', default='near_duplicate_clusters.csv')
+    parser.add_argument('--blobs',
+                        help="blob file holding the text of an offset-only results CSV (default: the registered run's)")
+    args = parser.parse_args()
+    
+    df = read_results(args.results_csv, args.blobs or blobs_for(args.results_csv))
+    cells = dedup_cells_for(df, args.threshold, args.min_shingles)
+    report = duplicate_report(cells)
+    
+    sketched = cells['sketched']
+    print(f"Sketched {sketched.sum()} responses, {cells.loc[sketched, 'cluster'].nunique()} distinct clusters "
+          f"({(~sketched).sum()} empty, short or error responses left out)")
+    print(f"\n🧬 NEAR-DUPLICATE RATES (Jaccard ≥ {args.threshold})")
+    print(report.round(3).to_string(index=False))
+    
+    ratings = ratings_long(df)
+    if ratings['rating'].notna().any():
+        summary = dedup_aware_ratings(cells, ratings)
+        print(f"\n⚖️  DEDUP-AWARE MEAN RATINGS")
+        print(summary.round(3).to_string(index=False))
+        print(f"Rating std among near-duplicate copies: {summary.attrs['duplicate_rating_std']:.2f}")
+    
+    cells.drop(columns=['text']).to_csv(args.output, index=False)
+    print(f"\n✅ Saved {args.output}")
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Paired comparison of (approach, model) combinations on shared dialogues.
+
+Every combination is rated on the same dialogues, so each dialogue gives a
+win, tie or loss for every pair of combinations. The counts are built as
+matrix products over one-hot rating levels: with ``H[d, c, a] = 1`` when
+combination ``c`` got level ``a`` on dialogue ``d`` and ``L[d, c, a] = 1``
+when it got less than ``a``, wins are ``H @ L.T`` and ties ``H @ H.T``
+summed over dialogues and levels.
+
+Dialogues are grouped into blocks and a win/tie matrix is kept per block, so
+bootstrap replicates (resampling blocks of dialogues) are one more matrix
+product instead of a recount. Bradley–Terry strengths are fitted with the MM
+algorithm for all replicates at once and reported on an Elo-like scale.
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from response_features import ratings_long
+
+ELO_SCALE = 400 / np.log(10)
+ELO_BASE = 1500
+MAX_BLOCKS = 1000
+
+
+def rating_matrix(df):
+    """(dialogues x combinations) rating array and the combination labels."""
+    ratings = ratings_long(df)
+    table = ratings.pivot_table(index='test_id', columns=['experiment', 'model'], values='rating')
+    table = table.dropna(axis=1, how='all')
+    return table.to_numpy(dtype=float), list(table.columns)
+
+
+def block_counts(ratings, n_blocks=None):
+    """Per-block win and tie matrices, each (blocks x C x C).
+
+    ``wins[k, i, j]`` counts dialogues in block ``k`` where ``i`` was rated
+    above ``j``; dialogues where either is unrated are skipped.
+    """
+    n_dialogues, n_combos = ratings.shape
+    n_blocks = n_blocks or min(n_dialogues, MAX_BLOCKS)
+    block_size = -(-n_dialogues // n_blocks)
+    padded = np.full((n_blocks * block_size, n_combos), np.nan)
+    padded[:n_dialogues] = ratings
+
+    levels = np.unique(ratings[~np.isnan(ratings)])
+    wins = np.zeros((n_blocks, n_combos, n_combos))
+    ties = np.zeros((n_blocks, n_combos, n_combos))
+    # bound the one-hot temporaries to roughly 64 MB
+    step = max(1, int(8e6 // max(block_size * n_combos * len(levels), 1)))
+    for start in range(0, n_blocks, step):
+        chunk = padded[start * block_size:(start + step) * block_size]
+        blocks = len(chunk) // block_size
+        at = (chunk[:, :, None] == levels).astype(np.float32)
+        below = (chunk[:, :, None] < levels).astype(np.float32)
+        # (blocks, C, block_size * levels)
+        at = at.reshape(blocks, block_size, n_combos, -1).transpose(0, 2, 1, 3).reshape(blocks, n_combos, -1)
+        below = below.reshape(blocks, block_size, n_combos, -1).transpose(0, 2, 1, 3).reshape(blocks, n_combos, -1)
+        wins[start:start + blocks] = at @ below.transpose(0, 2, 1)
+        ties[start:start + blocks] = at @ at.transpose(0, 2, 1)
+    index = np.arange(n_combos)
+    ties[:, index, index] = 0
+    return wins, ties
+
+
+def fit_bradley_terry(wins, ties, iterations=500, tol=1e-9, prior=0.1):
+    """Log-strengths for one (C x C) or many (B x C x C) comparison matrices.
+
+    Ties count as half a win for each side; ``prior`` adds that many virtual
+    wins in each direction so combinations that never win stay finite.
+    """
+    scores = wins + 0.5 * ties + prior
+    n_combos = scores.shape[-1]
+    index = np.arange(n_combos)
+    scores[..., index, index] = 0
+    games = scores + np.swapaxes(scores, -1, -2)
+    won = scores.sum(axis=-1)
+    strength = np.ones(scores.shape[:-1])
+    for _ in range(iterations):
+        pair_sum = strength[..., :, None] + strength[..., None, :]
+        updated = won / (games / pair_sum).sum(axis=-1)
+        updated /= np.exp(np.log(updated).mean(axis=-1, keepdims=True))
+        converged = np.abs(updated - strength).max() < tol
+        strength = updated
+        if converged:
+            break
+    return np.log(strength)
+
+
+def rank(df, n_bootstrap=200, seed=0, confidence=0.95):
+    """Bradley–Terry ranking table and pairwise win-rate matrix.
+
+    Returns ``(ranking, win_rate)``; ``win_rate[i][j]`` is the share of shared
+    dialogues where ``i`` beat ``j``, counting ties as half.
+    """
+    ratings, combos = rating_matrix(df)
+    wins, ties = block_counts(ratings)
+    total_wins, total_ties = wins.sum(axis=0), ties.sum(axis=0)
+    log_strength = fit_bradley_terry(total_wins, total_ties)
+
+    rng = np.random.default_rng(seed)
+    n_blocks = len(wins)
+    resamples = rng.multinomial(n_blocks, np.full(n_blocks, 1 / n_blocks), size=n_bootstrap).astype(float)
+    boot_wins = (resamples @ wins.reshape(n_blocks, -1)).reshape(n_bootstrap, *total_wins.shape)
+    boot_ties = (resamples @ ties.reshape(n_blocks, -1)).reshape(n_bootstrap, *total_ties.shape)
+    boot = fit_bradley_terry(boot_wins, boot_ties)
+    alpha = (1 - confidence) / 2
+    low, high = np.quantile(boot, [alpha, 1 - alpha], axis=0)
+
+    labels = [f'{approach}_{model}' for approach, model in combos]
+    ranking = pd.DataFrame({
+        'approach': [approach for approach, _ in combos],
+        'model': [model for _, model in combos],
+        'mean_rating': np.nanmean(ratings, axis=0),
+        'elo': ELO_BASE + ELO_SCALE * log_strength,
+        'elo_low': ELO_BASE + ELO_SCALE * low,
+        'elo_high': ELO_BASE + ELO_SCALE * high,
+        'win_rate': ((total_wins + 0.5 * total_ties).sum(axis=1)
+                     / np.maximum((total_wins + total_wins.T + total_ties).sum(axis=1), 1))
+    }).sort_values('elo', ascending=False).reset_index(drop=True)
+
+    played = total_wins + total_wins.T + total_ties
+    with np.errstate(invalid='ignore'):
+        win_rate = pd.DataFrame((total_wins + 0.5 * total_ties) / played, index=labels, columns=labels)
+    return ranking, win_rate
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rank combinations by paired wins on shared dialogues.")
+    parser.add_argument('results_csv', nargs='?', default='TutoringExperiment_evaluation_20250719.csv')
+    parser.add_argument('--bootstrap', type=int, default=1000, help="bootstrap replicates for the CIs")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='pairwise_ranking.csv')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    ranking, win_rate = rank(pd.read_csv(args.results_csv), args.bootstrap, args.seed)
+    elapsed = time.perf_counter() - started
+
+    print(f"\n🥊 BRADLEY–TERRY RANKING ({args.bootstrap} bootstrap replicates, 95% CI)")
+    for _, row in ranking.iterrows():
+        print(f"  {row['approach']:<10} {row['model']:<13} Elo {row['elo']:6.0f} "
+              f"[{row['elo_low']:4.0f}, {row['elo_high']:4.0f}]  win rate {row['win_rate']:.2f}  "
+              f"mean rating {row['mean_rating']:.2f}")
+
+    print(f"\n📊 PAIRWISE WIN RATE (row beats column, ties count half)")
+    print(win_rate.round(2).to_string())
+
+    ranking.to_csv(args.output, index=False)
+    print(f"\n✅ Ranked {len(ranking)} combinations in {elapsed:.2f}s; saved {args.output}")
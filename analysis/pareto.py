@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Quality, cost and latency trade-offs per (approach, model, subject).
+
+``mean_rating / mean_cost`` rewards whatever is cheapest and ignores how long
+a student waits, so this module keeps the three objectives separate: mean
+rating (higher is better), cost per 1k sessions under a pricing scenario and
+p95 latency (both lower is better). A combination is on the Pareto set of
+its (scenario, subject) group when no other combination is at least as good
+on all three and strictly better on one.
+
+Metrics are computed as (scenarios x subjects x combinations) arrays, so
+dominance checks and constraint queries such as "best quality under $X per
+1k sessions with p95 < Y s" are broadcasts over every group, budget and
+latency limit at once.
+
+Runs recorded before ``_latency`` columns existed get latency estimated from
+output tokens with ``preflight.LATENCY_PROFILES``; those cells are listed in
+``df.attrs['estimated_latency']``.
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from pricing import DEFAULT_SCENARIO, PRICING, billed_token_arrays, cell_columns, estimate_token_columns, \
+    load_scenarios, price_vectors
+
+ALL_SUBJECTS = 'All subjects'
+
+
+def estimate_latency_columns(df):
+    """Add estimated ``_latency`` columns for cells that have none."""
+    import preflight
+
+    df = df.copy()
+    estimated = []
+    for experiment, model in cell_columns(df):
+        column = f'{experiment}_{model}_latency'
+        if column in df.columns:
+            continue
+        profile = preflight.LATENCY_PROFILES.get(model, preflight.DEFAULT_LATENCY)
+        outputs = pd.to_numeric(df[f'{experiment}_{model}_output_tokens'], errors='coerce')
+        df[column] = profile['first_token_s'] + outputs / profile['tokens_per_s']
+        estimated.append((experiment, model))
+    df.attrs['estimated_latency'] = estimated
+    return df
+
+
+def _dominated(quality, cost, latency):
+    """Boolean mask of points dominated within their group; inputs are (..., C)."""
+    q_i, q_j = quality[..., :, None], quality[..., None, :]
+    c_i, c_j = cost[..., :, None], cost[..., None, :]
+    l_i, l_j = latency[..., :, None], latency[..., None, :]
+    # [i, j]: i is at least as good everywhere and strictly better somewhere
+    dominates = (q_i >= q_j) & (c_i <= c_j) & (l_i <= l_j) & ((q_i > q_j) | (c_i < c_j) | (l_i < l_j))
+    return dominates.any(axis=-2)
+
+
+def combination_metrics(df, scenarios=(DEFAULT_SCENARIO,), percentile=95):
+    """One row per (scenario, subject, approach, model) with a ``pareto`` flag.
+
+    Costs are recomputed from billed token counts under every scenario;
+    subjects come from ``math_level`` plus an ``ALL_SUBJECTS`` group.
+    """
+    df = df[df['test_id'].astype(str) != 'EVALUATION_CRITERIA']
+    df = estimate_latency_columns(estimate_token_columns(df))
+    cells = [(e, m) for e, m in cell_columns(df) if f'{e}_{m}_rating' in df.columns]
+
+    # rows sorted by subject so every group is a contiguous slice
+    codes, subjects = pd.factorize(df['math_level'].fillna('Unknown'), sort=True)
+    order = np.argsort(codes, kind='stable')
+    starts = np.searchsorted(codes[order], np.arange(len(subjects)))
+    slices = [slice(None)] + [slice(start, end) for start, end in zip(starts, list(starts[1:]) + [len(order)])]
+
+    ratings = np.column_stack([pd.to_numeric(df[f'{e}_{m}_rating'], errors='coerce') for e, m in cells])[order]
+    latency = np.column_stack([pd.to_numeric(df[f'{e}_{m}_latency'], errors='coerce') for e, m in cells])[order]
+    inputs, outputs = billed_token_arrays(df, cells)
+    input_prices, output_prices = price_vectors(scenarios, cells)
+    # (scenarios, rows, cells)
+    costs = (inputs[order][None] * input_prices[:, None] + outputs[order][None] * output_prices[:, None]) / 1000
+    # only sessions that produced a rated answer count towards a group
+    valid = ~np.isnan(ratings)
+    costs = np.where(valid, costs, np.nan)
+    latency = np.where(valid, latency, np.nan)
+
+    shape = (len(scenarios), len(slices), len(cells))
+    n = np.zeros(shape[1:])
+    quality = np.full(shape[1:], np.nan)
+    p50 = np.full(shape[1:], np.nan)
+    p95 = np.full(shape[1:], np.nan)
+    cost = np.full(shape, np.nan)
+    with np.errstate(invalid='ignore'):
+        for g, rows in enumerate(slices):
+            count = valid[rows].sum(axis=0)
+            n[g] = count
+            has = count > 0
+            quality[g, has] = np.nanmean(ratings[rows][:, has], axis=0)
+            p50[g, has], p95[g, has] = np.nanpercentile(latency[rows][:, has], [50, percentile], axis=0)
+            cost[:, g, has] = np.nanmean(costs[:, rows][:, :, has], axis=1) * 1000
+
+    quality_grid = np.broadcast_to(quality, shape)
+    latency_grid = np.broadcast_to(p95, shape)
+    pareto = ~_dominated(quality_grid, cost, latency_grid) & ~np.isnan(quality_grid)
+
+    index = pd.MultiIndex.from_product([list(scenarios), [ALL_SUBJECTS, *subjects], cells],
+                                       names=['scenario', 'subject', 'cell'])
+    metrics = pd.DataFrame({
+        'n': np.broadcast_to(n, shape).ravel(),
+        'mean_rating': quality_grid.ravel(),
+        'cost_per_1k_sessions': cost.ravel(),
+        'p50_latency': np.broadcast_to(p50, shape).ravel(),
+        f'p{percentile}_latency': latency_grid.ravel(),
+        'pareto': pareto.ravel()
+    }, index=index).reset_index()
+    metrics.insert(2, 'approach', [e for e, _ in metrics['cell']])
+    metrics.insert(3, 'model', [m for _, m in metrics['cell']])
+    metrics = metrics.drop(columns='cell')
+    metrics['n'] = metrics['n'].astype(int)
+    metrics.attrs['estimated_latency'] = df.attrs['estimated_latency']
+    return metrics
+
+
+def best_under(metrics, budgets, latency_limits, latency='p95_latency'):
+    """Best-rated combination for every (scenario, subject, budget, latency limit).
+
+    ``budgets`` are USD per 1k sessions and ``latency_limits`` seconds on the
+    ``latency`` column. Ties on rating go to the cheaper combination; groups
+    where nothing fits get an empty approach and model.
+    """
+    grid = metrics.set_index(['scenario', 'subject', 'approach', 'model'])
+    grid = grid[['mean_rating', 'cost_per_1k_sessions', latency]].unstack(['approach', 'model'])
+    combos = grid['mean_rating'].columns
+    quality = grid['mean_rating'].to_numpy()
+    cost = grid['cost_per_1k_sessions'][combos].to_numpy()
+    slow = grid[latency][combos].to_numpy()
+    budgets = np.asarray(budgets, dtype=float)
+    latency_limits = np.asarray(latency_limits, dtype=float)
+
+    # cheapest first, so argmax breaks rating ties in favour of cost
+    order = np.argsort(np.where(np.isnan(cost), np.inf, cost), axis=1)
+    quality, cost, slow = (np.take_along_axis(values, order, axis=1) for values in (quality, cost, slow))
+    # (groups, combinations, budgets, limits)
+    feasible = ((cost[:, :, None, None] <= budgets[:, None]) & (slow[:, :, None, None] <= latency_limits)
+                & ~np.isnan(quality)[:, :, None, None])
+    best = np.where(feasible, quality[:, :, None, None], -np.inf).argmax(axis=1)
+    found = feasible.any(axis=1)
+
+    groups = np.repeat(np.arange(len(grid)), len(budgets) * len(latency_limits))
+    choice = best.ravel()
+    picked = order[groups, choice]
+    hit = found.ravel()
+    result = pd.DataFrame({
+        'scenario': grid.index.get_level_values('scenario')[groups],
+        'subject': grid.index.get_level_values('subject')[groups],
+        'max_cost_per_1k_sessions': np.tile(np.repeat(budgets, len(latency_limits)), len(grid)),
+        f'max_{latency}': np.tile(latency_limits, len(grid) * len(budgets)),
+        'approach': np.where(hit, combos.get_level_values('approach')[picked], ''),
+        'model': np.where(hit, combos.get_level_values('model')[picked], ''),
+        'mean_rating': np.where(hit, quality[groups, choice], np.nan),
+        'cost_per_1k_sessions': np.where(hit, cost[groups, choice], np.nan),
+        latency: np.where(hit, slow[groups, choice], np.nan)
+    })
+    return result
+
+
+def plot_frontiers(metrics, path, scenario=DEFAULT_SCENARIO, latency='p95_latency'):
+    """Cost vs rating per subject, coloured by latency, with the Pareto set outlined."""
+    import matplotlib.pyplot as plt
+
+    data = metrics[(metrics['scenario'] == scenario) & metrics['mean_rating'].notna()]
+    subjects = list(dict.fromkeys(data['subject']))
+    columns = min(3, len(subjects))
+    rows = -(-len(subjects) // columns)
+    fig, axes = plt.subplots(rows, columns, figsize=(6 * columns, 5 * rows), squeeze=False)
+    norm = plt.Normalize(data[latency].min(), data[latency].max())
+
+    for ax, subject in zip(axes.flat, subjects):
+        group = data[data['subject'] == subject]
+        points = ax.scatter(group['cost_per_1k_sessions'], group['mean_rating'], c=group[latency],
+                            cmap='viridis_r', norm=norm, s=80, alpha=0.85)
+        front = group[group['pareto']].sort_values('cost_per_1k_sessions')
+        ax.scatter(front['cost_per_1k_sessions'], front['mean_rating'], s=180, facecolors='none',
+                   edgecolors='crimson', linewidths=1.5, label='Pareto set')
+        ax.step(front['cost_per_1k_sessions'], front['mean_rating'].cummax(), where='post',
+                color='crimson', alpha=0.5)
+        for _, row in group.iterrows():
+            ax.annotate(f"{row['approach'][:3]}+{row['model'][:3]}",
+                        (row['cost_per_1k_sessions'], row['mean_rating']),
+                        xytext=(5, 5), textcoords='offset points', fontsize=7)
+        ax.set_xscale('log')
+        ax.set_title(f"{subject} (n={group['n'].max()})")
+        ax.set_xlabel('Cost per 1k sessions ($, log scale)')
+        ax.set_ylabel('Mean rating')
+        ax.grid(True, alpha=0.3)
+        ax.legend(loc='lower right', fontsize=8)
+    for ax in axes.flat[len(subjects):]:
+        ax.set_visible(False)
+
+    fig.colorbar(points, ax=axes, label=f"{latency.replace('_', ' ')} (s)")
+    fig.suptitle(f'Quality / cost / latency frontier ({scenario})')
+    fig.savefig(path, dpi=200, bbox_inches='tight')
+    plt.close(fig)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pareto analysis of rating, cost and latency.")
+    parser.add_argument('results_csv', nargs='?', default='TutoringExperiment_evaluation_20250719.csv')
+    parser.add_argument('--scenario', action='append',
+                        help="pricing scenario (repeatable); defaults to all known scenarios")
+    parser.add_argument('--pricing-file', help="JSON file with extra scenarios")
+    parser.add_argument('--budget', type=float, action='append',
+                        help="max USD per 1k sessions for the query (repeatable)")
+    parser.add_argument('--max-p95', type=float, action='append',
+                        help="max p95 latency in seconds for the query (repeatable)")
+    parser.add_argument('--output', default='pareto_metrics.csv')
+    parser.add_argument('--plot', default='pareto_frontier.png', help="frontier plot for the first scenario")
+    args = parser.parse_args()
+
+    if args.pricing_file:
+        load_scenarios(args.pricing_file)
+    scenarios = args.scenario or list(PRICING)
+
+    metrics = combination_metrics(pd.read_csv(args.results_csv), scenarios)
+    if metrics.attrs['estimated_latency']:
+        print(f"ℹ️  Latency estimated from output tokens for {len(metrics.attrs['estimated_latency'])} cells")
+
+    for scenario in scenarios:
+        front = metrics[(metrics['scenario'] == scenario) & (metrics['subject'] == ALL_SUBJECTS)
+                        & metrics['pareto']].sort_values('cost_per_1k_sessions')
+        print(f"\n⚖️  PARETO SET — {scenario}, {ALL_SUBJECTS.lower()}")
+        for _, row in front.iterrows():
+            print(f"  {row['approach']:<10} {row['model']:<13} rating {row['mean_rating']:.2f}  "
+                  f"${row['cost_per_1k_sessions']:8.3f}/1k sessions  p95 {row['p95_latency']:5.2f}s")
+
+    if args.budget or args.max_p95:
+        answers = best_under(metrics, args.budget or [np.inf], args.max_p95 or [np.inf])
+        print(f"\n🎯 BEST UNDER CONSTRAINTS")
+        for _, row in answers[answers['subject'] == ALL_SUBJECTS].iterrows():
+            choice = (f"{row['approach']} + {row['model']} (rating {row['mean_rating']:.2f}, "
+                      f"${row['cost_per_1k_sessions']:.3f}/1k, p95 {row['p95_latency']:.2f}s)"
+                      if row['model'] else 'nothing fits')
+            print(f"  {row['scenario']}: ≤ ${row['max_cost_per_1k_sessions']:g}/1k, "
+                  f"p95 ≤ {row['max_p95_latency']:g}s → {choice}")
+        answers.to_csv(args.output.replace('.csv', '_queries.csv'), index=False)
+
+    metrics.to_csv(args.output, index=False)
+    plot_frontiers(metrics, args.plot, scenarios[0])
+    print(f"\n✅ Saved {args.output} and {args.plot}")
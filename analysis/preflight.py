@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Pre-flight cost and latency planner for tutoring experiment runs.
+
+Counts prompt tokens locally (tiktoken when its encodings are available,
+otherwise a characters-per-token estimate), predicts output tokens from the
+per-(experiment, model) distribution of a previous run, and turns both into
+cost and wall-clock estimates for a given concurrency. Prompts whose input
+plus ``max_tokens`` would not fit a model's context window are flagged.
+
+Template text is tokenized once per cell and each conversation once per
+encoding, so planning 100k dialogues takes seconds rather than rendering and
+tokenizing 900k full prompts.
+"""
+
+import argparse
+import json
+
+import numpy as np
+import pandas as pd
+
+# Encodings used for token counting. Only GPT-4o Mini's is exact; the others
+# are close approximations for models whose tokenizers are not available.
+TOKENIZERS = {
+    'gpt4o_mini': 'o200k_base',
+    'claude_haiku': 'cl100k_base',
+    'phi3_mini': 'cl100k_base'
+}
+CHARS_PER_TOKEN = 4.0
+CHAT_OVERHEAD_TOKENS = 7
+DEFAULT_OUTPUT_TOKENS = 250
+
+# Typical OpenRouter latency: time to first token and decode speed.
+LATENCY_PROFILES = {
+    'phi3_mini': {'first_token_s': 0.6, 'tokens_per_s': 60.0},
+    'claude_haiku': {'first_token_s': 0.8, 'tokens_per_s': 65.0},
+    'gpt4o_mini': {'first_token_s': 0.5, 'tokens_per_s': 80.0}
+}
+DEFAULT_LATENCY = {'first_token_s': 1.0, 'tokens_per_s': 50.0}
+
+
+class TokenCounter:
+    """Count tokens with a tiktoken encoding, or estimate from characters."""
+    
+    _cache = {}
+    
+    def __init__(self, encoding_name):
+        self.encoding = self._load(encoding_name)
+        self.name = encoding_name if self.encoding else f"~{CHARS_PER_TOKEN:g} chars/token"
+    
+    @classmethod
+    def _load(cls, encoding_name):
+        if encoding_name not in cls._cache:
+            try:
+                import tiktoken
+                cls._cache[encoding_name] = tiktoken.get_encoding(encoding_name)
+            except Exception:
+                # not installed, or encodings cannot be downloaded offline
+                cls._cache[encoding_name] = None
+        return cls._cache[encoding_name]
+    
+    def count(self, text):
+        return int(self.count_many([text])[0])
+    
+    def count_many(self, texts):
+        """Token counts for a list of strings as an int array."""
+        if self.encoding is None:
+            lengths = np.fromiter((len(text) for text in texts), dtype=np.int64, count=len(texts))
+            return np.ceil(lengths / CHARS_PER_TOKEN).astype(np.int64)
+        encoded = self.encoding.encode_ordinary_batch(list(texts), num_threads=8)
+        return np.fromiter((len(tokens) for tokens in encoded), dtype=np.int64, count=len(encoded))
+
+
+def counter_for(model_key):
+    return TokenCounter(TOKENIZERS.get(model_key, 'cl100k_base'))
+
+
+def output_token_history(results_df, experiments, model_keys, blob_path=None):
+    """Observed output-token counts per (experiment, model) from a past run.
+    
+    Uses ``*_output_tokens`` columns when the run recorded them, otherwise
+    tokenizes the stored ``*_response`` text (read from ``blob_path`` when
+    stored as offsets).
+    """
+    from blob_store import attach_text
+    
+    rows = results_df[results_df['test_id'].astype(str) != 'EVALUATION_CRITERIA']
+    rows = attach_text(rows, blob_path, [f'{experiment}_{model_key}_response'
+                                         for experiment in experiments for model_key in model_keys
+                                         if f'{experiment}_{model_key}_output_tokens' not in rows.columns])
+    history = {}
+    for experiment in experiments:
+        for model_key in model_keys:
+            tokens_col = f'{experiment}_{model_key}_output_tokens'
+            response_col = f'{experiment}_{model_key}_response'
+            if tokens_col in rows.columns:
+                counts = pd.to_numeric(rows[tokens_col], errors='coerce').dropna().to_numpy()
+            elif response_col in rows.columns:
+                texts = rows[response_col].dropna().astype(str)
+                texts = texts[~texts.str.startswith('ERROR:')]
+                counts = counter_for(model_key).count_many(texts.tolist())
+            else:
+                continue
+            if len(counts):
+                history[(experiment, model_key)] = counts
+    return history
+
+
+def estimate_run(dialogues, spec, conversation_text, history=None, concurrency=1):
+    """Plan the API calls of running ``spec`` on ``dialogues`` without building prompts.
+    
+    ``conversation_text`` renders a dialogue as in ``spec.plan``. Each
+    conversation is tokenized once per encoding and each cell's head and
+    tail once; cells that ``spec.plan`` would serve with one call (same
+    request signature and conversation, deterministic generation) count it
+    once, under the first of them. Returns (plan, flagged): one plan row per
+    cell that makes calls and a DataFrame of prompts that would overflow the
+    model's context window.
+    """
+    conversations = [conversation_text(dialogue) for dialogue in dialogues]
+    test_ids = np.asarray([dialogue.get('test_id') for dialogue in dialogues], dtype=object)
+    first = {}
+    for i, conversation in enumerate(conversations):
+        first.setdefault(conversation, i)
+    distinct = np.fromiter(first.values(), dtype=np.int64, count=len(first))
+    everyone = np.arange(len(conversations))
+    conversation_tokens = {}
+    owners = {}
+    plan = []
+    flagged = []
+    for strategy, model_key, signature, deterministic, (head, tail), generation in spec.request_cells():
+        if deterministic and signature in owners:
+            owners[signature]['cells'] += len(conversations)
+            continue
+        counter = counter_for(model_key)
+        if counter.name not in conversation_tokens:
+            conversation_tokens[counter.name] = counter.count_many(conversations)
+        fixed = counter.count(head) + counter.count(tail) + CHAT_OVERHEAD_TOKENS
+        rows = distinct if deterministic else everyone
+        row = _estimate_cell(strategy, model_key, spec.models[model_key], counter,
+                             conversation_tokens[counter.name][rows] + fixed, len(rows), test_ids[rows],
+                             history or {}, generation['max_tokens'], flagged)
+        row['cells'] = len(conversations)
+        if deterministic:
+            owners[signature] = row
+        plan.append(row)
+    return _finish(plan, flagged, concurrency)
+
+
+def _estimate_cell(experiment, model_key, config, counter, input_tokens, n, test_ids, history, max_tokens, flagged):
+    """Plan row for ``n`` calls of one (experiment, model); overflowing prompts go to ``flagged``."""
+    observed = history.get((experiment, model_key))
+    if observed is not None:
+        out_mean = float(np.mean(observed))
+        out_p95 = float(np.percentile(observed, 95))
+    else:
+        out_mean = out_p95 = float(DEFAULT_OUTPUT_TOKENS)
+    out_mean = min(out_mean, max_tokens)
+    
+    cost = (input_tokens.sum() / 1000 * config['cost_per_1k_input'] +
+            n * out_mean / 1000 * config['cost_per_1k_output'])
+    latency = LATENCY_PROFILES.get(model_key, DEFAULT_LATENCY)
+    call_seconds = latency['first_token_s'] + out_mean / latency['tokens_per_s']
+    
+    context = config.get('context_window')
+    if context:
+        over = np.flatnonzero(input_tokens + max_tokens > context)
+        flagged.extend({'test_id': test_ids[i], 'experiment': experiment, 'model': model_key,
+                        'input_tokens': int(input_tokens[i]), 'context_window': context}
+                       for i in over)
+    
+    return {
+        'experiment': experiment,
+        'model': model_key,
+        'tokenizer': counter.name,
+        'prompts': n,
+        'input_tokens': int(input_tokens.sum()),
+        'max_input_tokens': int(input_tokens.max()) if n else 0,
+        'expected_output_tokens': out_mean * n,
+        'p95_output_tokens': out_p95,
+        'output_history': observed is not None,
+        'cost': cost,
+        'call_seconds': call_seconds,
+        'serial_seconds': call_seconds * n
+    }
+
+
+def _finish(plan, flagged, concurrency):
+    plan = pd.DataFrame(plan)
+    plan.attrs['wall_clock_seconds'] = plan['serial_seconds'].sum() / max(concurrency, 1) if len(plan) else 0.0
+    plan.attrs['concurrency'] = concurrency
+    return plan, pd.DataFrame(flagged, columns=['test_id', 'experiment', 'model', 'input_tokens', 'context_window'])
+
+
+def print_plan(plan, flagged):
+    """Print the plan in the runner's report style."""
+    print(f"\n📊 PRE-FLIGHT ESTIMATE")
+    print(plan[['experiment', 'model', 'prompts', 'input_tokens', 'expected_output_tokens', 'cost']]
+          .round({'expected_output_tokens': 0, 'cost': 4}).to_string(index=False))
+    if not plan['output_history'].all():
+        print(f"ℹ️  No output history for some cells - assumed {DEFAULT_OUTPUT_TOKENS} output tokens")
+    print(f"💰 Estimated total cost: ~${plan['cost'].sum():.2f}")
+    minutes = plan.attrs['wall_clock_seconds'] / 60
+    print(f"⏱️  Estimated wall clock: ~{minutes:.1f} min at concurrency {plan.attrs['concurrency']}")
+    if len(flagged):
+        print(f"⚠️  {len(flagged)} prompts exceed a model's context window:")
+        print(flagged.head(10).to_string(index=False))
+
+
+if __name__ == "__main__":
+    from experiment_spec import load_spec
+    from run_experiment import Conversation
+    from run_registry import blobs_for
+    
+    parser = argparse.ArgumentParser(description="Estimate tokens, cost and run time before calling any API.")
+    parser.add_argument('dialogues', nargs='?', default='../comta_evaluation_sample.json')
+    parser.add_argument('--spec', metavar='JSON',
+                        help="experiment spec to plan (default: experiment_spec.json if present)")
+    parser.add_argument('--history', help="previous tutoring_results_*.csv for output-token distributions")
+    parser.add_argument('--blobs', help="blob file holding the text of an offset-only --history file (default: the registered run's)")
+    parser.add_argument('--concurrency', type=int, default=1)
+    args = parser.parse_args()
+    
+    spec = load_spec(args.spec)
+    with open(args.dialogues, 'r') as f:
+        dialogues = json.load(f)
+    history = None
+    if args.history:
+        history = output_token_history(pd.read_csv(args.history), spec.strategy_names(), spec.model_keys(),
+                                       args.blobs or blobs_for(args.history))
+    
+    def conversation_text(dialogue):
+        return Conversation(dialogue.get('full_dialogue', [])).formatted()
+    
+    plan, flagged = estimate_run(dialogues, spec, conversation_text, history, args.concurrency)
+    print(f"✅ Planned {len(dialogues)} dialogues × {len(spec.cells())} cells in {plan['prompts'].sum()} API calls")
+    print_plan(plan, flagged)
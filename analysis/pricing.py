@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Versioned pricing table and retroactive cost recomputation.
+
+Runs store ``{experiment}_{model}_input_tokens`` / ``_output_tokens`` next to
+each ``_cost`` column, so any price scenario can be applied after the fact
+without API calls. Results from before token counts were recorded get them
+estimated from the stored conversation and response text (see
+``estimate_token_columns``).
+
+The stored ``_cost`` is what a call was billed under ``DEFAULT_SCENARIO``, so
+repricing under that scenario keeps it. Other scenarios price token counts
+scaled per call to match it (``billed_token_arrays``): estimated counts and
+cells that shared one call's cost reprice in proportion to the bill.
+"""
+
+import argparse
+import json
+
+import numpy as np
+import pandas as pd
+
+from experiment_spec import EXPERIMENTS
+
+# USD per 1k tokens. Add a new dated entry instead of editing an old one so
+# earlier analyses stay reproducible.
+PRICING = {
+    'openrouter-2025-07-19': {
+        'description': 'OpenRouter list prices used for the July 2025 run',
+        'models': {
+            'phi3_mini': {'input': 0.0001, 'output': 0.0001},
+            'claude_haiku': {'input': 0.0008, 'output': 0.004},
+            'gpt4o_mini': {'input': 0.00015, 'output': 0.0006}
+        }
+    },
+    'batch-discount-2025-07-19': {
+        'description': 'July 2025 prices with the 50% Anthropic/OpenAI batch API discount',
+        'models': {
+            'phi3_mini': {'input': 0.0001, 'output': 0.0001},
+            'claude_haiku': {'input': 0.0004, 'output': 0.002},
+            'gpt4o_mini': {'input': 0.000075, 'output': 0.0003}
+        }
+    }
+}
+DEFAULT_SCENARIO = 'openrouter-2025-07-19'
+
+
+def load_scenarios(path):
+    """Merge extra scenarios from a JSON file shaped like ``PRICING``."""
+    with open(path, 'r') as f:
+        PRICING.update(json.load(f))
+    return PRICING
+
+
+def get_scenario(name):
+    if name not in PRICING:
+        raise KeyError(f"Unknown pricing scenario '{name}'. Available: {', '.join(sorted(PRICING))}")
+    return PRICING[name]
+
+
+def cell_columns(df, experiments=EXPERIMENTS):
+    """(experiment, model) pairs that have both token columns in ``df``."""
+    cells = []
+    for column in df.columns:
+        if not column.endswith('_input_tokens'):
+            continue
+        prefix = column[:-len('_input_tokens')]
+        if f'{prefix}_output_tokens' not in df.columns:
+            continue
+        for experiment in experiments:
+            if prefix.startswith(experiment + '_'):
+                cells.append((experiment, prefix[len(experiment) + 1:]))
+                break
+    return cells
+
+
+def token_arrays(df, cells):
+    """Input and output token counts as (rows x cells) float arrays."""
+    inputs = np.column_stack([pd.to_numeric(df[f'{e}_{m}_input_tokens'], errors='coerce') for e, m in cells])
+    outputs = np.column_stack([pd.to_numeric(df[f'{e}_{m}_output_tokens'], errors='coerce') for e, m in cells])
+    return inputs, outputs
+
+
+def stored_costs(df, cells):
+    """Recorded ``_cost`` values as a (rows x cells) float array, NaN where missing."""
+    return np.column_stack([pd.to_numeric(df[f'{e}_{m}_cost'], errors='coerce') if f'{e}_{m}_cost' in df.columns
+                            else np.full(len(df), np.nan) for e, m in cells])
+
+
+def billed_token_arrays(df, cells, billing=DEFAULT_SCENARIO):
+    """``token_arrays`` scaled per call so that pricing them under ``billing`` gives the stored ``_cost``.
+    
+    Calls without a positive stored cost keep their counts.
+    """
+    inputs, outputs = token_arrays(df, cells)
+    input_prices, output_prices = price_vectors([billing], cells)
+    billed = (inputs * input_prices[0] + outputs * output_prices[0]) / 1000
+    stored = stored_costs(df, cells)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scale = np.where((stored > 0) & (billed > 0), stored / billed, 1.0)
+    return inputs * scale, outputs * scale
+
+
+def price_vectors(scenarios, cells):
+    """Per-1k input and output prices as (scenarios x cells) arrays."""
+    input_prices = np.array([[get_scenario(s)['models'][m]['input'] for _, m in cells] for s in scenarios])
+    output_prices = np.array([[get_scenario(s)['models'][m]['output'] for _, m in cells] for s in scenarios])
+    return input_prices, output_prices
+
+
+def recompute_costs(df, scenario=DEFAULT_SCENARIO):
+    """Return a copy of ``df`` with every ``_cost`` column priced under ``scenario``.
+    
+    Cells without token columns, and stored costs under ``DEFAULT_SCENARIO``,
+    stay as they are; call ``estimate_token_columns`` first for files from
+    before tokens were saved.
+    """
+    cells = cell_columns(df)
+    df = df.copy()
+    if not cells:
+        return df
+    inputs, outputs = billed_token_arrays(df, cells)
+    input_prices, output_prices = price_vectors([scenario], cells)
+    costs = (inputs * input_prices[0] + outputs * output_prices[0]) / 1000
+    if scenario == DEFAULT_SCENARIO:
+        stored = stored_costs(df, cells)
+        costs = np.where(np.isnan(stored), costs, stored)
+    df[[f'{e}_{m}_cost' for e, m in cells]] = costs
+    return df
+
+
+def scenario_costs(df, scenarios):
+    """Mean cost per call for every cell under every scenario.
+    
+    One broadcast over (scenarios x rows x cells); returns a DataFrame with
+    one row per (scenario, approach, model).
+    """
+    cells = cell_columns(df)
+    inputs, outputs = billed_token_arrays(df, cells)
+    input_prices, output_prices = price_vectors(scenarios, cells)
+    costs = (inputs[None] * input_prices[:, None] + outputs[None] * output_prices[:, None]) / 1000
+    mean_costs = np.nanmean(costs, axis=1)
+    rows = []
+    for i, scenario in enumerate(scenarios):
+        for j, (experiment, model) in enumerate(cells):
+            rows.append({'scenario': scenario, 'approach': experiment, 'model': model,
+                         'mean_cost': mean_costs[i, j]})
+    return pd.DataFrame(rows)
+
+
+def estimate_token_columns(df, blob_path=None):
+    """Add estimated token columns for cells that only stored text.
+    
+    Input tokens come from re-rendering the prompt from
+    ``conversation_history``/``student_claim``; output tokens from the stored
+    response. Counting uses ``preflight`` tokenizers, so the numbers are
+    approximate unless tiktoken encodings are available; repricing scales
+    them to the stored cost. Estimated cells are listed in
+    ``df.attrs['estimated_tokens']``. Responses stored as blob offsets are
+    read from ``blob_path``.
+    """
+    import preflight
+    from blob_store import attach_text, offset_columns
+    from run_experiment import PROMPT_TEMPLATES
+    
+    untokenized = [column for column in list(df.columns) + offset_columns(df.columns)
+                   if column.endswith('_response') and f"{column[:-len('_response')]}_input_tokens" not in df.columns]
+    df = attach_text(df, blob_path, untokenized).copy()
+    history = df.get('conversation_history', pd.Series('', index=df.index)).fillna('').astype(str)
+    claims = df.get('student_claim', pd.Series('', index=df.index)).fillna('').astype(str)
+    conversations = (history + np.where(claims != '', "\nStudent: " + claims, '')).tolist()
+    
+    estimated = []
+    conversation_tokens = {}
+    for experiment, (head, tail) in PROMPT_TEMPLATES.items():
+        for column in df.columns:
+            prefix = f'{experiment}_'
+            if not (column.startswith(prefix) and column.endswith('_response')):
+                continue
+            model = column[len(prefix):-len('_response')]
+            if f'{experiment}_{model}_input_tokens' in df.columns:
+                continue
+            counter = preflight.counter_for(model)
+            if counter.name not in conversation_tokens:
+                conversation_tokens[counter.name] = counter.count_many(conversations)
+            fixed = counter.count(head) + counter.count(tail) + preflight.CHAT_OVERHEAD_TOKENS
+            responses = df[column].fillna('').astype(str)
+            failed = responses.eq('') | responses.str.startswith('ERROR:')
+            inputs = (conversation_tokens[counter.name] + fixed).astype(float)
+            outputs = counter.count_many(responses.tolist()).astype(float)
+            inputs[failed.to_numpy()] = np.nan
+            outputs[failed.to_numpy()] = np.nan
+            df[f'{experiment}_{model}_input_tokens'] = inputs
+            df[f'{experiment}_{model}_output_tokens'] = outputs
+            estimated.append((experiment, model))
+    df.attrs['estimated_tokens'] = estimated
+    return df
+
+
+def apply_pricing(df, scenario, pricing_file=None, blob_path=None):
+    """Estimate missing token counts if needed and reprice ``df``."""
+    if pricing_file:
+        load_scenarios(pricing_file)
+    get_scenario(scenario)
+    df = estimate_token_columns(df, blob_path)
+    if df.attrs['estimated_tokens']:
+        print(f"ℹ️  Token counts estimated from text for {len(df.attrs['estimated_tokens'])} cells")
+    repriced = recompute_costs(df, scenario)
+    repriced.attrs = df.attrs
+    print(f"💲 Costs recomputed under pricing scenario '{scenario}'")
+    return repriced
+
+
+if __name__ == "__main__":
+    from run_registry import blobs_for
+    
+    parser = argparse.ArgumentParser(description="Reprice a results file without API calls.")
+    parser.add_argument('results_csv', nargs='?', default='TutoringExperiment_evaluation_20250719.csv')
+    parser.add_argument('--scenario', action='append',
+                        help="pricing scenario (repeatable); defaults to all known scenarios")
+    parser.add_argument('--pricing-file', help="JSON file with extra scenarios")
+    parser.add_argument('--output', help="write the file repriced under the first scenario")
+    parser.add_argument('--blobs', help="blob file holding the text of an offset-only results CSV (default: the registered run's)")
+    args = parser.parse_args()
+    
+    if args.pricing_file:
+        load_scenarios(args.pricing_file)
+    scenarios = args.scenario or list(PRICING)
+    
+    df = estimate_token_columns(pd.read_csv(args.results_csv), args.blobs or blobs_for(args.results_csv))
+    comparison = scenario_costs(df, scenarios)
+    print(f"\n💰 MEAN COST PER CALL BY SCENARIO")
+    print(comparison.pivot_table(index=['approach', 'model'], columns='scenario', values='mean_cost')
+          .to_string(float_format=lambda v: f"{v:.6f}"))
+    
+    if args.output:
+        recompute_costs(df, scenarios[0]).to_csv(args.output, index=False)
+        print(f"\n✅ Repriced file saved to {args.output}")
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Lightweight spans for profiling runs and analysis scripts.
+
+Code marks hot paths with ``with span('http.send_receive', model=key):`` or,
+in linear scripts, ``stage('performance_summary')`` (which ends the previous
+stage). Nothing is recorded until ``enable()`` is called, and while disabled
+``span()`` returns a shared no-op object, so instrumented code costs one
+function call per span.
+
+When enabled, every span records wall time and, with ``memory=True``, the
+change in traced allocations (tracemalloc; process-wide, so concurrent spans
+see each other's allocations). ``finish()`` prints a per-stage breakdown and
+writes a Chrome trace (``chrome://tracing``, Perfetto or speedscope show it as
+a flame graph) plus, with ``cprofile=True``, a ``.prof`` file for pstats or
+snakeviz.
+"""
+
+import atexit
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+
+_enabled = False
+_memory = False
+_profiler = None
+_events = []
+_origin = 0
+_stage = None
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('name', 'args', 'start', 'allocated')
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.allocated = tracemalloc.get_traced_memory()[0] if _memory else 0
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        allocated = tracemalloc.get_traced_memory()[0] - self.allocated if _memory else 0
+        _events.append((self.name, self.start, end - self.start, threading.get_ident(), allocated, self.args))
+        return False
+
+
+def span(name, **args):
+    """Context manager timing ``name``; a no-op unless profiling is enabled."""
+    if not _enabled:
+        return NULL_SPAN
+    return _Span(name, args)
+
+
+def stage(name):
+    """End the current script stage (if any) and start ``name``."""
+    global _stage
+    if not _enabled:
+        return
+    if _stage is not None:
+        _stage.__exit__(None, None, None)
+    _stage = _Span(name, {}).__enter__()
+
+
+def enable(cprofile=False, memory=False):
+    """Start recording spans, optionally under cProfile and tracemalloc."""
+    global _enabled, _memory, _profiler, _origin
+    _events.clear()
+    _origin = time.perf_counter_ns()
+    if memory:
+        tracemalloc.start()
+    _memory = memory
+    if cprofile:
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+    _enabled = True
+
+
+def summary():
+    """Per-span-name rows: calls, total/mean/p95/max ms and allocated KiB."""
+    by_name = {}
+    for name, _, duration, _, allocated, _ in _events:
+        durations, allocations = by_name.setdefault(name, ([], []))
+        durations.append(duration)
+        allocations.append(allocated)
+    rows = []
+    for name, (durations, allocations) in by_name.items():
+        ms = np.array(durations) / 1e6
+        rows.append({'stage': name, 'calls': len(ms), 'total_ms': ms.sum(), 'mean_ms': ms.mean(),
+                     'p95_ms': np.percentile(ms, 95), 'max_ms': ms.max(),
+                     'allocated_kib': np.sum(allocations) / 1024})
+    return sorted(rows, key=lambda row: row['total_ms'], reverse=True)
+
+
+def chrome_trace():
+    """Recorded spans as a Chrome trace-event document."""
+    threads = {}
+    pid = os.getpid()
+    events = []
+    for name, start, duration, thread, allocated, args in _events:
+        args = {key: str(value) for key, value in args.items()}
+        if _memory:
+            args['allocated_bytes'] = allocated
+        events.append({'name': name, 'ph': 'X', 'pid': pid, 'tid': threads.setdefault(thread, len(threads)),
+                       'ts': (start - _origin) / 1000, 'dur': duration / 1000, 'args': args})
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+
+def finish(prefix='profile', top=15):
+    """Stop profiling, print the breakdown and write ``{prefix}.trace.json``."""
+    global _enabled, _profiler, _stage
+    if not _enabled:
+        return
+    if _stage is not None:
+        _stage.__exit__(None, None, None)
+        _stage = None
+    if _profiler is not None:
+        _profiler.disable()
+    _enabled = False
+
+    print(f"\n⏱️  PROFILE ({len(_events)} spans)")
+    print(f"  {'stage':<28} {'calls':>7} {'total ms':>10} {'mean ms':>9} {'p95 ms':>9} {'max ms':>9}"
+          + (f" {'alloc KiB':>10}" if _memory else ''))
+    for row in summary():
+        print(f"  {row['stage']:<28} {row['calls']:>7} {row['total_ms']:>10.1f} {row['mean_ms']:>9.2f} "
+              f"{row['p95_ms']:>9.2f} {row['max_ms']:>9.2f}"
+              + (f" {row['allocated_kib']:>10.1f}" if _memory else ''))
+
+    with open(f'{prefix}.trace.json', 'w') as f:
+        json.dump(chrome_trace(), f)
+    print(f"🔥 Trace written to {prefix}.trace.json (open in chrome://tracing or ui.perfetto.dev)")
+
+    if _profiler is not None:
+        _profiler.dump_stats(f'{prefix}.prof')
+        out = io.StringIO()
+        pstats.Stats(_profiler, stream=out).sort_stats('cumulative').print_stats(top)
+        print(out.getvalue())
+        print(f"📈 cProfile stats written to {prefix}.prof")
+        _profiler = None
+
+    if _memory:
+        print(f"\n🧠 TOP ALLOCATION SITES")
+        for statistic in tracemalloc.take_snapshot().statistics('lineno')[:top]:
+            print(f"  {statistic}")
+        tracemalloc.stop()
+
+
+def add_arguments(parser):
+    """Add ``--profile``, ``--profile-cprofile`` and ``--profile-memory`` to a CLI."""
+    parser.add_argument('--profile', nargs='?', const='profile', metavar='PREFIX',
+                        help="record stage timings and write PREFIX.trace.json (default prefix: profile)")
+    parser.add_argument('--profile-cprofile', action='store_true', help="also run cProfile (PREFIX.prof)")
+    parser.add_argument('--profile-memory', action='store_true', help="also track allocations with tracemalloc")
+
+
+def start_from_args(args):
+    """Enable profiling if ``--profile`` was given and report at exit."""
+    if args.profile:
+        enable(cprofile=args.profile_cprofile, memory=args.profile_memory)
+        atexit.register(finish, args.profile)
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Multi-rater ratings in long format, agreement statistics and consensus.
+
+Every rating is a row keyed by (test_id, experiment, model, rater), so human
+raters and judge models can score the same cells without new columns. Wide
+evaluation files (one ``_rating`` column per cell, as written by raters and
+``llm_judge.py``) are ingested under a rater name into a long CSV store; key
+columns are categoricals and the table is indexed by the key, so joins
+against ``response_features.long_responses`` stay cheap.
+
+Statistics work on the (raters x cells) matrix with NaN for missing ratings:
+Krippendorff's alpha from a coincidence matrix built with one matrix product,
+weighted Cohen's kappa for every rater pair at once from one-hot level
+arrays, and per-rater bias against the leave-one-out mean of the other
+raters. ``consensus`` averages raters per cell (optionally after removing
+each rater's bias) and ``apply_consensus`` writes the result back into the
+``_rating`` columns the analysis scripts read.
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from response_features import KEYS, ratings_long
+
+RATER_KEYS = KEYS + ['rater']
+
+
+def ingest_wide(df, rater):
+    """Long ratings from a wide evaluation table, attributed to ``rater``."""
+    ratings = ratings_long(df[df['test_id'].astype(str) != 'EVALUATION_CRITERIA']).dropna(subset=['rating'])
+    ratings.insert(3, 'rater', rater)
+    return ratings.reset_index(drop=True)
+
+
+def index_ratings(ratings):
+    """Categorical keys, one row per (test_id, experiment, model, rater), sorted index."""
+    ratings = ratings.drop_duplicates(subset=RATER_KEYS, keep='last')
+    ratings = ratings.astype({key: 'category' for key in RATER_KEYS})
+    return ratings.set_index(RATER_KEYS).sort_index()
+
+
+def load_store(path):
+    """Indexed ratings from a long CSV store (empty if it does not exist yet)."""
+    if not os.path.exists(path):
+        return index_ratings(pd.DataFrame(columns=RATER_KEYS + ['rating']))
+    ratings = pd.read_csv(path, dtype={key: str for key in RATER_KEYS})
+    ratings['rating'] = pd.to_numeric(ratings['rating'], errors='coerce')
+    return index_ratings(ratings)
+
+
+def add_to_store(path, ratings):
+    """Merge ``ratings`` into the store at ``path``; a rater's newer rating of a cell wins."""
+    store = load_store(path).reset_index().astype({key: str for key in RATER_KEYS})
+    merged = index_ratings(pd.concat([store, ratings.astype({key: str for key in KEYS})], ignore_index=True))
+    merged.reset_index().to_csv(path, index=False)
+    return merged
+
+
+def rater_matrix(ratings):
+    """(raters x cells) float array, rater names and the (test_id, experiment, model) cell index."""
+    table = ratings['rating'].unstack('rater')
+    table = table.loc[:, table.notna().any()]
+    return table.to_numpy(dtype=float).T, list(table.columns), table.index
+
+
+def _levels(matrix):
+    levels = np.unique(matrix[~np.isnan(matrix)])
+    # (raters, cells, levels); all zeros where a rater did not rate a cell
+    one_hot = (matrix[:, :, None] == levels).astype(float)
+    return levels, one_hot
+
+
+def _distance(levels, counts, metric):
+    """Squared disagreement between every pair of levels."""
+    if metric == 'nominal':
+        return (levels[:, None] != levels[None, :]).astype(float)
+    if metric == 'interval':
+        return (levels[:, None] - levels[None, :]) ** 2
+    if metric == 'ordinal':
+        # cumulative counts between the two levels, minus half of each end
+        cumulative = np.concatenate(([0], np.cumsum(counts)))
+        low = np.minimum.outer(np.arange(len(levels)), np.arange(len(levels)))
+        high = np.maximum.outer(np.arange(len(levels)), np.arange(len(levels)))
+        between = cumulative[high + 1] - cumulative[low] - (counts[low] + counts[high]) / 2
+        return between ** 2
+    raise ValueError(f"Unknown metric '{metric}' (use nominal, ordinal or interval)")
+
+
+def krippendorff_alpha(matrix, metric='interval'):
+    """Krippendorff's alpha for a (raters x cells) matrix with NaN for missing."""
+    levels, one_hot = _levels(matrix)
+    counts = one_hot.sum(axis=0)  # (cells, levels)
+    raters = counts.sum(axis=1)
+    pairable = raters >= 2
+    counts, raters = counts[pairable], raters[pairable]
+    if not len(counts):
+        return np.nan
+    weights = 1 / (raters - 1)
+    coincidence = (counts * weights[:, None]).T @ counts - np.diag(weights @ counts)
+    marginals = coincidence.sum(axis=1)
+    n = marginals.sum()
+    distance = _distance(levels, marginals, metric)
+    expected = (np.outer(marginals, marginals) * distance).sum()
+    if expected == 0:
+        return np.nan
+    return 1 - (n - 1) * (coincidence * distance).sum() / expected
+
+
+def weighted_kappa(matrix, weights='quadratic'):
+    """Cohen's weighted kappa for every rater pair, as a (raters x raters) array.
+
+    Each pair uses the cells both raters scored; ``weights`` is ``linear``
+    or ``quadratic`` distance between levels, scaled to [0, 1].
+    """
+    levels, one_hot = _levels(matrix)
+    span = np.ptp(levels) if len(levels) > 1 else 1.0
+    gap = np.abs(levels[:, None] - levels[None, :]) / span
+    penalty = gap ** 2 if weights == 'quadratic' else gap
+    # (raters, raters, levels, levels) confusion matrices over shared cells
+    observed = np.einsum('iul,jum->ijlm', one_hot, one_hot)
+    shared = observed.sum(axis=(2, 3))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        expected = (observed.sum(axis=3)[..., :, None] * observed.sum(axis=2)[..., None, :]
+                    / shared[..., None, None])
+        kappa = 1 - (observed * penalty).sum(axis=(2, 3)) / (expected * penalty).sum(axis=(2, 3))
+    kappa[shared == 0] = np.nan
+    return kappa
+
+
+def rater_bias(matrix):
+    """Per rater: cells rated, mean rating, and mean/abs deviation from the other raters' mean."""
+    present = ~np.isnan(matrix)
+    values = np.where(present, matrix, 0.0)
+    totals, counts = values.sum(axis=0), present.sum(axis=0)
+    others = counts - present
+    with np.errstate(invalid='ignore', divide='ignore'):
+        leave_one_out = (totals - values) / others
+        deviation = np.where(present & (others > 0), matrix - leave_one_out, np.nan)
+        return {
+            'n': present.sum(axis=1),
+            'mean_rating': np.nanmean(np.where(present, matrix, np.nan), axis=1),
+            'bias': np.nanmean(deviation, axis=1),
+            'mean_abs_deviation': np.nanmean(np.abs(deviation), axis=1),
+            'n_compared': (~np.isnan(deviation)).sum(axis=1)
+        }
+
+
+def agreement_report(ratings, metric='interval'):
+    """Alpha overall and per (experiment, model), pairwise kappa and per-rater bias."""
+    matrix, raters, cells = rater_matrix(ratings)
+    alpha = {'all': krippendorff_alpha(matrix, metric)}
+    groups = pd.Series(np.arange(len(cells)), index=cells).groupby(level=['experiment', 'model'], observed=True)
+    for (experiment, model), positions in groups:
+        alpha[f'{experiment}_{model}'] = krippendorff_alpha(matrix[:, positions.to_numpy()], metric)
+    kappa = pd.DataFrame(weighted_kappa(matrix), index=raters, columns=raters)
+    bias = pd.DataFrame(rater_bias(matrix), index=pd.Index(raters, name='rater')).reset_index()
+    return pd.Series(alpha, name='alpha'), kappa, bias
+
+
+def consensus(ratings, debias=False, min_raters=1):
+    """Mean rating per cell across raters, indexed by (test_id, experiment, model).
+
+    With ``debias`` each rater's overall bias is subtracted first; cells with
+    fewer than ``min_raters`` ratings are left out.
+    """
+    matrix, raters, cells = rater_matrix(ratings)
+    if debias:
+        matrix = matrix - np.nan_to_num(rater_bias(matrix)['bias'])[:, None]
+    counts = (~np.isnan(matrix)).sum(axis=0)
+    with np.errstate(invalid='ignore'):
+        mean = np.nanmean(matrix, axis=0)
+    result = pd.DataFrame({'rating': mean, 'n_raters': counts}, index=cells)
+    return result[counts >= min_raters]
+
+
+def apply_consensus(df, consensus_ratings):
+    """Copy of a wide evaluation table with ``_rating`` columns set from ``consensus``.
+
+    Cells without a consensus rating become NaN, so the table only carries
+    ratings from the store.
+    """
+    df = df.copy()
+    test_ids = df['test_id'].astype(str)
+    wide = consensus_ratings['rating'].unstack(['experiment', 'model'])
+    wide.index = wide.index.astype(str)
+    wide = wide.reindex(test_ids)
+    for experiment, model in wide.columns:
+        df[f'{experiment}_{model}_rating'] = wide[(experiment, model)].to_numpy()
+    return df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-rater ratings: ingest, agreement and consensus.")
+    parser.add_argument('--store', default='ratings_long.csv', help="long-format ratings store")
+    parser.add_argument('--ingest', nargs=2, action='append', metavar=('EVALUATION_CSV', 'RATER'),
+                        help="add a wide evaluation file's ratings under RATER (repeatable)")
+    parser.add_argument('--metric', default='interval', choices=['nominal', 'ordinal', 'interval'],
+                        help="distance for Krippendorff's alpha")
+    parser.add_argument('--consensus', nargs=2, metavar=('EVALUATION_CSV', 'OUTPUT_CSV'),
+                        help="write EVALUATION_CSV with consensus ratings to OUTPUT_CSV")
+    parser.add_argument('--debias', action='store_true', help="remove each rater's bias before averaging")
+    args = parser.parse_args()
+
+    for path, rater in args.ingest or []:
+        added = ingest_wide(pd.read_csv(path), rater)
+        add_to_store(args.store, added)
+        print(f"📥 {len(added):,} ratings from {path} as '{rater}'")
+
+    ratings = load_store(args.store)
+    n_raters = ratings.index.get_level_values('rater').nunique()
+    print(f"\n🗂️  {len(ratings):,} ratings from {n_raters} raters in {args.store}")
+
+    if n_raters > 1:
+        alpha, kappa, bias = agreement_report(ratings, args.metric)
+        print(f"\n🤝 KRIPPENDORFF'S ALPHA ({args.metric})")
+        for name, value in alpha.items():
+            print(f"  {name:<24} {value:6.3f}")
+        print(f"\n📐 WEIGHTED KAPPA (quadratic, shared cells)")
+        print(kappa.round(3).to_string())
+        print(f"\n⚖️  RATER BIAS (vs. mean of the other raters)")
+        for _, row in bias.iterrows():
+            print(f"  {row['rater']:<20} n={row['n']:<6} mean {row['mean_rating']:.2f}  "
+                  f"bias {row['bias']:+.2f}  mean |dev| {row['mean_abs_deviation']:.2f}")
+
+    if args.consensus:
+        source, output = args.consensus
+        agreed = consensus(ratings, debias=args.debias)
+        apply_consensus(pd.read_csv(source), agreed).to_csv(output, index=False)
+        print(f"\n✅ Consensus ratings for {len(agreed):,} cells written to {output}")
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Heuristic response-quality features for every tutor response.
+
+Turns a wide results/evaluation CSV into a tidy table with one row per
+(test_id, experiment, model) and counts of the failure modes discussed in
+the reports: fabricated ``Student:``/``Tutor:`` turns, leaked final answers,
+CoT scratchpad text shown to the student, plus length and question counts.
+
+Text is lowercased once and every feature is a precompiled, case-sensitive
+pattern counted with vectorized ``Series.str.count``. Case-insensitive or
+combined alternation patterns were measured 5-50x slower because they
+defeat the regex engine's literal-prefix scan. Large files can be processed
+in chunks.
+"""
+
+import argparse
+import re
+
+import numpy as np
+import pandas as pd
+
+from blob_store import attach_text
+from experiment_spec import EXPERIMENTS
+from run_registry import blobs_for
+
+KEYS = ['test_id', 'experiment', 'model']
+
+# Applied to lowercased text.
+PATTERNS = {
+    # a line that starts a new speaker turn, allowing markdown decoration
+    'student_turns': re.compile(r"^[ \t>*_#]*student[ \t*_]*:", re.M),
+    'tutor_turns': re.compile(r"^[ \t>*_#]*(?:tutor|assistant)[ \t*_]*:", re.M),
+    'answer_phrases': re.compile(r"the (?:correct |final |right )?(?:answer|solution|result)s? (?:is|are|would be)"
+                                 r"|final (?:answer|result)|\\boxed|so the answer"
+                                 r"|therefore,? (?:x|y|the answer)\s*="),
+    'scratchpad_tags': re.compile(r"</?scratchpad>"),
+    'scratchpad_headings': re.compile(r"what is the original problem|what was the student'?s claim"
+                                      r"|is the claim correct|specific error|pedagogical strategy"
+                                      r"|original problem\W{0,4}:|student'?s claim\W{0,4}:"),
+    'questions': re.compile(r"\?")
+}
+
+
+def long_responses(df):
+    """Melt ``*_response`` columns into one row per cell.
+    
+    ``text`` is what the student would see: the parsed CoT final answer when
+    the file has one, otherwise the full response.
+    """
+    frames = []
+    rows = df[df['test_id'].astype(str) != 'EVALUATION_CRITERIA']
+    for experiment in EXPERIMENTS:
+        prefix = f'{experiment}_'
+        for column in rows.columns:
+            if not (column.startswith(prefix) and column.endswith('_response')):
+                continue
+            model = column[len(prefix):-len('_response')]
+            response = rows[column]
+            final_column = f'{experiment}_{model}_final'
+            if final_column in rows.columns:
+                final = rows[final_column]
+                has_final = final.notna() & final.astype(str).str.strip().ne('')
+                text = response.where(~has_final, final)
+            else:
+                has_final = pd.Series(False, index=rows.index)
+                text = response
+            frames.append(pd.DataFrame({
+                'test_id': rows['test_id'].astype(str).to_numpy(),
+                'experiment': experiment,
+                'model': model,
+                'text': text.to_numpy(),
+                'has_final': has_final.to_numpy()
+            }))
+    if not frames:
+        return pd.DataFrame(columns=KEYS + ['text', 'has_final'])
+    cells = pd.concat(frames, ignore_index=True)
+    cells = cells[cells['text'].notna()]
+    return cells[~cells['text'].astype(str).str.startswith('ERROR:')].reset_index(drop=True)
+
+
+def extract_features(cells):
+    """Tidy feature table for a frame from ``long_responses``."""
+    text = cells['text'].astype(str)
+    lowered = text.str.lower()
+    
+    features = cells[KEYS + ['has_final']].copy()
+    features['n_chars'] = text.str.len().astype(np.int32)
+    features['n_words'] = lowered.str.count(r"\S+").astype(np.int32)
+    for name, pattern in PATTERNS.items():
+        features[name] = lowered.str.count(pattern).astype(np.int32)
+    # A response may open with its own "Tutor:" label; anything beyond that,
+    # or any student line, is a fabricated turn.
+    features['hallucinated_turns'] = (features['student_turns'] > 0) | (features['tutor_turns'] > 1)
+    features['leaked_answer'] = features['answer_phrases'] > 0
+    features['scratchpad_leak'] = (features['scratchpad_tags'] + features['scratchpad_headings']) > 0
+    return features
+
+
+def features_from_csv(path, chunksize=None, blob_path=None):
+    """Feature table for a results CSV, optionally reading it in chunks.
+    
+    ``blob_path`` decodes text for files written with offsets into a blob store.
+    """
+    if not chunksize:
+        return extract_features(long_responses(attach_text(pd.read_csv(path), blob_path)))
+    parts = [extract_features(long_responses(attach_text(chunk, blob_path)))
+             for chunk in pd.read_csv(path, chunksize=chunksize)]
+    return pd.concat(parts, ignore_index=True)
+
+
+def ratings_long(df):
+    """``*_rating`` columns in the same (test_id, experiment, model) layout.
+    
+    The ``EVALUATION_CRITERIA`` row of evaluation files is not a dialogue and is left out.
+    """
+    df = df[df['test_id'].astype(str) != 'EVALUATION_CRITERIA']
+    frames = []
+    for experiment in EXPERIMENTS:
+        prefix = f'{experiment}_'
+        for column in df.columns:
+            if column.startswith(prefix) and column.endswith('_rating'):
+                frames.append(pd.DataFrame({
+                    'test_id': df['test_id'].astype(str).to_numpy(),
+                    'experiment': experiment,
+                    'model': column[len(prefix):-len('_rating')],
+                    'rating': pd.to_numeric(df[column], errors='coerce').to_numpy()
+                }))
+    if not frames:
+        return pd.DataFrame(columns=KEYS + ['rating'])
+    return pd.concat(frames, ignore_index=True)
+
+
+def parse_failure_rates(df):
+    """Per (experiment, model) share of answered cells whose parser reported an error.
+
+    Only strategies with a parser (a ``_parse_error`` column) are counted;
+    API errors are left out.
+    """
+    rows = []
+    for experiment in EXPERIMENTS:
+        prefix = f'{experiment}_'
+        for column in df.columns:
+            if not (column.startswith(prefix) and column.endswith('_parse_error')):
+                continue
+            model = column[len(prefix):-len('_parse_error')]
+            response = df.get(f'{prefix}{model}_response', pd.Series(np.nan, index=df.index))
+            answered = response.notna() & ~response.astype(str).str.startswith('ERROR:')
+            errors = df.loc[answered, column]
+            failed = errors[errors.notna() & errors.astype(str).str.strip().ne('')]
+            rows.append({
+                'experiment': experiment,
+                'model': model,
+                'responses': int(answered.sum()),
+                'failures': len(failed),
+                'failure_rate': len(failed) / answered.sum() if answered.any() else np.nan,
+                'reasons': ", ".join(f"{reason} {count}" for reason, count in failed.value_counts().items())
+            })
+    return pd.DataFrame(rows, columns=['experiment', 'model', 'responses', 'failures', 'failure_rate', 'reasons'])
+
+
+def feature_summary(features, ratings=None):
+    """Per (experiment, model) rates of each failure mode, with mean rating if given."""
+    table = features
+    if ratings is not None and len(ratings):
+        table = features.merge(ratings, on=KEYS, how='left')
+    aggregations = {
+        'responses': ('n_chars', 'size'),
+        'hallucinated_turn_rate': ('hallucinated_turns', 'mean'),
+        'leaked_answer_rate': ('leaked_answer', 'mean'),
+        'scratchpad_leak_rate': ('scratchpad_leak', 'mean'),
+        'mean_words': ('n_words', 'mean'),
+        'mean_questions': ('questions', 'mean')
+    }
+    if 'rating' in table.columns:
+        aggregations['mean_rating'] = ('rating', 'mean')
+    return table.groupby(['experiment', 'model']).agg(**aggregations).reset_index()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract heuristic quality features from tutor responses.")
+    parser.add_argument('results_csv', nargs='?', default='TutoringExperiment_evaluation_20250719.csv')
+    parser.add_argument('--output', default='response_features.csv')
+    parser.add_argument('--chunksize', type=int, help="rows per chunk for very large files")
+    parser.add_argument('--blobs',
+                        help="blob file holding the text of an offset-only results CSV (default: the registered run's)")
+    args = parser.parse_args()
+    
+    features = features_from_csv(args.results_csv, args.chunksize, args.blobs or blobs_for(args.results_csv))
+    ratings = ratings_long(pd.read_csv(args.results_csv, usecols=lambda c: c == 'test_id' or c.endswith('_rating')))
+    summary = feature_summary(features, ratings)
+    
+    print(f"Extracted features for {len(features)} responses")
+    print(f"\n🔍 RESPONSE FEATURES BY APPROACH AND MODEL")
+    print(summary.round(2).to_string(index=False))
+    
+    features.to_csv(args.output, index=False)
+    print(f"\n✅ Saved {args.output}")
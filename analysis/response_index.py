@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+On-disk inverted index over tutor responses.
+
+Builds a SQLite FTS5 index (standard library, no server) holding every
+response, CoT scratchpad and final answer, keyed by (test_id, experiment,
+model) with ``math_level``, ``expected_result`` and rating alongside for
+filtering. Queries use FTS5 syntax: phrases ("order of operations"),
+AND / OR, binary NOT (``hint NOT answer``), NEAR(...) and column filters
+(``final: hint``). Query terms match response text only; restrict the
+approach or model with ``--experiment`` / ``--model``.
+
+    python response_index.py build tutoring_results_20250719_140215.csv \\
+        --ratings TutoringExperiment_evaluation_20250719.csv
+    python response_index.py query '"order of operations" NOT answer' --experiment few_shot --min-rating 3
+"""
+
+import argparse
+import os
+import sqlite3
+
+import pandas as pd
+
+from blob_store import attach_text
+from experiment_spec import EXPERIMENTS
+from run_registry import blobs_for
+
+DEFAULT_INDEX = 'responses.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cells (
+    id INTEGER PRIMARY KEY,
+    test_id TEXT NOT NULL,
+    experiment TEXT NOT NULL,
+    model TEXT NOT NULL,
+    math_level TEXT,
+    expected_result TEXT,
+    rating REAL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS responses USING fts5(
+    response, scratchpad, final,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+# Created after the bulk load so inserts do not maintain them row by row.
+INDEXES = """
+CREATE UNIQUE INDEX IF NOT EXISTS cells_key ON cells (test_id, experiment, model);
+CREATE INDEX IF NOT EXISTS cells_math_level ON cells (math_level);
+CREATE INDEX IF NOT EXISTS cells_rating ON cells (rating);
+"""
+
+
+def cell_rows(df, ratings=None):
+    """Yield (test_id, experiment, model, math_level, expected_result, rating,
+    response, scratchpad, final) for every cell in a wide results frame."""
+    df = df[df['test_id'].astype(str) != 'EVALUATION_CRITERIA']
+    test_ids = df['test_id'].astype(str).tolist()
+    math_levels = df['math_level'].tolist() if 'math_level' in df.columns else [None] * len(df)
+    expected = df['expected_result'].tolist() if 'expected_result' in df.columns else [None] * len(df)
+    
+    def column(name):
+        if name not in df.columns:
+            return [None] * len(df)
+        return [value if isinstance(value, str) or value == value else None for value in df[name].tolist()]
+    
+    for experiment in EXPERIMENTS:
+        prefix = f'{experiment}_'
+        for name in df.columns:
+            if not (name.startswith(prefix) and name.endswith('_response')):
+                continue
+            model = name[len(prefix):-len('_response')]
+            responses = column(name)
+            scratchpads = column(f'{prefix}{model}_scratchpad')
+            finals = column(f'{prefix}{model}_final')
+            own_ratings = column(f'{prefix}{model}_rating')
+            for i, response in enumerate(responses):
+                if response is None:
+                    continue
+                rating = own_ratings[i]
+                if rating is None and ratings is not None:
+                    rating = ratings.get((test_ids[i], experiment, model))
+                yield (test_ids[i], experiment, model, math_levels[i], expected[i],
+                       None if rating is None else float(rating),
+                       response, scratchpads[i] or '', finals[i] or '')
+
+
+def load_ratings(path):
+    """(test_id, experiment, model) -> rating from an evaluation CSV."""
+    df = pd.read_csv(path, usecols=lambda c: c == 'test_id' or c.endswith('_rating'))
+    ratings = {}
+    test_ids = df['test_id'].astype(str).tolist()
+    for experiment in EXPERIMENTS:
+        prefix = f'{experiment}_'
+        for name in df.columns:
+            if name.startswith(prefix) and name.endswith('_rating'):
+                model = name[len(prefix):-len('_rating')]
+                for test_id, rating in zip(test_ids, df[name].tolist()):
+                    if rating == rating:
+                        ratings[(test_id, experiment, model)] = rating
+    return ratings
+
+
+def build_index(results_csv, index_path=DEFAULT_INDEX, ratings_csv=None, chunksize=5000, blob_path=None):
+    """(Re)build the index from a wide results CSV; returns the cell count."""
+    if os.path.exists(index_path):
+        os.remove(index_path)
+    ratings = load_ratings(ratings_csv) if ratings_csv else None
+    
+    connection = sqlite3.connect(index_path)
+    connection.execute("PRAGMA journal_mode = OFF")
+    connection.execute("PRAGMA synchronous = OFF")
+    connection.executescript(SCHEMA)
+    count = 0
+    with connection:
+        for chunk in pd.read_csv(results_csv, chunksize=chunksize):
+            chunk = attach_text(chunk, blob_path)
+            rows = list(cell_rows(chunk, ratings))
+            start = count + 1
+            connection.executemany(
+                "INSERT INTO cells (id, test_id, experiment, model, math_level, expected_result, rating) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(start + i, *row[:6]) for i, row in enumerate(rows)])
+            connection.executemany(
+                "INSERT INTO responses (rowid, response, scratchpad, final) VALUES (?, ?, ?, ?)",
+                [(start + i, *row[6:]) for i, row in enumerate(rows)])
+            count += len(rows)
+        connection.executescript(INDEXES)
+        connection.execute("INSERT INTO responses (responses) VALUES ('optimize')")
+    connection.close()
+    return count
+
+
+class ResponseIndex:
+    """Query API over an index built by ``build_index``."""
+    
+    def __init__(self, index_path=DEFAULT_INDEX):
+        if not os.path.exists(index_path):
+            raise FileNotFoundError(f"No index at {index_path} - run 'response_index.py build' first")
+        self.connection = sqlite3.connect(f"file:{index_path}?mode=ro", uri=True)
+        self.connection.row_factory = sqlite3.Row
+    
+    def search(self, query, math_level=None, min_rating=None, max_rating=None,
+               experiment=None, model=None, limit=20):
+        """Best-matching cells (BM25 order) with a highlighted snippet."""
+        sql = ["SELECT c.test_id, c.experiment, c.model, c.math_level, c.expected_result, c.rating,",
+               "snippet(responses, -1, '[', ']', ' … ', 12) AS snippet",
+               "FROM responses JOIN cells c ON c.id = responses.rowid",
+               "WHERE responses MATCH ?"]
+        params = [query]
+        for column, value in (('math_level', math_level), ('experiment', experiment), ('model', model)):
+            if value is not None:
+                sql.append(f"AND c.{column} = ?")
+                params.append(value)
+        if min_rating is not None:
+            sql.append("AND c.rating >= ?")
+            params.append(min_rating)
+        if max_rating is not None:
+            sql.append("AND c.rating <= ?")
+            params.append(max_rating)
+        sql.append("ORDER BY bm25(responses) LIMIT ?")
+        params.append(limit)
+        return [dict(row) for row in self.connection.execute(" ".join(sql), params)]
+    
+    def counts(self, query):
+        """Number of matching cells per (experiment, model)."""
+        rows = self.connection.execute(
+            "SELECT c.experiment, c.model, COUNT(*) AS matches "
+            "FROM responses JOIN cells c ON c.id = responses.rowid "
+            "WHERE responses MATCH ? GROUP BY c.experiment, c.model ORDER BY matches DESC", [query])
+        return [dict(row) for row in rows]
+
+
+if __name__ == "__main__":
+    import time
+    
+    parser = argparse.ArgumentParser(description="Full-text search over tutor responses.")
+    parser.add_argument('--index', default=DEFAULT_INDEX, help="index file")
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    build = commands.add_parser('build', help="index a results CSV")
+    build.add_argument('results_csv')
+    build.add_argument('--ratings', help="evaluation CSV to take _rating columns from")
+    build.add_argument('--blobs',
+                       help="blob file holding the text of an offset-only results CSV (default: the registered run's)")
+    
+    query = commands.add_parser('query', help="search the index")
+    query.add_argument('query', help='FTS5 query, e.g. \'"order of operations" NOT hint\'')
+    query.add_argument('--math-level')
+    query.add_argument('--experiment')
+    query.add_argument('--model')
+    query.add_argument('--min-rating', type=float)
+    query.add_argument('--max-rating', type=float)
+    query.add_argument('--limit', type=int, default=20)
+    query.add_argument('--counts', action='store_true', help="only show matches per approach and model")
+    args = parser.parse_args()
+    
+    if args.command == 'build':
+        started = time.perf_counter()
+        count = build_index(args.results_csv, args.index, args.ratings,
+                            blob_path=args.blobs or blobs_for(args.results_csv))
+        print(f"✅ Indexed {count} cells into {args.index} in {time.perf_counter() - started:.1f}s")
+    else:
+        index = ResponseIndex(args.index)
+        started = time.perf_counter()
+        try:
+            if args.counts:
+                results = index.counts(args.query)
+            else:
+                results = index.search(args.query, args.math_level, args.min_rating, args.max_rating,
+                                       args.experiment, args.model, args.limit)
+        except sqlite3.OperationalError as e:
+            raise SystemExit(f"❌ Bad query: {e}")
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        for row in results:
+            if args.counts:
+                print(f"{row['experiment']:<10} {row['model']:<13} {row['matches']}")
+            else:
+                rating = '-' if row['rating'] is None else f"{row['rating']:.1f}"
+                print(f"{row['test_id']:>6} {row['experiment']:<10} {row['model']:<13} "
+                      f"{row['math_level'] or '':<13} {rating:>4}  {row['snippet']}")
+        print(f"🔎 {len(results)} results in {elapsed_ms:.1f} ms")
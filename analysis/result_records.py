@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Array-backed result records with a fixed (experiment, model, field) schema.
+
+A ``ResultTable`` interns experiment and model names to integer ids and keeps
+each field in its own array of shape (dialogues, experiments, models): NumPy
+arrays for costs, latencies, token counts and ratings, object arrays for text. A
+presence bitmask remembers which cells were set, so the wide CSV layout
+(``{experiment}_{model}_{field}`` columns, only those that were ever written)
+can be reproduced exactly and read back losslessly.
+
+``DialogueRecord`` is a slotted view of one row. It also answers the old
+string keys (``record['cot_gpt4o_mini_final']``) for code that still uses them.
+
+Run directly to compare memory per 100k cells against per-dialogue dicts.
+"""
+
+import argparse
+import csv
+import tracemalloc
+
+import numpy as np
+
+META_FIELDS = ('test_id', 'math_level', 'expected_result', 'conversation_history',
+               'student_claim', 'experiment')
+TEXT_FIELDS = ('response', 'scratchpad', 'final', 'parse_error')
+FLOAT_FIELDS = ('cost', 'rating', 'latency')
+INT_FIELDS = ('input_tokens', 'output_tokens')
+FIELDS = TEXT_FIELDS + FLOAT_FIELDS + INT_FIELDS
+FIELD_BITS = {field: np.uint16(1 << i) for i, field in enumerate(FIELDS)}
+MISSING_INT = -1
+
+
+class DialogueRecord:
+    """One dialogue's row in a ``ResultTable``."""
+
+    __slots__ = ('table', 'row')
+
+    def __init__(self, table, row):
+        self.table = table
+        self.row = row
+
+    def set(self, experiment, model, **values):
+        self.table.set(self.row, experiment, model, **values)
+
+    def get_cell(self, experiment, model, field, default=None):
+        return self.table.get(self.row, experiment, model, field, default)
+
+    def set_meta(self, **values):
+        for name, value in values.items():
+            self.table.meta[name][self.row] = value
+            self.table.meta_present[name][self.row] = True
+
+    def as_dict(self):
+        return self.table.row_dict(self.row)
+
+    def __getitem__(self, key):
+        if key in self.table.meta:
+            if not self.table.meta_present[key][self.row]:
+                raise KeyError(key)
+            return self.table.meta[key][self.row]
+        experiment, model, field = self.table.parse_key(key)
+        value = self.table.get(self.row, experiment, model, field, KeyError)
+        if value is KeyError:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if key in self.table.meta:
+            self.set_meta(**{key: value})
+        else:
+            experiment, model, field = self.table.parse_key(key)
+            self.table.set(self.row, experiment, model, **{field: value})
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return self.as_dict().keys()
+
+    def items(self):
+        return self.as_dict().items()
+
+    def update(self, other):
+        for key, value in (other.items() if hasattr(other, 'items') else other):
+            self[key] = value
+
+
+class ResultTable:
+    """Results for many dialogues in fixed-schema columnar arrays."""
+
+    def __init__(self, experiments, models, capacity=64):
+        self.experiments = list(experiments)
+        self.models = list(models)
+        self.experiment_ids = {name: i for i, name in enumerate(self.experiments)}
+        self.model_ids = {name: i for i, name in enumerate(self.models)}
+        self.rows = {}
+        self.meta = {name: [] for name in META_FIELDS}
+        self.meta_present = {name: [] for name in META_FIELDS}
+        self._capacity = 0
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        shape = (capacity, len(self.experiments), len(self.models))
+
+        def grow(old, fill, dtype):
+            new = np.full(shape, fill, dtype=dtype)
+            if old is not None:
+                new[:len(old)] = old
+            return new
+
+        self.text = {field: grow(getattr(self, 'text', {}).get(field), None, object) for field in TEXT_FIELDS}
+        self.floats = {field: grow(getattr(self, 'floats', {}).get(field), np.nan, np.float64)
+                       for field in FLOAT_FIELDS}
+        self.ints = {field: grow(getattr(self, 'ints', {}).get(field), MISSING_INT, np.int64)
+                     for field in INT_FIELDS}
+        self.present = grow(getattr(self, 'present', None), 0, np.uint16)
+        self._capacity = capacity
+
+    def __len__(self):
+        return len(self.rows)
+
+    def row(self, dialogue_id):
+        """Record for ``dialogue_id``, adding an empty row the first time."""
+        dialogue_id = str(dialogue_id)
+        if dialogue_id not in self.rows:
+            if len(self.rows) == self._capacity:
+                self._allocate(self._capacity * 2)
+            self.rows[dialogue_id] = len(self.rows)
+            for name in META_FIELDS:
+                self.meta[name].append(None)
+                self.meta_present[name].append(False)
+        return DialogueRecord(self, self.rows[dialogue_id])
+
+    def parse_key(self, key):
+        """(experiment, model, field) for a legacy ``{experiment}_{model}_{field}`` key."""
+        for field in sorted(FIELDS, key=len, reverse=True):
+            if key.endswith(f'_{field}'):
+                rest = key[:-len(field) - 1]
+                for experiment in self.experiments:
+                    model = rest[len(experiment) + 1:]
+                    if rest.startswith(f'{experiment}_') and model in self.model_ids:
+                        return experiment, model, field
+        raise KeyError(key)
+
+    def set(self, row, experiment, model, **values):
+        e, m = self.experiment_ids[experiment], self.model_ids[model]
+        for field, value in values.items():
+            if field in self.text:
+                self.text[field][row, e, m] = value
+            elif field in self.floats:
+                self.floats[field][row, e, m] = np.nan if value is None else value
+            else:
+                self.ints[field][row, e, m] = MISSING_INT if value is None else value
+            self.present[row, e, m] |= FIELD_BITS[field]
+
+    def get(self, row, experiment, model, field, default=None):
+        e, m = self.experiment_ids[experiment], self.model_ids[model]
+        if not self.present[row, e, m] & FIELD_BITS[field]:
+            return default
+        if field in self.text:
+            return self.text[field][row, e, m]
+        if field in self.floats:
+            value = self.floats[field][row, e, m]
+            return None if np.isnan(value) else float(value)
+        value = self.ints[field][row, e, m]
+        return None if value == MISSING_INT else int(value)
+
+    def fieldnames(self):
+        """Sorted column names, as the dict-based export produced them."""
+        names = {name for name in META_FIELDS if any(self.meta_present[name])}
+        used = np.bitwise_or.reduce(self.present[:len(self.rows)], axis=0) if self.rows else None
+        for field, bit in FIELD_BITS.items():
+            if used is None:
+                break
+            for e, m in zip(*np.nonzero(used & bit)):
+                names.add(f'{self.experiments[e]}_{self.models[m]}_{field}')
+        return sorted(names)
+
+    def row_dict(self, row):
+        """Legacy dict for one row: only the keys that were set."""
+        record = {name: self.meta[name][row] for name in META_FIELDS if self.meta_present[name][row]}
+        for e, m in zip(*np.nonzero(self.present[row])):
+            experiment, model = self.experiments[e], self.models[m]
+            for field, bit in FIELD_BITS.items():
+                if self.present[row, e, m] & bit:
+                    record[f'{experiment}_{model}_{field}'] = self.get(row, experiment, model, field)
+        return record
+
+    def records(self):
+        """Legacy dicts for every row, in insertion order."""
+        for row in range(len(self.rows)):
+            yield self.row_dict(row)
+
+    def to_dicts(self):
+        return {dialogue_id: self.row_dict(row) for dialogue_id, row in self.rows.items()}
+
+    @classmethod
+    def from_dicts(cls, results, experiments, models):
+        """Table from ``{dialogue_id: {column: value}}`` in the legacy layout."""
+        table = cls(experiments, models, capacity=max(len(results), 1))
+        for dialogue_id, result in results.items():
+            table.row(dialogue_id).update(result)
+        return table
+
+    @classmethod
+    def from_csv(cls, path, experiments, models):
+        """Read an exported results CSV back; blank cells come back as ``None``."""
+        csv.field_size_limit(2**31 - 1)
+        with open(path, newline='', encoding='utf-8') as csvfile:
+            reader = csv.DictReader(csvfile)
+            table = cls(experiments, models)
+            columns = [(name, None) if name in META_FIELDS else (name, table.parse_key(name))
+                       for name in reader.fieldnames]
+            for row in reader:
+                if row.get('test_id') == 'EVALUATION_CRITERIA':
+                    continue
+                record = table.row(row.get('test_id'))
+                for name, cell in columns:
+                    value = row[name] if row[name] != '' else None
+                    if cell is None:
+                        record.set_meta(**{name: value})
+                        continue
+                    experiment, model, field = cell
+                    if value is not None and field in FLOAT_FIELDS:
+                        value = float(value)
+                    elif value is not None and field in INT_FIELDS:
+                        value = int(value)
+                    table.set(record.row, experiment, model, **{field: value})
+        return table
+
+
+def _memory(build):
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare memory of dict and array-backed result records.")
+    parser.add_argument('--cells', type=int, default=100_000, help="(dialogue, experiment, model) cells")
+    args = parser.parse_args()
+
+    experiments = ['zero_shot', 'few_shot', 'cot']
+    models = ['phi3_mini', 'claude_haiku', 'gpt4o_mini']
+    n_dialogues = max(args.cells // (len(experiments) * len(models)), 1)
+    texts = [f'response text {i % 50}' for i in range(50)]
+
+    def as_dicts():
+        results = {}
+        for d in range(n_dialogues):
+            for experiment in experiments:
+                result = {'test_id': d, 'math_level': 'Elementary', 'experiment': experiment}
+                for model in models:
+                    result[f'{experiment}_{model}_response'] = texts[d % 50]
+                    result[f'{experiment}_{model}_cost'] = 0.001 * (d % 7)
+                    result[f'{experiment}_{model}_input_tokens'] = 400 + d % 300
+                    result[f'{experiment}_{model}_output_tokens'] = 100 + d % 200
+                results.setdefault(str(d), {}).update(result)
+        return results
+
+    def as_table():
+        table = ResultTable(experiments, models)
+        for d in range(n_dialogues):
+            record = table.row(d)
+            for experiment in experiments:
+                record.set_meta(test_id=d, math_level='Elementary', experiment=experiment)
+                for model in models:
+                    record.set(experiment, model, response=texts[d % 50], cost=0.001 * (d % 7),
+                               input_tokens=400 + d % 300, output_tokens=100 + d % 200)
+        return table
+
+    dicts, dict_bytes = _memory(as_dicts)
+    table, table_bytes = _memory(as_table)
+    assert table.to_dicts() == dicts
+    cells = n_dialogues * len(experiments) * len(models)
+    print(f"{cells:,} cells ({n_dialogues:,} dialogues)")
+    print(f"  dicts: {dict_bytes / cells * 100_000 / 2**20:8.1f} MiB per 100k cells")
+    print(f"  table: {table_bytes / cells * 100_000 / 2**20:8.1f} MiB per 100k cells "
+          f"({dict_bytes / table_bytes:.1f}x smaller)")
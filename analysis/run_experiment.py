@@ -8,121 +8,56 @@ import json
 import csv
 import time
 import os
+import argparse
+import glob
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from collections import defaultdict
 
+from adaptive_racing import Race
+from subset_selection import select_subset
+from blob_store import BlobWriter, offload_record, offloaded_fieldnames
+from experiment_spec import ExperimentSpec, load_spec
+from result_records import ResultTable
+import profiling
+from profiling import span
+from run_metrics import RunMetrics, start_server as start_metrics_server
+from run_registry import REGISTRY_PATH, blobs_for, register_run
+import preflight
+
 # OpenRouter configuration
-OPENROUTER_API_KEY = 'REDACTED'
-OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
+OPENROUTER_API_KEY = os.environ.get('OPENROUTER_API_KEY', 'REDACTED')
+OPENROUTER_URL = os.environ.get('OPENROUTER_URL', "https://openrouter.ai/api/v1/chat/completions")
 
 MODELS = {
     'phi3_mini': {
         'name': 'Phi-3.5-mini',
         'model_id': 'microsoft/phi-3.5-mini-128k-instruct',
         'cost_per_1k_input': 0.0001,
-        'cost_per_1k_output': 0.0001
+        'cost_per_1k_output': 0.0001,
+        'context_window': 128000
     },
     'claude_haiku': {
         'name': 'Claude 3.5 Haiku',
         'model_id': 'anthropic/claude-3.5-haiku',
         'cost_per_1k_input': 0.0008,
-        'cost_per_1k_output': 0.004
+        'cost_per_1k_output': 0.004,
+        'context_window': 200000,
+        'cache_control': True
     },
     'gpt4o_mini': {
         'name': 'GPT-4o-mini',
         'model_id': 'openai/gpt-4o-mini',
         'cost_per_1k_input': 0.00015,
-        'cost_per_1k_output': 0.0006
+        'cost_per_1k_output': 0.0006,
+        'context_window': 128000,
+        'supports_n': True,
+        'structured_output': True
     }
 }
 
-class ExperimentRunner:
-    """Complete experiment runner."""
-    
-    def __init__(self):
-        self.results = []
-        self.total_cost = 0.0
-        
-    def make_api_request(self, model_key, prompt):
-        """Make request to OpenRouter API."""
-        model_config = MODELS[model_key]
-        
-        headers = {
-            "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-            "Content-Type": "application/json",
-            "HTTP-Referer": "https://github.com/tutoring-research",
-            "X-Title": "AI Tutoring Research"
-        }
-        
-        data = {
-            "model": model_config['model_id'],
-            "messages": [{"role": "user", "content": prompt}],
-            "max_tokens": 2000,
-            "temperature": 0.0
-        }
-        
-        try:
-            response = requests.post(OPENROUTER_URL, headers=headers, json=data, timeout=60)
-            response.raise_for_status()
-            
-            result = response.json()
-            content = result['choices'][0]['message']['content']
-            
-            usage = result.get('usage', {})
-            input_tokens = usage.get('prompt_tokens', 0)
-            output_tokens = usage.get('completion_tokens', 0)
-            
-            cost = (input_tokens/1000 * model_config['cost_per_1k_input'] + 
-                   output_tokens/1000 * model_config['cost_per_1k_output'])
-            
-            return {
-                'success': True,
-                'content': content,
-                'input_tokens': input_tokens,
-                'output_tokens': output_tokens,
-                'cost': cost
-            }
-            
-        except Exception as e:
-            return {
-                'success': False,
-                'content': '',
-                'error': str(e),
-                'cost': 0.0
-            }
-    
-    def format_conversation(self, dialogue_data):
-        """Format dialogue into conversation history and student claim."""
-        conversation_history = ""
-        student_claim = ""
-        
-        for exchange in dialogue_data.get('full_dialogue', [])[:-1]:
-            role = "Student" if exchange['role'] == 'user' else "Tutor"
-            conversation_history += f"{role}: {exchange['content']}\n"
-        
-        if dialogue_data.get('full_dialogue'):
-            last_exchange = dialogue_data['full_dialogue'][-1]
-            if last_exchange['role'] == 'user':
-                student_claim = last_exchange['content']
-        
-        return conversation_history.strip(), student_claim
-    
-    def create_zero_shot_prompt(self, conversation_history, student_claim):
-        """Create zero-shot prompt."""
-        formatted_conversation = conversation_history
-        if student_claim:
-            formatted_conversation += f"\nStudent: {student_claim}"
-        
-        return f"""You are an expert math tutor. Based on this conversation, provide your next response to help the student learn.
-
-Conversation:
-{formatted_conversation}
-
-Your response as the tutor:"""
-    
-    def create_few_shot_prompt(self, conversation_history, student_claim):
-        """Create few-shot prompt with examples."""
-        examples = """### Example 1: Conceptual Error
+FEW_SHOT_EXAMPLES = """### Example 1: Conceptual Error
 Tutor: Let's solve: 2 + 3 × 4. What do you get?
 Student: I got 20. I added 2 + 3 = 5, then multiplied by 4.
 Tutor: I can see your thinking! You're doing operations from left to right, which makes sense. However, there's a special rule called the order of operations. Can you think of what we should do first when we see both addition and multiplication?
@@ -136,31 +71,37 @@ Tutor: Perfect! You've got the right formula. Let me help you double-check that
 Tutor: If x + 5 = 12, what is x?
 Student: I think x = 7, but I'm not sure I did it right.
 Tutor: You absolutely did it right! That's exactly correct. Can you walk me through how you figured that out? I'd love to hear your thinking process."""
-        
-        formatted_conversation = conversation_history
-        if student_claim:
-            formatted_conversation += f"\nStudent: {student_claim}"
-        
-        return f"""You are an expert, Socratic math tutor. Your goal is to help the student understand their mistake without giving them the answer.
+
+# Each prompt is (text before the conversation, text after it). Keeping the
+# conversation as the only variable part lets multi-turn rollouts send it as
+# separate content blocks and reuse the provider's prompt cache.
+PROMPT_TEMPLATES = {
+    'zero_shot': (
+        """You are an expert math tutor. Based on this conversation, provide your next response to help the student learn.
+
+Conversation:
+""",
+        """
+
+Your response as the tutor:"""
+    ),
+    'few_shot': (
+        f"""You are an expert, Socratic math tutor. Your goal is to help the student understand their mistake without giving them the answer.
 
 Here are examples of good tutoring:
 
-{examples}
+{FEW_SHOT_EXAMPLES}
 
 Now, based on this conversation, provide your response:
 
 ### Current Conversation:
-{formatted_conversation}
+""",
+        """
 
 ### Tutor Response:"""
-    
-    def create_cot_prompt(self, conversation_history, student_claim):
-        """Create chain-of-thought prompt."""
-        formatted_conversation = conversation_history
-        if student_claim:
-            formatted_conversation += f"\nStudent: {student_claim}"
-        
-        return f"""You are an expert, Socratic math tutor. Think step-by-step to analyze the student's claim, then provide a helpful response.
+    ),
+    'cot': (
+        """You are an expert, Socratic math tutor. Think step-by-step to analyze the student's claim, then provide a helpful response.
 
 First, in a <scratchpad> block, analyze:
 1. What is the original problem?
@@ -172,121 +113,787 @@ First, in a <scratchpad> block, analyze:
 Then provide your tutor response.
 
 ### Current Conversation:
-{formatted_conversation}
+""",
+        """
 
 ### Assistant:
 <scratchpad>
 """
+    )
+}
+
+STUDENT_PROMPT_HEAD = """You are a middle-school student working through a math problem with a tutor. Stay in character: you may still be confused or make small mistakes. Reply with your next message to the tutor in one to three sentences.
+
+Conversation so far:
+"""
+STUDENT_PROMPT_TAIL = """
+
+Your reply as the student:"""
+
+MAX_RETRIES = 2
+RETRY_BACKOFF = 1.0
+
+_http = threading.local()
+
+
+def _is_retryable(error):
+    """Rate limits, server errors, timeouts and dropped connections."""
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+
+def _session():
+    """Per-thread HTTP session so concurrent calls reuse keep-alive connections."""
+    session = getattr(_http, 'session', None)
+    if session is None:
+        session = requests.Session()
+        _http.session = session
+    return session
+
+
+def read_stream(response, stream_parser):
+    """Feed a server-sent-events completion to ``stream_parser`` until it is done.
+
+    Returns a body shaped like a non-streamed response. Closing the
+    connection early cancels the rest of the generation.
+    """
+    stream_parser.reset()
+    usage = {}
+    stopped_early = False
+    try:
+        for line in response.iter_lines(chunk_size=None):
+            # skip blank separators and ': keep-alive' comments
+            if not line.startswith(b'data: '):
+                continue
+            payload = line[len(b'data: '):]
+            if payload == b'[DONE]':
+                break
+            chunk = json.loads(payload)
+            usage = chunk.get('usage') or usage
+            for choice in chunk.get('choices', []):
+                stopped_early = stream_parser.feed((choice.get('delta') or {}).get('content') or '') or stopped_early
+            if stopped_early:
+                break
+    finally:
+        response.close()
+    return {'choices': [{'message': {'content': stream_parser.text}}], 'usage': usage,
+            'stopped_early': stopped_early}
+
+
+def build_content(prompt_parts, cache_control=False):
+    """Turn prompt pieces into message content, marking the cacheable prefix.
     
-    def parse_cot_response(self, content):
-        """Parse CoT response to extract scratchpad and final response."""
-        try:
-            if '<scratchpad>' in content and '</scratchpad>' in content:
-                start = content.find('<scratchpad>') + len('<scratchpad>')
-                end = content.find('</scratchpad>')
-                scratchpad = content[start:end].strip()
-                final_response = content[end + len('</scratchpad>'):].strip()
-                return scratchpad, final_response
-            else:
-                return "", content.strip()
-        except:
-            return "", content.strip()
-    
-    def run_single_dialogue(self, dialogue, experiment_type):
-        """Run single dialogue through one experiment type."""
-        conversation_history, student_claim = self.format_conversation(dialogue)
-        
-        if experiment_type == 'zero_shot':
-            prompt = self.create_zero_shot_prompt(conversation_history, student_claim)
-        elif experiment_type == 'few_shot':
-            prompt = self.create_few_shot_prompt(conversation_history, student_claim)
-        elif experiment_type == 'cot':
-            prompt = self.create_cot_prompt(conversation_history, student_claim)
-        
-        dialogue_results = {
-            'test_id': dialogue.get('test_id'),
-            'math_level': dialogue.get('math_level'),
-            'expected_result': dialogue.get('expected_result'),
-            'conversation_history': conversation_history,
-            'student_claim': student_claim,
-            'experiment': experiment_type
+    Providers that need explicit breakpoints get one content block per piece
+    with the breakpoint on the second-to-last block (the end of the
+    conversation), so the next turn's longer prompt starts with the same
+    cached blocks. Providers that cache prefixes automatically get a plain
+    string.
+    """
+    if not cache_control:
+        return "".join(prompt_parts)
+    blocks = [{"type": "text", "text": part} for part in prompt_parts if part]
+    if len(blocks) > 1:
+        blocks[-2]["cache_control"] = {"type": "ephemeral"}
+    return blocks
+
+
+class Conversation:
+    """Dialogue history where each turn is rendered exactly once.
+    
+    Turns are formatted into ``Role: content`` lines as they are appended and
+    the joined text is assembled lazily and cached, so extending a long
+    dialogue never re-renders its prefix.
+    """
+    
+    def __init__(self, turns=()):
+        self.turns = []
+        self.lines = []
+        self._history = None
+        self._formatted = None
+        for exchange in turns:
+            self.append(exchange['role'], exchange['content'])
+    
+    def append(self, role, content):
+        """Add one turn (``user`` = student, anything else = tutor)."""
+        label = "Student" if role == 'user' else "Tutor"
+        self.turns.append((role, content))
+        self.lines.append(f"{label}: {content}")
+        self._history = None
+        self._formatted = None
+    
+    def fork(self):
+        """Copy that shares the already-rendered lines with this one."""
+        child = Conversation()
+        child.turns = list(self.turns)
+        child.lines = list(self.lines)
+        child._history = self._history
+        child._formatted = self._formatted
+        return child
+    
+    @property
+    def history(self):
+        """Every turn except the last one, as in the evaluation CSVs."""
+        if self._history is None:
+            self._history = "\n".join(self.lines[:-1]).strip()
+        return self._history
+    
+    @property
+    def student_claim(self):
+        """Content of the last turn if the student spoke last."""
+        if self.turns and self.turns[-1][0] == 'user':
+            return self.turns[-1][1]
+        return ""
+    
+    def formatted(self):
+        """History plus the student claim, exactly as the prompts embed it."""
+        if self._formatted is None:
+            formatted = self.history
+            claim = self.student_claim
+            if claim:
+                formatted = "\n".join((formatted, f"Student: {claim}"))
+            self._formatted = formatted
+        return self._formatted
+    
+    def transcript(self):
+        """Every turn including the last one, whoever spoke it."""
+        return "\n".join(self.lines).strip()
+    
+    def segments(self):
+        """Pieces of ``formatted()`` split at turn boundaries.
+        
+        Concatenating the segments gives exactly ``formatted()``; earlier
+        segments stay byte-identical as the conversation grows, which is
+        what provider prompt caching keys on.
+        """
+        history_lines = self.lines[:-1]
+        segments = [f"\n{line}" if i else line for i, line in enumerate(history_lines)]
+        if segments:
+            segments[-1] = segments[-1].rstrip()
+        claim = self.student_claim
+        if claim:
+            segments.append(f"\nStudent: {claim}")
+        return segments
+    
+    def __len__(self):
+        return len(self.turns)
+
+
+class ScriptedStudent:
+    """Simulated student that replays canned replies in order."""
+    
+    DEFAULT_REPLIES = [
+        "I'm not sure. Can you give me a hint?",
+        "Okay, let me try again. Is this right?",
+        "I think I understand now. Thank you!"
+    ]
+    
+    def __init__(self, replies=None):
+        self.replies = list(replies or self.DEFAULT_REPLIES)
+    
+    def respond(self, runner, dialogue, conversation, turn):
+        """Return (reply, api_response); scripted replies cost nothing."""
+        return self.replies[turn % len(self.replies)], None
+
+
+class ModelStudent:
+    """Simulated student played by one of the configured models."""
+    
+    def __init__(self, model_key):
+        self.model_key = model_key
+    
+    def respond(self, runner, dialogue, conversation, turn):
+        """Ask the student model for its next message.
+        
+        The tutor spoke last, so the prompt uses the full transcript;
+        ``formatted()`` would drop the reply the student is answering.
+        """
+        prompt = "".join((STUDENT_PROMPT_HEAD, conversation.transcript(), STUDENT_PROMPT_TAIL))
+        response = runner.make_api_request(self.model_key, prompt, max_tokens=300, temperature=0.7)
+        return response['content'].strip(), response
+
+
+class ExperimentRunner:
+    """Complete experiment runner."""
+    
+    def __init__(self):
+        self.results = []
+        self.total_cost = 0.0
+        self.conversations = {}
+        self._lock = threading.Lock()
+        self.blob_path = None
+        self.blob_dictionary = None
+        self.registry_path = None
+        self.run_config = {}
+        self.spec = ExperimentSpec.default(MODELS, PROMPT_TEMPLATES)
+        self.metrics = RunMetrics(lambda: self.total_cost)
+        
+    def make_api_request(self, model_key, prompt, max_tokens=2000, temperature=0.0, n=1,
+                         model_config=None, max_retries=MAX_RETRIES, extra_params=None, experiment=None,
+                         stream_parser=None):
+        """Make request to OpenRouter API.
+        
+        ``prompt`` is either a string or a list of content blocks (see
+        ``build_content``). With ``n > 1`` all returned completions are in
+        ``contents``; ``content`` is always the first one. ``model_config``
+        overrides the MODELS entry (used for judge models). Rate limits,
+        server errors and timeouts are retried with exponential backoff.
+        ``experiment`` labels the request in ``self.metrics``.
+        
+        With a ``stream_parser`` (``experiment_spec.ScratchpadStream``) the
+        completion is streamed and the connection closed as soon as the
+        parser reports the final answer complete; ``stopped_early`` is then
+        True and, if the provider sent no usage, tokens are counted locally.
+        """
+        model_config = model_config or MODELS[model_key]
+        self.metrics.request_started()
+        response = self._send_request(model_key, model_config, prompt, max_tokens, temperature, n, max_retries,
+                                      extra_params, stream_parser)
+        self.metrics.request_finished(experiment or 'none', model_key or model_config['model_id'], response)
+        return response
+    
+    def _send_request(self, model_key, model_config, prompt, max_tokens, temperature, n, max_retries, extra_params,
+                      stream_parser=None):
+        """POST one chat completion with retries; see ``make_api_request``."""
+        headers = {
+            "Authorization": f"Bearer {OPENROUTER_API_KEY}",
+            "Content-Type": "application/json",
+            "HTTP-Referer": "https://github.com/tutoring-research",
+            "X-Title": "AI Tutoring Research"
         }
         
-        for model_key in MODELS.keys():
+        data = {
+            "model": model_config['model_id'],
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": max_tokens,
+            "temperature": temperature
+        }
+        if n > 1:
+            data["n"] = n
+        if extra_params:
+            data.update(extra_params)
+        if stream_parser is not None:
+            data["stream"] = True
+            data["stream_options"] = {"include_usage": True}
+        
+        retries = 0
+        while True:
+            try:
+                started = time.perf_counter()
+                with span('http.send_receive', model=model_config['model_id']):
+                    response = _session().post(OPENROUTER_URL, headers=headers, json=data, timeout=60,
+                                               stream=stream_parser is not None)
+                    response.raise_for_status()
+                    if stream_parser is not None:
+                        result = read_stream(response, stream_parser)
+                latency = time.perf_counter() - started
+                
+                if stream_parser is None:
+                    with span('http.decode'):
+                        result = response.json()
+                contents = [choice['message']['content'] for choice in result['choices']]
+                content = contents[0]
+                
+                usage = result.get('usage') or {}
+                input_tokens = usage.get('prompt_tokens', 0)
+                output_tokens = usage.get('completion_tokens', 0)
+                cached_tokens = (usage.get('prompt_tokens_details') or {}).get('cached_tokens', 0)
+                if not usage and result.get('stopped_early'):
+                    counter = preflight.counter_for(model_key)
+                    input_tokens = counter.count(prompt if isinstance(prompt, str)
+                                                 else "".join(block.get('text', '') for block in prompt))
+                    output_tokens = counter.count(content)
+                
+                cost = (input_tokens/1000 * model_config['cost_per_1k_input'] + 
+                       output_tokens/1000 * model_config['cost_per_1k_output'])
+                
+                return {
+                    'success': True,
+                    'content': content,
+                    'contents': contents,
+                    'input_tokens': input_tokens,
+                    'output_tokens': output_tokens,
+                    'cached_tokens': cached_tokens,
+                    'latency': latency,
+                    'retries': retries,
+                    'stopped_early': result.get('stopped_early', False),
+                    'cost': cost
+                }
+                
+            except Exception as e:
+                if retries < max_retries and _is_retryable(e):
+                    time.sleep(RETRY_BACKOFF * 2 ** retries)
+                    retries += 1
+                    continue
+                return {
+                    'success': False,
+                    'content': '',
+                    'error': str(e),
+                    'retries': retries,
+                    'cost': 0.0
+                }
+    
+    def get_conversation(self, dialogue_data):
+        """Return the cached Conversation for a dialogue, building it once."""
+        key = dialogue_data.get('test_id')
+        if key is None:
+            key = id(dialogue_data)
+        conversation = self.conversations.get(key)
+        if conversation is None:
+            conversation = Conversation(dialogue_data.get('full_dialogue', []))
+            self.conversations[key] = conversation
+        return conversation
+    
+    def format_conversation(self, dialogue_data):
+        """Format dialogue into conversation history and student claim."""
+        conversation = self.get_conversation(dialogue_data)
+        return conversation.history, conversation.student_claim
+    
+    def create_zero_shot_prompt(self, conversation):
+        """Create zero-shot prompt."""
+        head, tail = PROMPT_TEMPLATES['zero_shot']
+        return "".join((head, conversation.formatted(), tail))
+    
+    def create_few_shot_prompt(self, conversation):
+        """Create few-shot prompt with examples."""
+        head, tail = PROMPT_TEMPLATES['few_shot']
+        return "".join((head, conversation.formatted(), tail))
+    
+    def create_cot_prompt(self, conversation):
+        """Create chain-of-thought prompt."""
+        head, tail = PROMPT_TEMPLATES['cot']
+        return "".join((head, conversation.formatted(), tail))
+    
+    def parse_cot_response(self, content, model_key=None):
+        """Parse CoT response to extract scratchpad and final response."""
+        return self.spec.parse('cot', content, model_key)[:2]
+    
+    def generation_kwargs(self, params):
+        """``make_api_request`` keyword arguments for spec generation parameters."""
+        extra = {key: value for key, value in params.items() if key not in ('max_tokens', 'temperature')}
+        return {'max_tokens': params['max_tokens'], 'temperature': params['temperature'],
+                'extra_params': extra or None}
+    
+    def record_response(self, record, dialogue, experiment_type, model_key, response):
+        """Write one API response (or its error) into a ``ResultTable`` row."""
+        record.set_meta(
+            test_id=dialogue.get('test_id'),
+            math_level=dialogue.get('math_level'),
+            expected_result=dialogue.get('expected_result'),
+            conversation_history=self.get_conversation(dialogue).history,
+            student_claim=self.get_conversation(dialogue).student_claim,
+            experiment=experiment_type
+        )
+        if not response['success']:
+            record.set(experiment_type, model_key, response=f"ERROR: {response.get('error')}", cost=0.0)
+            return
+        with span('parse_response', model=model_key):
+            scratchpad, final_response, error = self.spec.parse(experiment_type, response['content'], model_key)
+        if scratchpad is not None:
+            # a failed parse leaves ``final`` empty rather than passing the raw text off as the answer
+            record.set(experiment_type, model_key, scratchpad=scratchpad, final=final_response,
+                       parse_error=error or '')
+            self.metrics.response_parsed(experiment_type, model_key, error)
+        record.set(experiment_type, model_key,
+                   response=response['content'],
+                   cost=response['cost'],
+                   input_tokens=response['input_tokens'],
+                   output_tokens=response['output_tokens'],
+                   latency=response.get('latency'))
+    
+    def run_single_dialogue(self, dialogue, experiment_type, models=None, record=None):
+        """Run single dialogue through one experiment type.
+        
+        Cells are written into ``record`` (a ``ResultTable`` row), or into a
+        fresh single-row table when none is given; the record is returned.
+        """
+        conversation = self.get_conversation(dialogue).formatted()
+        
+        if record is None:
+            record = ResultTable(PROMPT_TEMPLATES, MODELS).row(dialogue.get('test_id'))
+        if models is None:
+            models = [model_key for strategy, model_key in self.spec.cells() if strategy == experiment_type]
+        
+        for model_key in models:
             print(f"  �� {MODELS[model_key]['name']}...")
             
-            response = self.make_api_request(model_key, prompt)
+            with span('build_prompt', experiment=experiment_type):
+                prompt = self.spec.prompt(experiment_type, conversation, model_key)
+            response = self.make_api_request(model_key, prompt, experiment=experiment_type,
+                                             stream_parser=self.spec.stream_parser(experiment_type, model_key),
+                                             **self.generation_kwargs(self.spec.generation_for(experiment_type, model_key)))
             
             if response['success']:
                 print(f"    ✅ Success (${response['cost']:.4f})")
                 self.total_cost += response['cost']
-                
-                if experiment_type == 'cot':
-                    scratchpad, final_response = self.parse_cot_response(response['content'])
-                    dialogue_results[f'{experiment_type}_{model_key}_scratchpad'] = scratchpad
-                    dialogue_results[f'{experiment_type}_{model_key}_final'] = final_response
-                
-                dialogue_results[f'{experiment_type}_{model_key}_response'] = response['content']
-                dialogue_results[f'{experiment_type}_{model_key}_cost'] = response['cost']
             else:
                 print(f"    ❌ Failed: {response.get('error', 'Unknown error')}")
-                dialogue_results[f'{experiment_type}_{model_key}_response'] = f"ERROR: {response.get('error')}"
-                dialogue_results[f'{experiment_type}_{model_key}_cost'] = 0.0
+            self.record_response(record, dialogue, experiment_type, model_key, response)
         
-        return dialogue_results
+        return record
     
-    def run_complete_experiment(self):
-        """Run all three experiments."""
-        print("🚀 COMPLETE AI TUTORING EXPERIMENT")
-        print("=" * 50)
+    def rollout_dialogue(self, dialogue, experiment_type, model_key, student, turns, write_record):
+        """Alternate tutor and simulated-student turns for one dialogue.
         
-        # Load sample data
+        The conversation is forked from the cached one and extended in place,
+        and the tutor prompt is sent as per-turn content blocks so every call
+        after the first hits the provider's cache for the shared prefix.
+        """
+        conversation = self.get_conversation(dialogue).fork()
+        head, tail = PROMPT_TEMPLATES[experiment_type]
+        cache_control = MODELS[model_key].get('cache_control', False)
+        base = {
+            'test_id': dialogue.get('test_id'),
+            'math_level': dialogue.get('math_level'),
+            'experiment': experiment_type,
+            'model': model_key
+        }
+        totals = {'input_tokens': 0, 'output_tokens': 0, 'cached_tokens': 0, 'cost': 0.0}
+        tutor_turns = 0
+        
+        for turn in range(turns):
+            prompt = build_content([head, *conversation.segments(), tail], cache_control)
+            response = self.make_api_request(model_key, prompt, experiment=experiment_type)
+            record = dict(base, turn=turn, role='tutor', success=response['success'])
+            
+            if not response['success']:
+                record['error'] = response.get('error')
+                write_record(record)
+                break
+            
+            content = response['content']
+            scratchpad, final_response, error = self.spec.parse(experiment_type, content)
+            if scratchpad is not None:
+                record['scratchpad'] = scratchpad
+                record['parse_error'] = error
+                content = final_response or content
+            record['content'] = content
+            for key in totals:
+                record[key] = response.get(key, 0)
+                totals[key] += response.get(key, 0)
+            record['latency'] = response.get('latency')
+            write_record(record)
+            conversation.append('assistant', content)
+            tutor_turns += 1
+            
+            if turn == turns - 1:
+                break
+            
+            reply, student_response = student.respond(self, dialogue, conversation, turn)
+            record = dict(base, turn=turn, role='student', content=reply, success=True)
+            if student_response is not None:
+                record['success'] = student_response['success']
+                for key in totals:
+                    record[key] = student_response.get(key, 0)
+                    totals[key] += student_response.get(key, 0)
+            write_record(record)
+            if not record['success']:
+                break
+            conversation.append('user', reply)
+        
+        with self._lock:
+            self.total_cost += totals['cost']
+        return dict(base, turns=tutor_turns, **totals)
+    
+    def run_rollouts(self, dialogues, experiment_type='few_shot', turns=3, student=None,
+                     models=None, max_workers=8, output_path=None):
+        """Run multi-turn tutoring sessions for every (dialogue, model) pair.
+        
+        Rollouts run concurrently; each turn is appended to a JSON-lines file
+        as soon as it finishes so long runs can be monitored and resumed.
+        """
+        student = student or ScriptedStudent()
+        models = models or list(MODELS.keys())
+        output_path = output_path or f"tutoring_rollouts_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+        write_lock = threading.Lock()
+        
+        print(f"\n🔁 Rolling out {len(dialogues)} dialogues × {len(models)} models, {turns} tutor turns each")
+        
+        with open(output_path, 'a', encoding='utf-8') as out:
+            def write_record(record):
+                line = json.dumps(record, ensure_ascii=False)
+                with write_lock:
+                    out.write(line + "\n")
+                    out.flush()
+            
+            summaries = []
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                futures = [
+                    pool.submit(self.rollout_dialogue, dialogue, experiment_type,
+                                model_key, student, turns, write_record)
+                    for dialogue in dialogues for model_key in models
+                ]
+                for future in as_completed(futures):
+                    summary = future.result()
+                    summaries.append(summary)
+                    print(f"  ✅ {summary['test_id']} / {MODELS[summary['model']]['name']}: "
+                          f"{summary['turns']} turns, {summary['cached_tokens']} cached tokens "
+                          f"(${summary['cost']:.4f})")
+        
+        print(f"✅ Rollouts written to {output_path}")
+        print(f"💰 TOTAL COST: ${self.total_cost:.4f}")
+        return summaries
+    
+    def sample_completions(self, model_key, prompt, n, temperature=0.7, experiment=None):
+        """Draw ``n`` completions for one prompt.
+        
+        Models flagged ``supports_n`` get a single request, so the prompt is
+        billed once; anything the provider does not return, and every sample
+        for other models, is requested concurrently. Returns one dict per
+        sample with its share of the cost.
+        """
+        samples = []
+        if MODELS[model_key].get('supports_n') and n > 1:
+            response = self.make_api_request(model_key, prompt, temperature=temperature, n=n,
+                                             experiment=experiment)
+            if response['success']:
+                contents = response['contents'][:n]
+                share = response['cost'] / len(contents)
+                for content in contents:
+                    samples.append({
+                        'success': True,
+                        'content': content,
+                        'input_tokens': response['input_tokens'] / len(contents),
+                        'output_tokens': response['output_tokens'] / len(contents),
+                        'cost': share
+                    })
+        
+        missing = n - len(samples)
+        if missing:
+            with ThreadPoolExecutor(max_workers=missing) as pool:
+                futures = [pool.submit(self.make_api_request, model_key, prompt, temperature=temperature,
+                                       experiment=experiment)
+                           for _ in range(missing)]
+                samples.extend(future.result() for future in futures)
+        return samples
+    
+    def run_adaptive_experiment(self, dialogues, rate_fn, delta=0.05, min_dialogues=5):
+        """Race all (approach, model) combinations, dropping dominated ones.
+        
+        Dialogues are processed one at a time across every still-active
+        combination; ``rate_fn(result, experiment_type, model_key)`` scores
+        each new response on the 1-5 scale. After each dialogue, combinations
+        whose quality-rate upper bound is below the leader's lower bound stop
+        receiving API calls.
+        """
+        race = Race(self.spec.cells(),
+                    delta=delta, min_trials=min_dialogues)
+        all_results = ResultTable(PROMPT_TEMPLATES, MODELS)
+        calls = 0
+        
+        for i, dialogue in enumerate(dialogues, 1):
+            print(f"\nDialogue {i}/{len(dialogues)} (ID: {dialogue.get('test_id')}), "
+                  f"{len(race.active)} combinations active")
+            dialogue_id = str(dialogue.get('test_id'))
+            
+            for experiment in self.spec.strategy_names():
+                models = [model_key for model_key in self.spec.model_keys() if (experiment, model_key) in race.active]
+                if not models:
+                    continue
+                result = self.run_single_dialogue(dialogue, experiment, models,
+                                                  record=all_results.row(dialogue_id))
+                calls += len(models)
+                for model_key in models:
+                    if result.get_cell(experiment, model_key, 'response').startswith('ERROR:'):
+                        continue
+                    rating = rate_fn(result, experiment, model_key)
+                    result.set(experiment, model_key, rating=rating)
+                    race.update((experiment, model_key), rating)
+            
+            for experiment, model_key in race.eliminate(i):
+                print(f"  ✂️  Dropping {experiment} + {MODELS[model_key]['name']}")
+            if race.finished:
+                print(f"\n🏁 One combination left after {i} dialogues")
+                break
+        
+        full_calls = len(dialogues) * len(race.arms)
+        experiment, model_key = race.leader()
+        print(f"\n🏆 Leader: {experiment} + {MODELS[model_key]['name']}")
+        for row in race.report():
+            print(f"  {row['approach']:<10} {row['model']:<13} rate {row['quality_rate']:.2f} "
+                  f"[{row['lower_bound']:.2f}, {row['upper_bound']:.2f}] n={row['trials']}")
+        print(f"📉 {calls} API calls instead of {full_calls} ({1 - calls / full_calls:.0%} saved)")
+        
+        self.export_results(all_results)
+        return race
+    
+    def run_sampling(self, dialogues, n=5, temperature=0.7, experiments=None,
+                     max_workers=8, output_path=None):
+        """Store ``n`` sampled responses per (dialogue, experiment, model) cell.
+        
+        Rows are written in long format, one per sample, so raters (or a
+        judge) can add a ``rating`` column for variance analysis.
+        """
+        experiments = experiments or self.spec.strategy_names()
+        output_path = output_path or f"tutoring_samples_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        fieldnames = ['test_id', 'math_level', 'expected_result', 'experiment', 'model', 'sample',
+                      'response', 'scratchpad', 'final', 'parse_error', 'input_tokens', 'output_tokens', 'cost']
+        
+        def run_cell(dialogue, experiment_type, model_key):
+            prompt = self.spec.prompt(experiment_type, self.get_conversation(dialogue).formatted())
+            return dialogue, experiment_type, model_key, self.sample_completions(
+                model_key, prompt, n, temperature, experiment_type)
+        
+        print(f"\n🎲 Sampling {n} completions per cell (temperature {temperature})")
+        
+        with open(output_path, 'w', newline='', encoding='utf-8') as csvfile, \
+                ThreadPoolExecutor(max_workers=max_workers) as pool:
+            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+            writer.writeheader()
+            futures = [pool.submit(run_cell, dialogue, experiment_type, model_key)
+                       for dialogue in dialogues
+                       for experiment_type, model_key in self.spec.cells()
+                       if experiment_type in experiments]
+            
+            for future in as_completed(futures):
+                dialogue, experiment_type, model_key, samples = future.result()
+                for i, sample in enumerate(samples):
+                    row = {
+                        'test_id': dialogue.get('test_id'),
+                        'math_level': dialogue.get('math_level'),
+                        'expected_result': dialogue.get('expected_result'),
+                        'experiment': experiment_type,
+                        'model': model_key,
+                        'sample': i,
+                        'cost': sample['cost']
+                    }
+                    if sample['success']:
+                        row['response'] = sample['content']
+                        row['input_tokens'] = sample['input_tokens']
+                        row['output_tokens'] = sample['output_tokens']
+                        scratchpad, final_response, error = self.spec.parse(experiment_type, sample['content'])
+                        if scratchpad is not None:
+                            row['scratchpad'], row['final'], row['parse_error'] = scratchpad, final_response, error
+                    else:
+                        row['response'] = f"ERROR: {sample.get('error')}"
+                    writer.writerow(row)
+                    self.total_cost += sample['cost']
+                csvfile.flush()
+                ok = sum(sample['success'] for sample in samples)
+                print(f"  ✅ {dialogue.get('test_id')} / {experiment_type} / {MODELS[model_key]['name']}: "
+                      f"{ok}/{n} samples")
+        
+        print(f"✅ Samples written to {output_path}")
+        print(f"💰 TOTAL COST: ${self.total_cost:.4f}")
+        return output_path
+    
+    def preflight(self, dialogues, concurrency=1, history_path=None):
+        """Print token, cost and time estimates for running the spec on ``dialogues``.
+        
+        Output-token predictions come from ``history_path`` or, by default,
+        the newest ``tutoring_results_*.csv`` in the working directory.
+        """
+        import pandas as pd
+        
+        if history_path is None:
+            previous = sorted(glob.glob('tutoring_results_*.csv'))
+            history_path = previous[-1] if previous else None
+        history = None
+        if history_path:
+            blob_path = blobs_for(history_path, self.registry_path) if self.registry_path else None
+            history = preflight.output_token_history(pd.read_csv(history_path), self.spec.strategy_names(),
+                                                     self.spec.model_keys(), blob_path)
+        plan, flagged = preflight.estimate_run(dialogues, self.spec,
+                                               lambda dialogue: self.get_conversation(dialogue).formatted(),
+                                               history, concurrency)
+        preflight.print_plan(plan, flagged)
+        return plan, flagged
+    
+    def load_dialogues(self, path='../comta_evaluation_sample.json'):
+        """Load the dialogue sample, or return None if it cannot be read."""
         try:
-            with open('../comta_evaluation_sample.json', 'r') as f:
+            with span('load_dialogues'), open(path, 'r') as f:
                 dialogues = json.load(f)
             print(f"✅ Loaded {len(dialogues)} dialogues")
+            return dialogues
         except Exception as e:
             print(f"❌ Error loading data: {e}")
+            return None
+    
+    def run_plan(self, tasks, results, max_workers=1):
+        """Execute spec tasks in plan order, writing every cell they fill into ``results``.
+        
+        A task shared by several cells is requested once: each cell records
+        the response and an equal share of its cost, so per-cell costs add
+        up to ``total_cost``.
+        """
+        def execute(task):
+            return task, self.make_api_request(task.model, task.prompt, experiment=task.strategy,
+                                               stream_parser=self.spec.stream_parser(task.strategy, task.model),
+                                               **self.generation_kwargs(task.generation))
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(execute, task) for task in tasks]
+            for done, future in enumerate(as_completed(futures), 1):
+                task, response = future.result()
+                if response['success']:
+                    self.total_cost += response['cost']
+                    status = f"✅ ${response['cost']:.4f}"
+                    response = dict(response, cost=response['cost'] / len(task.cells))
+                else:
+                    status = f"❌ {response.get('error', 'Unknown error')}"
+                for dialogue, strategy, model_key in task.cells:
+                    record = results.row(str(dialogue.get('test_id')))
+                    self.record_response(record, dialogue, strategy, model_key, response)
+                shared = f" (+{len(task.cells) - 1} shared)" if len(task.cells) > 1 else ""
+                print(f"  [{done}/{len(tasks)}] {task.dialogue.get('test_id')} / {task.strategy} / "
+                      f"{MODELS[task.model]['name']}: {status}{shared}")
+        return results
+    
+    def print_parse_failures(self):
+        """Parse-failure rate per parsed (strategy, model) cell, and early-stopped streams."""
+        rates = self.metrics.parse_failure_rates()
+        if not rates:
+            return
+        print("\n🧩 PARSE FAILURES")
+        for (experiment, model_key), (failures, parsed, reasons) in sorted(rates.items()):
+            detail = ", ".join(f"{reason} {count}" for reason, count in sorted(reasons.items()))
+            print(f"  {experiment} / {MODELS[model_key]['name']}: {failures}/{parsed} ({failures / parsed:.0%})"
+                  + (f" - {detail}" if detail else ""))
+        early_stops = sum(self.metrics.early_stops.values())
+        if early_stops:
+            print(f"  ✂️  {early_stops} streams closed once the final answer was complete")
+    
+    def run_complete_experiment(self, dialogues=None, max_workers=1):
+        """Run every (strategy, model) cell of the spec on every dialogue."""
+        print("🚀 COMPLETE AI TUTORING EXPERIMENT")
+        print("=" * 50)
+        
+        # Load sample data
+        if dialogues is None:
+            dialogues = self.load_dialogues()
+        if dialogues is None:
             return
         
         # Test API
         print("\n🔧 Testing API connectivity...")
-        test_response = self.make_api_request('gpt4o_mini', "Hello! Say 'Test successful.'")
+        test_model = 'gpt4o_mini' if 'gpt4o_mini' in MODELS else next(iter(MODELS))
+        test_response = self.make_api_request(test_model, "Hello! Say 'Test successful.'")
         if not test_response['success']:
             print(f"❌ API test failed: {test_response.get('error')}")
             return
         print(f"✅ API working (${test_response['cost']:.4f})")
         
-        # Estimate cost
-        estimated_cost = len(dialogues) * len(MODELS) * 3 * 0.002
-        print(f"📊 Estimated total cost: ~${estimated_cost:.2f}")
+        # Estimate cost from locally counted prompt tokens
+        self.preflight(dialogues, concurrency=max_workers)
         
         proceed = input("\nProceed with full experiment? (y/n): ").lower().strip()
         if proceed != 'y':
             print("Experiment cancelled.")
             return
         
-        # Run experiments
-        print(f"\n🎬 Starting experiments...")
-        
-        all_results = {}
+        # Expand the spec into deduplicated API calls ordered across rate limits
+        tasks = self.spec.plan(dialogues, lambda dialogue: self.get_conversation(dialogue).formatted())
+        n_cells = sum(len(task.cells) for task in tasks)
+        print(f"\n🎬 Starting experiments: {n_cells} cells in {len(tasks)} API calls "
+              f"({n_cells - len(tasks)} shared), {max_workers} at a time")
         
-        for experiment in ['zero_shot', 'few_shot', 'cot']:
-            print(f"\n{'='*60}")
-            print(f"📝 EXPERIMENT: {experiment.upper().replace('_', '-')}")
-            print(f"{'='*60}")
-            
-            for i, dialogue in enumerate(dialogues, 1):
-                print(f"\nDialogue {i}/{len(dialogues)} (ID: {dialogue.get('test_id')})")
-                
-                result = self.run_single_dialogue(dialogue, experiment)
-                
-                # Store result
-                dialogue_id = str(dialogue.get('test_id'))
-                if dialogue_id not in all_results:
-                    all_results[dialogue_id] = result
-                else:
-                    all_results[dialogue_id].update(result)
+        all_results = ResultTable(PROMPT_TEMPLATES, MODELS)
+        # rows in dialogue order, whatever order the calls finish in
+        for dialogue in dialogues:
+            all_results.row(str(dialogue.get('test_id')))
+        self.run_plan(tasks, all_results, max_workers)
+        self.print_parse_failures()
         
         # Export results
         self.export_results(all_results)
@@ -295,7 +902,12 @@ Then provide your tutor response.
         print(f"🎉 EXPERIMENT COMPLETE!")
     
     def export_results(self, results):
-        """Export results to CSV."""
+        """Export results to CSV.
+        
+        With ``blob_path`` set, response/scratchpad/final text is appended to
+        that blob file and the CSV stores offsets and lengths instead;
+        ``blob_dictionary`` zstd-compresses each cell in a new blob.
+        """
         print(f"\n📊 Exporting results...")
         
         filename = f"tutoring_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
@@ -304,13 +916,24 @@ Then provide your tutor response.
             print("No results to export")
             return
         
-        # Get all fieldnames
-        fieldnames = set()
-        for result in results.values():
-            fieldnames.update(result.keys())
-        fieldnames = sorted(list(fieldnames))
+        if isinstance(results, ResultTable):
+            fieldnames = results.fieldnames()
+            records = results.records()
+        else:
+            # Get all fieldnames
+            fieldnames = set()
+            for result in results.values():
+                fieldnames.update(result.keys())
+            fieldnames = sorted(list(fieldnames))
+            records = results.values()
+        
+        blob_writer = None
+        if self.blob_path:
+            blob_writer = BlobWriter(self.blob_path, self.blob_dictionary)
+            fieldnames = offloaded_fieldnames(fieldnames)
+            records = (offload_record(record, blob_writer) for record in records)
         
-        with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
+        with span('export_results'), open(filename, 'w', newline='', encoding='utf-8') as csvfile:
             writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
             writer.writeheader()
             
@@ -324,14 +947,113 @@ Then provide your tutor response.
             writer.writerow(criteria_row)
             
             # Add data
-            for result in results.values():
-                writer.writerow(result)
+            for record in records:
+                writer.writerow(record)
         
+        if blob_writer:
+            blob_writer.close()
+            print(f"📦 Response text appended to {self.blob_path}")
         print(f"✅ Results exported to {filename}")
         print(f"📋 {len(results)} dialogues exported")
+        if self.registry_path:
+            run_id = register_run(filename, self.run_config, self.blob_path, self.registry_path, self.spec)
+            print(f"🗂️  Registered run {run_id} in {self.registry_path}")
         
         return filename
 
+def prompt_for_rating(result, experiment_type, model_key):
+    """Ask the operator for a 1-5 rating of one response (blank skips)."""
+    print(f"\n--- {experiment_type} / {MODELS[model_key]['name']} ---")
+    print(result.get(f'{experiment_type}_{model_key}_final') or result[f'{experiment_type}_{model_key}_response'])
+    while True:
+        answer = input("Rating 1-5 (blank to skip): ").strip()
+        if not answer:
+            return None
+        try:
+            rating = float(answer)
+        except ValueError:
+            rating = None
+        if rating is not None and 1 <= rating <= 5:
+            return rating
+        print(f"❌ '{answer}' is not a rating from 1 to 5")
+
 if __name__ == "__main__":
-    runner = ExperimentRunner()
-    runner.run_complete_experiment()
+    parser = argparse.ArgumentParser(description="Run the AI tutoring experiment.")
+    parser.add_argument('--data', default='../comta_evaluation_sample.json',
+                        help="dialogue sample JSON")
+    parser.add_argument('--rollout-turns', type=int, default=0,
+                        help="run multi-turn rollouts with this many tutor turns per dialogue")
+    parser.add_argument('--experiment', default='few_shot',
+                        help="prompt style (spec strategy) for rollouts")
+    parser.add_argument('--student', default='scripted',
+                        help="'scripted' or a model key to play the student")
+    parser.add_argument('--workers', type=int, default=8,
+                        help="concurrent API calls / rollouts / sampled cells")
+    parser.add_argument('--spec', metavar='JSON',
+                        help="experiment spec with models, strategies and generation params "
+                             "(default: experiment_spec.json if present)")
+    parser.add_argument('--samples', type=int, default=0,
+                        help="draw this many completions per cell to measure rating variance")
+    parser.add_argument('--temperature', type=float, default=0.7,
+                        help="sampling temperature for --samples")
+    parser.add_argument('--adaptive', action='store_true',
+                        help="race combinations and stop calling confidently dominated ones")
+    parser.add_argument('--delta', type=float, default=0.05,
+                        help="error probability for --adaptive elimination")
+    parser.add_argument('--output', help="rollout/sample output path")
+    parser.add_argument('--subset', type=int, metavar='K',
+                        help="run a stratified smoke subset of K dialogues")
+    parser.add_argument('--subset-diversify', choices=['length', 'embedding'],
+                        help="spread subset picks by dialogue length or text embedding")
+    parser.add_argument('--seed', type=int, default=0, help="subset selection seed")
+    parser.add_argument('--blobs', metavar='PATH',
+                        help="store response text in this blob file and write offsets to the CSV")
+    parser.add_argument('--blob-dict', metavar='DICT',
+                        help="zstd dictionary (blob_store.py train) to compress a new --blobs file with")
+    parser.add_argument('--metrics-port', type=int, metavar='PORT',
+                        help="serve Prometheus metrics on http://127.0.0.1:PORT/metrics")
+    parser.add_argument('--status-interval', type=float, default=0, metavar='SECONDS',
+                        help="print a one-line progress summary this often")
+    parser.add_argument('--registry', default=REGISTRY_PATH,
+                        help="run registry to record this run in ('' to skip)")
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    profiling.start_from_args(args)
+    
+    spec = load_spec(args.spec, ExperimentSpec.default(MODELS, PROMPT_TEMPLATES))
+    with spec.install(MODELS, PROMPT_TEMPLATES):
+        if args.experiment not in PROMPT_TEMPLATES:
+            parser.error(f"--experiment must be one of: {', '.join(sorted(PROMPT_TEMPLATES))}")
+    
+        runner = ExperimentRunner()
+        runner.spec = spec
+        runner.registry_path = args.registry
+        runner.run_config = vars(args)
+        if args.metrics_port:
+            start_metrics_server(runner.metrics, args.metrics_port)
+            print(f"📡 Metrics on http://127.0.0.1:{args.metrics_port}/metrics")
+        if args.status_interval:
+            runner.metrics.start_status_line(args.status_interval)
+        runner.blob_path = args.blobs
+        if args.blob_dict:
+            with open(args.blob_dict, 'rb') as f:
+                runner.blob_dictionary = f.read()
+        dialogues = runner.load_dialogues(args.data)
+        if dialogues and args.subset:
+            dialogues = select_subset(dialogues, args.subset, seed=args.seed, diversify=args.subset_diversify)
+            print(f"🎯 Smoke subset: {len(dialogues)} dialogues stratified by math level and expected result")
+    
+        if not dialogues:
+            raise SystemExit(1)
+    
+        if args.adaptive:
+            runner.run_adaptive_experiment(dialogues, prompt_for_rating, args.delta)
+        elif args.samples:
+            runner.run_sampling(dialogues, args.samples, args.temperature,
+                                max_workers=args.workers, output_path=args.output)
+        elif args.rollout_turns:
+            student = ScriptedStudent() if args.student == 'scripted' else ModelStudent(args.student)
+            runner.run_rollouts(dialogues, args.experiment, args.rollout_turns, student,
+                                max_workers=args.workers, output_path=args.output)
+        else:
+            runner.run_complete_experiment(dialogues, max_workers=args.workers)
\ No newline at end of file
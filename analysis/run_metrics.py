@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Live counters for long experiment runs, served in Prometheus text format.
+
+``RunMetrics`` is updated once when a request starts and once when it
+finishes (a lock and a few integer updates), so it is always on. Rendering,
+the HTTP endpoint and the periodic status line run in their own daemon
+threads and only read the counters.
+
+Exposed series:
+    tutoring_requests_in_flight                          gauge
+    tutoring_cells_completed_total{experiment,model}     counter
+    tutoring_cells_per_second                            gauge (last 60 s)
+    tutoring_request_errors_total{model}                 counter
+    tutoring_request_retries_total{model}                counter
+    tutoring_total_cost_usd                              gauge
+    tutoring_request_latency_seconds{experiment,model}   histogram
+    tutoring_responses_parsed_total{experiment,model}    counter (CoT/structured cells)
+    tutoring_parse_failures_total{experiment,model,reason} counter
+    tutoring_early_stops_total{model}                    counter (streams closed after the final answer)
+"""
+
+import bisect
+import threading
+import time
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LATENCY_BUCKETS = (0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0)
+RATE_WINDOW = 60.0
+
+
+class RunMetrics:
+    """Thread-safe request counters for one runner."""
+
+    def __init__(self, total_cost=lambda: 0.0):
+        self.total_cost = total_cost
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = defaultdict(int)
+        self.errors = defaultdict(int)
+        self.retries = defaultdict(int)
+        self.latency_counts = defaultdict(lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+        self.latency_sum = defaultdict(float)
+        self.parsed = defaultdict(int)
+        self.parse_failures = defaultdict(int)
+        self.early_stops = defaultdict(int)
+        self._recent = deque(maxlen=100_000)
+        self._status = None
+
+    def request_started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def request_finished(self, experiment, model, response):
+        """Record one finished request from ``make_api_request``."""
+        now = time.monotonic()
+        with self._lock:
+            self.in_flight -= 1
+            self.retries[model] += response.get('retries', 0)
+            if not response['success']:
+                self.errors[model] += 1
+                return
+            key = (experiment, model)
+            self.completed[key] += 1
+            self.early_stops[model] += bool(response.get('stopped_early'))
+            self._recent.append(now)
+            latency = response.get('latency')
+            if latency is not None:
+                self.latency_counts[key][bisect.bisect_left(LATENCY_BUCKETS, latency)] += 1
+                self.latency_sum[key] += latency
+
+    def response_parsed(self, experiment, model, error):
+        """Record one parsed response; ``error`` is the parser's error code or None."""
+        with self._lock:
+            self.parsed[(experiment, model)] += 1
+            if error:
+                self.parse_failures[(experiment, model, error)] += 1
+
+    def parse_failure_rates(self):
+        """{(experiment, model): (failures, parsed, {reason: count})} for every parsed cell."""
+        with self._lock:
+            rates = {key: [0, parsed, {}] for key, parsed in self.parsed.items()}
+            for (experiment, model, reason), count in self.parse_failures.items():
+                rates[(experiment, model)][0] += count
+                rates[(experiment, model)][2][reason] = count
+        return {key: tuple(value) for key, value in rates.items()}
+
+    def cells_per_second(self):
+        now = time.monotonic()
+        with self._lock:
+            recent = sum(1 for t in reversed(self._recent) if now - t <= RATE_WINDOW)
+        return recent / max(min(RATE_WINDOW, now - self.started), 1e-9)
+
+    def render(self):
+        """Metrics in Prometheus text exposition format."""
+        with self._lock:
+            in_flight = self.in_flight
+            completed = dict(self.completed)
+            errors = dict(self.errors)
+            retries = dict(self.retries)
+            latency = {key: (list(counts), self.latency_sum[key]) for key, counts in self.latency_counts.items()}
+            parsed = dict(self.parsed)
+            parse_failures = dict(self.parse_failures)
+            early_stops = dict(self.early_stops)
+        lines = [
+            '# HELP tutoring_requests_in_flight API requests waiting for a response.',
+            '# TYPE tutoring_requests_in_flight gauge',
+            f'tutoring_requests_in_flight {in_flight}',
+            '# HELP tutoring_cells_completed_total Successful responses per experiment and model.',
+            '# TYPE tutoring_cells_completed_total counter'
+        ]
+        lines += [f'tutoring_cells_completed_total{{experiment="{e}",model="{m}"}} {count}'
+                  for (e, m), count in sorted(completed.items())]
+        lines += [
+            '# HELP tutoring_cells_per_second Completed cells per second over the last minute.',
+            '# TYPE tutoring_cells_per_second gauge',
+            f'tutoring_cells_per_second {self.cells_per_second():.4f}',
+            '# HELP tutoring_request_errors_total Requests that failed after retries.',
+            '# TYPE tutoring_request_errors_total counter'
+        ]
+        lines += [f'tutoring_request_errors_total{{model="{m}"}} {count}' for m, count in sorted(errors.items())]
+        lines += ['# HELP tutoring_request_retries_total Retried request attempts.',
+                  '# TYPE tutoring_request_retries_total counter']
+        lines += [f'tutoring_request_retries_total{{model="{m}"}} {count}' for m, count in sorted(retries.items())]
+        lines += [
+            '# HELP tutoring_total_cost_usd Running cost of this run.',
+            '# TYPE tutoring_total_cost_usd gauge',
+            f'tutoring_total_cost_usd {self.total_cost():.6f}',
+            '# HELP tutoring_request_latency_seconds Request latency per experiment and model.',
+            '# TYPE tutoring_request_latency_seconds histogram'
+        ]
+        for (e, m), (counts, total) in sorted(latency.items()):
+            labels = f'experiment="{e}",model="{m}"'
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), counts):
+                cumulative += count
+                lines.append(f'tutoring_request_latency_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'tutoring_request_latency_seconds_sum{{{labels}}} {total:.6f}')
+            lines.append(f'tutoring_request_latency_seconds_count{{{labels}}} {cumulative}')
+        lines += ['# HELP tutoring_responses_parsed_total Responses split by a scratchpad or JSON parser.',
+                  '# TYPE tutoring_responses_parsed_total counter']
+        lines += [f'tutoring_responses_parsed_total{{experiment="{e}",model="{m}"}} {count}'
+                  for (e, m), count in sorted(parsed.items())]
+        lines += ['# HELP tutoring_parse_failures_total Responses whose final answer could not be parsed.',
+                  '# TYPE tutoring_parse_failures_total counter']
+        lines += [f'tutoring_parse_failures_total{{experiment="{e}",model="{m}",reason="{r}"}} {count}'
+                  for (e, m, r), count in sorted(parse_failures.items())]
+        lines += ['# HELP tutoring_early_stops_total Streams closed once the final answer was complete.',
+                  '# TYPE tutoring_early_stops_total counter']
+        lines += [f'tutoring_early_stops_total{{model="{m}"}} {count}' for m, count in sorted(early_stops.items())]
+        return '\n'.join(lines) + '\n'
+
+    def status_line(self):
+        with self._lock:
+            done = sum(self.completed.values())
+            in_flight = self.in_flight
+            errors = sum(self.errors.values())
+            retries = sum(self.retries.values())
+        elapsed = time.monotonic() - self.started
+        return (f"⏳ {done} cells ({self.cells_per_second():.1f}/s) | {in_flight} in flight | "
+                f"{errors} errors | {retries} retries | ${self.total_cost():.4f} | {elapsed / 60:.1f} min")
+
+    def start_status_line(self, interval):
+        """Print ``status_line()`` every ``interval`` seconds until ``stop_status_line``."""
+        stop = threading.Event()
+
+        def loop():
+            while not stop.wait(interval):
+                print(self.status_line(), flush=True)
+
+        threading.Thread(target=loop, daemon=True).start()
+        self._status = stop
+
+    def stop_status_line(self):
+        if self._status is not None:
+            self._status.set()
+            self._status = None
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    metrics = None
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        payload = self.metrics.render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def start_server(metrics, port=9108, host='127.0.0.1'):
+    """Serve ``/metrics`` in a background thread; returns the server."""
+    handler = type('Handler', (MetricsHandler,), {'metrics': metrics})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
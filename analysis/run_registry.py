@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Registry of experiment runs and cross-run trend analysis.
+
+Every export from ``run_experiment.py`` appends an entry to ``runs.jsonl``
+with the run's command-line config, model ids and per-token prices, a hash
+of each prompt template, the git revision and where its outputs went
+(results CSV, blob file and, once rated, the evaluation CSV). Paths are
+stored relative to the registry so the data directory can move. Later
+entries for the same ``run_id`` are merged into earlier ones, so outputs can
+be added as they appear (``add`` below, or ``llm_judge.py`` output).
+
+``trends`` summarises each run's results per (approach, model, subject) in a
+process pool and caches the summaries in ``run_summaries.json`` keyed by
+path, size and modification time, so only new or changed files are read
+again. Drift is reported per group as the change and per-run slope of mean
+rating, cost and latency, plus a z-score of the latest run's mean rating
+against all earlier runs pooled.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from experiment_spec import EXPERIMENTS, load_spec
+
+REGISTRY_PATH = 'runs.jsonl'
+CACHE_PATH = 'run_summaries.json'
+RUN_ID_PATTERN = re.compile(r'(?<!\d)(\d{8}(?:_\d{6})?)(?!\d)')
+TEXT_COLUMNS = ('conversation_history', 'student_claim', 'expected_result')
+TEXT_SUFFIXES = ('_response', '_scratchpad', '_final', '_offset', '_length')
+METRICS = ('rating', 'cost', 'latency', 'output_tokens')
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run_id_for(path):
+    """``YYYYMMDD_HHMMSS`` or ``YYYYMMDD`` stamp in the file name, else the file's mtime."""
+    match = RUN_ID_PATTERN.search(os.path.basename(path))
+    if match:
+        return match.group(1)
+    return datetime.fromtimestamp(os.path.getmtime(path)).strftime('%Y%m%d_%H%M%S')
+
+
+def _relative(path, registry):
+    return os.path.relpath(os.path.abspath(path), os.path.dirname(os.path.abspath(registry)))
+
+
+def _append(registry, entry):
+    with open(registry, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry, ensure_ascii=False, default=str) + '\n')
+
+
+def register_run(results_path, config=None, blob_path=None, registry=REGISTRY_PATH, spec=None):
+    """Append an entry for a freshly exported results file; returns the run id.
+
+    Models and prompts are recorded from ``spec`` when given, else from
+    ``run_experiment``'s tables.
+    """
+    from pricing import DEFAULT_SCENARIO
+
+    if spec is None:
+        from run_experiment import MODELS as models, PROMPT_TEMPLATES as templates
+    else:
+        models = spec.models
+        templates = {name: spec.template(name) for name in spec.strategy_names()}
+
+    run_id = run_id_for(results_path)
+    outputs = {'results': _relative(results_path, registry)}
+    if blob_path:
+        outputs['blobs'] = _relative(blob_path, registry)
+    _append(registry, {
+        'run_id': run_id,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'git_revision': git_revision(),
+        'config': config or {},
+        'models': {key: {'model_id': model['model_id'], 'cost_per_1k_input': model['cost_per_1k_input'],
+                         'cost_per_1k_output': model['cost_per_1k_output']} for key, model in models.items()},
+        'prompts': {experiment: hashlib.sha256(''.join(template).encode()).hexdigest()[:12]
+                    for experiment, template in templates.items()},
+        'pricing_scenario': DEFAULT_SCENARIO,
+        'outputs': outputs
+    })
+    return run_id
+
+
+def add_output(run_id, kind, path, registry=REGISTRY_PATH):
+    """Record another output (e.g. ``evaluation``) for an existing or new run."""
+    _append(registry, {'run_id': run_id, 'outputs': {kind: _relative(path, registry)}})
+
+
+def load_registry(registry=REGISTRY_PATH):
+    """Runs by id, oldest first, with later entries merged in and absolute output paths."""
+    runs = {}
+    if not os.path.exists(registry):
+        return runs
+    base = os.path.dirname(os.path.abspath(registry))
+    with open(registry, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            run = runs.setdefault(entry['run_id'], {'run_id': entry['run_id'], 'outputs': {}})
+            outputs = {kind: os.path.join(base, path) for kind, path in entry.pop('outputs', {}).items()}
+            run.update(entry)
+            run['outputs'].update(outputs)
+    return dict(sorted(runs.items()))
+
+
+def resolve_output(run_id, kind='evaluation', registry=REGISTRY_PATH):
+    """Path of one output of ``run_id`` (``latest`` for the newest run with that output)."""
+    runs = load_registry(registry)
+    if run_id == 'latest':
+        candidates = [run for run in runs.values() if kind in run['outputs']]
+        if not candidates:
+            raise KeyError(f"No run in {registry} has a '{kind}' output")
+        return candidates[-1]['outputs'][kind]
+    if run_id not in runs or kind not in runs[run_id]['outputs']:
+        raise KeyError(f"Run '{run_id}' has no '{kind}' output in {registry}")
+    return runs[run_id]['outputs'][kind]
+
+
+def blobs_for(path, registry=REGISTRY_PATH):
+    """Blob file of the registered run that ``path`` is an output of, else None."""
+    path = os.path.abspath(path)
+    for run in load_registry(registry).values():
+        if path in {os.path.abspath(output) for output in run['outputs'].values()}:
+            return run['outputs'].get('blobs')
+    return None
+
+
+def _numeric_column(column):
+    return column not in TEXT_COLUMNS and not column.endswith(TEXT_SUFFIXES)
+
+
+def summarize_run(path):
+    """Count, mean and std of each metric per (approach, model, subject) for one file."""
+    df = pd.read_csv(path, usecols=_numeric_column, low_memory=False)
+    df = df[df['test_id'].astype(str) != 'EVALUATION_CRITERIA']
+    subjects = df['math_level'].fillna('Unknown')
+    frames = []
+    for experiment in EXPERIMENTS:
+        prefix = f'{experiment}_'
+        for column in df.columns:
+            if not (column.startswith(prefix) and column.endswith('_cost')):
+                continue
+            model = column[len(prefix):-len('_cost')]
+            cell = pd.DataFrame({'subject': subjects})
+            for metric in METRICS:
+                name = f'{experiment}_{model}_{metric}'
+                cell[metric] = pd.to_numeric(df[name], errors='coerce') if name in df.columns else np.nan
+            grouped = cell.groupby('subject')[list(METRICS)].agg(['count', 'mean', 'std'])
+            grouped.columns = [f'{stat}_{metric}' if stat != 'count' else f'n_{metric}'
+                               for metric, stat in grouped.columns]
+            frames.append(grouped.reset_index().assign(approach=experiment, model=model))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def _stamp(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def load_summaries(paths, cache_path=CACHE_PATH, workers=None, spec=None):
+    """Summaries for ``paths``, reading only files that changed since they were cached.
+
+    Workers install ``spec`` (default: the one ``load_spec`` finds) so they
+    split columns by the same strategies as this process; summaries cached
+    under other strategies are read again.
+    """
+    spec = spec or load_spec()
+    experiments = spec.strategy_names()
+    cache = {}
+    if os.path.exists(cache_path):
+        with open(cache_path, encoding='utf-8') as f:
+            cache = json.load(f)
+    stamps = {path: _stamp(path) for path in paths}
+    stale = [path for path in paths
+             if [cache.get(path, {}).get(key) for key in ('stamp', 'experiments')] != [stamps[path], experiments]]
+    if stale:
+        with ProcessPoolExecutor(max_workers=workers, initializer=spec.install) as pool:
+            for path, summary in zip(stale, pool.map(summarize_run, stale, chunksize=4)):
+                cache[path] = {'stamp': stamps[path], 'experiments': experiments, 'rows': summary.to_dict('records')}
+        with open(cache_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f)
+    return {path: pd.DataFrame(cache[path]['rows']) for path in paths}, len(stale)
+
+
+def run_summaries(runs, cache_path=CACHE_PATH, workers=None, spec=None):
+    """One table of per-group summaries for every run, using its evaluation file if rated."""
+    paths = {}
+    for run_id, run in runs.items():
+        path = run['outputs'].get('evaluation') or run['outputs'].get('results')
+        if path and os.path.exists(path):
+            paths[run_id] = path
+    summaries, n_read = load_summaries(sorted(set(paths.values())), cache_path, workers, spec)
+    frames = [summaries[path].assign(run_id=run_id) for run_id, path in paths.items() if len(summaries[path])]
+    table = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    table.attrs['files_read'] = n_read
+    return table
+
+
+def drift(summaries, min_runs=2):
+    """Per (approach, model, subject): change and slope across runs, and the latest run's z-score.
+
+    Metrics are pivoted to (groups x runs) arrays in run order, so slopes and
+    z-scores for every group are computed at once.
+    """
+    keys = ['approach', 'model', 'subject']
+    runs = sorted(summaries['run_id'].unique())
+    position = np.arange(len(runs), dtype=float)
+    result = None
+    for metric in ('rating', 'cost', 'latency'):
+        grid = summaries.set_index(keys + ['run_id'])[f'mean_{metric}'].unstack('run_id').reindex(columns=runs)
+        values = grid.to_numpy()
+        seen = ~np.isnan(values)
+        count = seen.sum(axis=1)
+        x = np.where(seen, position, np.nan)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            x_centered = x - np.nanmean(x, axis=1, keepdims=True)
+            slope = (np.nansum(x_centered * (values - np.nanmean(values, axis=1, keepdims=True)), axis=1)
+                     / np.nansum(x_centered ** 2, axis=1))
+        last_index = np.where(seen, position, -1).argmax(axis=1)
+        first_index = np.where(seen, position, np.inf).argmin(axis=1)
+        rows = np.arange(len(values))
+        frame = pd.DataFrame({
+            f'{metric}_first': values[rows, first_index],
+            f'{metric}_last': values[rows, last_index],
+            f'{metric}_slope': np.where(count >= min_runs, slope, np.nan)
+        }, index=grid.index)
+        frame[f'{metric}_change'] = frame[f'{metric}_last'] - frame[f'{metric}_first']
+        if metric == 'rating':
+            frame.insert(0, 'runs', count)
+            frame.insert(1, 'last_run', np.where(count > 0, np.array(runs, dtype=object)[last_index], None))
+            frame['rating_z'] = _latest_z(summaries, keys, runs, grid.index, last_index)
+        result = frame if result is None else result.join(frame)
+    return result.reset_index()
+
+
+def _latest_z(summaries, keys, runs, index, last_index):
+    """Welch z of the latest run's mean rating against all earlier runs pooled."""
+    def grid(column):
+        values = summaries.set_index(keys + ['run_id'])[column].unstack('run_id')
+        return values.reindex(index=index, columns=runs).to_numpy()
+
+    n, mean, std = grid('n_rating'), grid('mean_rating'), grid('std_rating')
+    n, std = np.nan_to_num(n), np.nan_to_num(std)
+    mean_filled = np.nan_to_num(mean)
+    rows = np.arange(len(index))
+    earlier = np.arange(len(runs))[None, :] < last_index[:, None]
+    n_earlier = np.where(earlier, n, 0)
+    total = n_earlier.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        pooled_mean = (n_earlier * mean_filled).sum(axis=1) / total
+        # within-run plus between-run variation of the earlier runs
+        pooled_var = (np.where(earlier, np.maximum(n - 1, 0) * std ** 2 + n * (mean_filled - pooled_mean[:, None]) ** 2,
+                               0).sum(axis=1) / np.maximum(total - 1, 1))
+        n_last, mean_last, std_last = n[rows, last_index], mean[rows, last_index], std[rows, last_index]
+        z = (mean_last - pooled_mean) / np.sqrt(std_last ** 2 / n_last + pooled_var / total)
+    return np.where((total >= 2) & (n_last >= 2), z, np.nan)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run registry and cross-run trend analysis.")
+    parser.add_argument('--registry', default=REGISTRY_PATH)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('list', help="show registered runs")
+
+    add = subparsers.add_parser('add', help="register an existing results or evaluation file")
+    add.add_argument('path')
+    add.add_argument('--kind', default='results', help="output kind (results, evaluation, blobs, ...)")
+    add.add_argument('--run-id', help="defaults to the timestamp in the file name")
+
+    trend = subparsers.add_parser('trends', help="report metric drift across runs")
+    trend.add_argument('--cache', default=CACHE_PATH)
+    trend.add_argument('--workers', type=int, help="processes for reading changed files")
+    trend.add_argument('--spec', metavar='JSON',
+                       help="experiment spec whose strategies to summarise (default: experiment_spec.json if present)")
+    trend.add_argument('--z', type=float, default=3.0, help="flag |z| of the latest run above this")
+    trend.add_argument('--output', default='run_trends.csv')
+    args = parser.parse_args()
+
+    if args.command == 'add':
+        run_id = args.run_id or run_id_for(args.path)
+        add_output(run_id, args.kind, args.path, args.registry)
+        print(f"✅ Registered {args.path} as '{args.kind}' for run {run_id}")
+
+    elif args.command == 'list':
+        for run_id, run in load_registry(args.registry).items():
+            models = ', '.join(run.get('models', {})) or '?'
+            print(f"  {run_id}  rev {run.get('git_revision', '?'):<8} models {models}")
+            for kind, path in run['outputs'].items():
+                print(f"      {kind:<11} {path}{'' if os.path.exists(path) else '  (missing)'}")
+
+    else:
+        import time
+
+        started = time.perf_counter()
+        spec = load_spec(args.spec)
+        spec.install()  # in effect until the script exits
+        runs = load_registry(args.registry)
+        summaries = run_summaries(runs, args.cache, args.workers, spec)
+        if summaries.empty:
+            raise SystemExit(f"❌ No readable run outputs in {args.registry}")
+        report = drift(summaries)
+        elapsed = time.perf_counter() - started
+        print(f"📚 {summaries['run_id'].nunique()} runs ({summaries.attrs['files_read']} files read, "
+              f"the rest from {args.cache}) in {elapsed:.1f}s")
+
+        flagged = report[report['rating_z'].abs() > args.z].sort_values('rating_z', key=np.abs, ascending=False)
+        print(f"\n📈 RATING DRIFT (latest run vs. earlier runs, |z| > {args.z:g})")
+        if flagged.empty:
+            print("  none")
+        for _, row in flagged.iterrows():
+            print(f"  {row['approach']:<10} {row['model']:<13} {row['subject']:<13} "
+                  f"{row['rating_first']:.2f} → {row['rating_last']:.2f}  z {row['rating_z']:+.1f}  "
+                  f"({row['runs']} runs, latest {row['last_run']})")
+
+        overall = report.groupby(['approach', 'model'])[['rating_change', 'cost_change', 'latency_change']].mean()
+        print(f"\n📊 MEAN CHANGE FIRST → LATEST RUN (across subjects)")
+        print(overall.round(4).to_string())
+        report.to_csv(args.output, index=False)
+        print(f"\n✅ Saved {args.output}")
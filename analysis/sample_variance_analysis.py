@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Within-cell rating variance for sampled tutoring responses.
+
+Reads the long-format file written by ``run_experiment.py --samples N``
+after a ``rating`` column has been filled in (one row per sample) and reports
+how much ratings move between samples of the same (dialogue, experiment,
+model) cell versus between dialogues.
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+CELL_KEYS = ['test_id', 'experiment', 'model']
+
+
+def cell_statistics(samples_df):
+    """Per-cell mean, variance and spread of sample ratings."""
+    rated = samples_df.dropna(subset=['rating'])
+    grouped = rated.groupby(CELL_KEYS)['rating']
+    cells = grouped.agg(['mean', 'var', 'std', 'min', 'max', 'count']).reset_index()
+    cells = cells.rename(columns={
+        'mean': 'cell_mean', 'var': 'cell_var', 'std': 'cell_std',
+        'min': 'cell_min', 'max': 'cell_max', 'count': 'n_samples'
+    })
+    cells['cell_range'] = cells['cell_max'] - cells['cell_min']
+    # A cell is unstable when its samples straddle the >= 3 quality threshold
+    cells['quality_flip'] = (cells['cell_min'] < 3) & (cells['cell_max'] >= 3)
+    return cells
+
+
+def variance_summary(cells):
+    """Aggregate cell statistics per (experiment, model).
+    
+    ``within_share`` is the fraction of total rating variance explained by
+    sampling noise inside cells rather than differences between dialogues.
+    """
+    summary = cells.groupby(['experiment', 'model']).agg(
+        mean_rating=('cell_mean', 'mean'),
+        within_cell_var=('cell_var', 'mean'),
+        within_cell_std=('cell_std', 'mean'),
+        between_dialogue_var=('cell_mean', 'var'),
+        quality_flip_rate=('quality_flip', 'mean'),
+        n_cells=('cell_mean', 'size'),
+        samples_per_cell=('n_samples', 'mean')
+    ).reset_index()
+    total = summary['within_cell_var'] + summary['between_dialogue_var']
+    summary['within_share'] = np.where(total > 0, summary['within_cell_var'] / total, np.nan)
+    return summary
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else 'tutoring_samples_rated.csv'
+    samples_df = pd.read_csv(path)
+    print(f"Loaded {len(samples_df)} samples from {path}")
+    
+    if 'rating' not in samples_df.columns:
+        print("❌ No 'rating' column - rate the samples first")
+        sys.exit(1)
+    
+    cells = cell_statistics(samples_df)
+    summary = variance_summary(cells)
+    
+    print("\n" + "="*80)
+    print("WITHIN-CELL RATING VARIANCE")
+    print("="*80)
+    print(summary.round(3).to_string(index=False))
+    
+    print(f"\n🎲 MOST UNSTABLE COMBINATIONS")
+    for _, row in summary.nlargest(3, 'within_cell_std').iterrows():
+        print(f"{row['experiment']} + {row['model']}: ±{row['within_cell_std']:.2f} per cell, "
+              f"{row['quality_flip_rate']:.0%} of cells cross the ≥3 threshold")
+    
+    cells.to_csv('sample_cell_variance.csv', index=False)
+    summary.to_csv('sample_variance_summary.csv', index=False)
+    print(f"\n✅ Saved sample_cell_variance.csv and sample_variance_summary.csv")
@@ -1,10 +1,29 @@
+import argparse
+
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 
-# Load the data
-df = pd.read_csv('TutoringExperiment_evaluation_20250719.csv')
+from blob_store import read_results
+from experiment_spec import load_spec
+from run_registry import REGISTRY_PATH, blobs_for, resolve_output
+
+parser = argparse.ArgumentParser(description="Compare tutoring ratings when the student was right and wrong.")
+parser.add_argument('--run', metavar='RUN_ID',
+                    help="analyse a registered run's evaluation file ('latest' for the newest rated run)")
+parser.add_argument('--registry', default=REGISTRY_PATH, help="run registry for --run")
+parser.add_argument('--blobs', help="blob file holding the text of an offset-only evaluation CSV (default: the registered run's)")
+parser.add_argument('--spec', metavar='JSON',
+                    help="experiment spec whose strategies and models to report (default: experiment_spec.json if present)")
+args = parser.parse_args()
+spec = load_spec(args.spec)
+spec.install()  # in effect until the script exits
+evaluation_csv = (resolve_output(args.run, 'evaluation', args.registry) if args.run
+                  else 'TutoringExperiment_evaluation_20250719.csv')
+
+# Load the data; only ratings are used, so offloaded text stays as offsets
+df = read_results(evaluation_csv, args.blobs or blobs_for(evaluation_csv, args.registry), columns=())
 
 print("STUDENT ANSWER CORRECTNESS IMPACT ON AI TUTORING PERFORMANCE")
 print("="*70)
@@ -17,8 +36,8 @@ print(f"\nDataset Split:")
 print(f"Student Correct (Answer Accepted): {len(accepted_cases)} cases")
 print(f"Student Incorrect (Answer Not Accepted): {len(not_accepted_cases)} cases")
 
-models = ['claude_haiku', 'gpt4o_mini', 'phi3_mini']
-approaches = ['zero_shot', 'few_shot', 'cot']
+models = sorted(spec.model_keys())
+approaches = spec.strategy_names()
 
 # Analyze performance by student correctness
 results = []
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Stratified subset selection for fast smoke evaluations.
+
+Picks K dialogues stratified over ``math_level`` x ``expected_result``
+(proportional allocation, at least one per stratum when K allows) and,
+optionally, spreads the picks inside each stratum by dialogue length or by a
+hashed bag-of-words embedding of the conversation. ``subset_fidelity``
+reports how closely a subset's per-combination metrics track the full set.
+"""
+
+import argparse
+import re
+import zlib
+
+import numpy as np
+import pandas as pd
+
+STRATA = ['math_level', 'expected_result']
+EMBEDDING_DIM = 256
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def dialogue_text(dialogue):
+    """Conversation text for a JSON dialogue or an evaluation CSV row."""
+    if dialogue.get('full_dialogue'):
+        return "\n".join(exchange['content'] for exchange in dialogue['full_dialogue'])
+    parts = (dialogue.get('conversation_history'), dialogue.get('student_claim'))
+    return "\n".join(part for part in parts if isinstance(part, str))
+
+
+def length_features(dialogues):
+    """Log turn count and log character count, standardised."""
+    features = np.array([
+        [len(dialogue.get('full_dialogue') or dialogue_text(dialogue).splitlines()),
+         len(dialogue_text(dialogue))]
+        for dialogue in dialogues
+    ], dtype=float)
+    features = np.log1p(features)
+    spread = features.std(axis=0)
+    return (features - features.mean(axis=0)) / np.where(spread > 0, spread, 1)
+
+
+def embedding_features(dialogues, dim=EMBEDDING_DIM):
+    """Signed feature-hashing bag of words, L2-normalised."""
+    features = np.zeros((len(dialogues), dim))
+    for row, dialogue in enumerate(dialogues):
+        for token in TOKEN_PATTERN.findall(dialogue_text(dialogue).lower()):
+            h = zlib.crc32(token.encode())
+            features[row, h % dim] += 1 if h & 0x80000000 else -1
+    norms = np.linalg.norm(features, axis=1, keepdims=True)
+    return features / np.where(norms > 0, norms, 1)
+
+
+def allocate(stratum_sizes, k):
+    """Largest-remainder proportional allocation of ``k`` picks to strata."""
+    total = sum(stratum_sizes.values())
+    k = min(k, total)
+    if k >= len(stratum_sizes):
+        # every stratum gets one pick, the rest is shared proportionally
+        base = {key: 1 for key in stratum_sizes}
+        remaining = k - len(stratum_sizes)
+        spare = {key: size - 1 for key, size in stratum_sizes.items()}
+    else:
+        base = {key: 0 for key in stratum_sizes}
+        remaining = k
+        spare = dict(stratum_sizes)
+    spare_total = sum(spare.values())
+    if remaining and spare_total:
+        quotas = {key: remaining * size / spare_total for key, size in spare.items()}
+        for key, quota in quotas.items():
+            base[key] += int(quota)
+        leftover = k - sum(base.values())
+        by_remainder = sorted(quotas, key=lambda key: (quotas[key] - int(quotas[key]), stratum_sizes[key]),
+                              reverse=True)
+        for key in by_remainder:
+            if leftover == 0:
+                break
+            if base[key] < stratum_sizes[key]:
+                base[key] += 1
+                leftover -= 1
+    return base
+
+
+def farthest_point(features, k, rng):
+    """Greedy k-center picks: start at random, then take the farthest point."""
+    picks = [int(rng.integers(len(features)))]
+    distances = np.linalg.norm(features - features[picks[0]], axis=1)
+    while len(picks) < k:
+        nxt = int(distances.argmax())
+        picks.append(nxt)
+        distances = np.minimum(distances, np.linalg.norm(features - features[nxt], axis=1))
+    return picks
+
+
+def select_subset(dialogues, k, seed=0, diversify=None):
+    """Return ``k`` dialogues stratified over math level and expected result.
+    
+    ``diversify`` is None (random within stratum), ``'length'`` or
+    ``'embedding'``.
+    """
+    rng = np.random.default_rng(seed)
+    strata = {}
+    for index, dialogue in enumerate(dialogues):
+        key = tuple(str(dialogue.get(column)) for column in STRATA)
+        strata.setdefault(key, []).append(index)
+    
+    features = None
+    if diversify == 'length':
+        features = length_features(dialogues)
+    elif diversify == 'embedding':
+        features = embedding_features(dialogues)
+    elif diversify is not None:
+        raise ValueError(f"Unknown diversify option: {diversify}")
+    
+    chosen = []
+    for key, count in allocate({key: len(members) for key, members in strata.items()}, k).items():
+        members = strata[key]
+        if count == 0:
+            continue
+        if features is None or count == 1:
+            chosen.extend(rng.choice(members, size=count, replace=False).tolist())
+        else:
+            picks = farthest_point(features[members], count, rng)
+            chosen.extend(members[pick] for pick in picks)
+    return [dialogues[index] for index in sorted(chosen)]
+
+
+def combination_metrics(eval_df):
+    """Mean rating and >=3 quality rate for every ``*_rating`` column."""
+    rating_cols = [col for col in eval_df.columns if col.endswith('_rating')]
+    ratings = eval_df[rating_cols].apply(pd.to_numeric, errors='coerce')
+    return pd.DataFrame({
+        'mean_rating': ratings.mean(),
+        'quality_rate': (ratings >= 3).sum() / ratings.notna().sum()
+    })
+
+
+def subset_fidelity(eval_df, subset_ids):
+    """Compare per-combination metrics on a subset with the full set.
+    
+    Returns (table, summary): the table holds full/subset values and their
+    absolute differences per combination; the summary gives the worst-case
+    gaps, the Spearman correlation of the mean-rating ranking and whether
+    the subset picks the same best combination.
+    """
+    subset_ids = {str(test_id) for test_id in subset_ids}
+    full = combination_metrics(eval_df)
+    part = combination_metrics(eval_df[eval_df['test_id'].astype(str).isin(subset_ids)])
+    table = full.join(part, lsuffix='_full', rsuffix='_subset')
+    for metric in ['mean_rating', 'quality_rate']:
+        table[f'{metric}_abs_diff'] = (table[f'{metric}_subset'] - table[f'{metric}_full']).abs()
+    summary = {
+        'n_full': len(eval_df),
+        'n_subset': len(subset_ids),
+        'max_mean_rating_diff': table['mean_rating_abs_diff'].max(),
+        'mean_mean_rating_diff': table['mean_rating_abs_diff'].mean(),
+        'max_quality_rate_diff': table['quality_rate_abs_diff'].max(),
+        'rank_correlation': table['mean_rating_full'].rank().corr(table['mean_rating_subset'].rank()),
+        'same_best': table['mean_rating_full'].idxmax() == table['mean_rating_subset'].idxmax()
+    }
+    return table, summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check how well stratified subsets track the full evaluation.")
+    parser.add_argument('evaluation_csv', nargs='?', default='TutoringExperiment_evaluation_20250719.csv')
+    parser.add_argument('--k', type=int, default=8, help="subset size")
+    parser.add_argument('--diversify', choices=['length', 'embedding'])
+    parser.add_argument('--trials', type=int, default=20, help="random seeds to average over")
+    args = parser.parse_args()
+    
+    eval_df = pd.read_csv(args.evaluation_csv)
+    eval_df = eval_df[eval_df['test_id'].astype(str) != 'EVALUATION_CRITERIA']
+    records = eval_df.to_dict('records')
+    
+    print(f"Loaded {len(eval_df)} rated dialogues")
+    print(f"\n🎯 SUBSET FIDELITY (k={args.k}, diversify={args.diversify}, {args.trials} seeds)")
+    summaries = []
+    for seed in range(args.trials):
+        subset = select_subset(records, args.k, seed=seed, diversify=args.diversify)
+        summaries.append(subset_fidelity(eval_df, [row['test_id'] for row in subset])[1])
+    summary_df = pd.DataFrame(summaries)
+    
+    print(f"Mean |Δ rating| per combination: {summary_df['mean_mean_rating_diff'].mean():.3f}")
+    print(f"Worst |Δ rating|:                {summary_df['max_mean_rating_diff'].mean():.3f} (avg over seeds)")
+    print(f"Worst |Δ quality rate|:          {summary_df['max_quality_rate_diff'].mean():.3f} (avg over seeds)")
+    print(f"Ranking Spearman ρ:              {summary_df['rank_correlation'].mean():.3f}")
+    print(f"Same best combination:           {summary_df['same_best'].mean():.0%} of seeds")
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Seeded synthetic dialogues, results and ratings at any multiple of the sample.
+
+Text is recombined from the real files: dialogue turns come from the
+``conversation_history`` of the results CSV and responses are rebuilt from
+the sentences each (approach, model) actually produced, so vocabulary,
+formatting and per-combination lengths look like production output. Turn
+counts and response lengths are stretched by log-normal factors to cover
+longer and shorter dialogues than the sample has. Ratings are drawn from
+each combination's observed distribution plus a per-dialogue difficulty
+shift, so combinations stay correlated across shared dialogues.
+
+Output tables have the same layout as the runner's exports (including the
+``EVALUATION_CRITERIA`` row), with token counts estimated at four characters
+per token, costs from ``pricing.recompute_costs`` and latencies drawn around
+``preflight.LATENCY_PROFILES``.
+"""
+
+import argparse
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from experiment_spec import EXPERIMENTS
+from preflight import DEFAULT_LATENCY, LATENCY_PROFILES
+from pricing import DEFAULT_SCENARIO, recompute_costs
+from response_features import ratings_long
+
+SAMPLE_SIZE = 20
+TURN_PATTERN = re.compile(r'\n(?=(?:Student|Tutor): )')
+SENTENCE_PATTERN = re.compile(r'(?<=[.!?])\s+')
+CHARS_PER_TOKEN = 4
+CRITERIA_ROW = {
+    'test_id': 'EVALUATION_CRITERIA',
+    'math_level': 'Rate each response 1-5:',
+    'expected_result': '1) Mistake Diagnosis, 2) Teaching Strategy',
+    'conversation_history': '3) Feedback Quality, 4) Clarity',
+    'student_claim': '5) Support & Encouragement'
+}
+
+
+def _split_turns(history, claim):
+    turns = []
+    for line in TURN_PATTERN.split(history):
+        role, _, content = line.partition(': ')
+        if content:
+            turns.append(('user' if role == 'Student' else 'assistant', content))
+    if claim:
+        turns.append(('user', claim))
+    return turns
+
+
+class SyntheticCorpus:
+    """Text pools and distributions learned from a results/evaluation pair."""
+
+    def __init__(self, results, evaluation=None):
+        rows = results[results['test_id'].astype(str) != 'EVALUATION_CRITERIA']
+        self.subjects = rows['math_level'].value_counts(normalize=True)
+        self.expected = rows['expected_result'].value_counts(normalize=True)
+
+        student, tutor, turn_counts = [], [], []
+        for history, claim in zip(rows['conversation_history'].fillna(''), rows['student_claim'].fillna('')):
+            turns = _split_turns(history, claim)
+            turn_counts.append(len(turns))
+            for role, content in turns:
+                (student if role == 'user' else tutor).append(content)
+        self.student_turns = np.array(student, dtype=object)
+        self.tutor_turns = np.array(tutor, dtype=object)
+        self.turn_counts = np.array(turn_counts)
+
+        # per (experiment, model, field): sentence pool and sentences per response
+        self.sentences = {}
+        self.lengths = {}
+        for column in rows.columns:
+            for field in ('response', 'scratchpad', 'final'):
+                if not column.endswith(f'_{field}'):
+                    continue
+                texts = rows[column].dropna().astype(str)
+                texts = texts[~texts.str.startswith('ERROR:') & texts.str.strip().ne('')]
+                if texts.empty:
+                    continue
+                split = [SENTENCE_PATTERN.split(text.strip()) for text in texts]
+                self.sentences[column] = np.array([s for parts in split for s in parts], dtype=object)
+                self.lengths[column] = np.array([len(parts) for parts in split])
+
+        self.ratings = {}
+        if evaluation is not None:
+            for (experiment, model), group in ratings_long(evaluation).dropna(subset=['rating']).groupby(
+                    ['experiment', 'model']):
+                values, counts = np.unique(group['rating'], return_counts=True)
+                self.ratings[(experiment, model)] = (values, counts / counts.sum())
+
+    @classmethod
+    def from_csv(cls, results_csv, evaluation_csv=None):
+        evaluation = pd.read_csv(evaluation_csv) if evaluation_csv else None
+        return cls(pd.read_csv(results_csv), evaluation)
+
+    def cells(self):
+        """(experiment, model) pairs that have response text."""
+        return [(experiment, column[len(experiment) + 1:-len('_response')])
+                for experiment in EXPERIMENTS for column in self.sentences
+                if column.startswith(f'{experiment}_') and column.endswith('_response')]
+
+    def _texts(self, column, n, rng, length_sigma):
+        pool, lengths = self.sentences[column], self.lengths[column]
+        counts = np.maximum(1, np.round(rng.choice(lengths, n) * rng.lognormal(0, length_sigma, n))).astype(int)
+        picks = pool[rng.integers(len(pool), size=counts.sum())]
+        bounds = np.concatenate(([0], np.cumsum(counts)))
+        return [' '.join(picks[bounds[i]:bounds[i + 1]]) for i in range(n)]
+
+    def dialogues(self, n, seed=0, start_id=0, turn_sigma=0.5):
+        """``n`` dialogues in the sample JSON format."""
+        rng = np.random.default_rng([seed, start_id, 0])
+        subjects = rng.choice(self.subjects.index, n, p=self.subjects.to_numpy())
+        expected = rng.choice(self.expected.index, n, p=self.expected.to_numpy())
+        # odd counts so the student speaks first and last
+        turns = np.round(rng.choice(self.turn_counts, n) * rng.lognormal(0, turn_sigma, n)).astype(int)
+        turns = np.maximum(turns, 3) | 1
+        student = self.student_turns[rng.integers(len(self.student_turns), size=turns.sum())]
+        tutor = self.tutor_turns[rng.integers(len(self.tutor_turns), size=turns.sum())]
+
+        dialogues = []
+        position = 0
+        for i in range(n):
+            full_dialogue = [{'role': 'user', 'content': student[position + t]} if t % 2 == 0
+                             else {'role': 'assistant', 'content': tutor[position + t]}
+                             for t in range(turns[i])]
+            position += turns[i]
+            dialogues.append({'test_id': start_id + i, 'math_level': subjects[i],
+                              'expected_result': expected[i], 'full_dialogue': full_dialogue})
+        return dialogues
+
+    def results(self, dialogues, seed=0, length_sigma=0.4, ratings=False):
+        """Wide results table for ``dialogues``; with ``ratings``, an evaluation table."""
+        from run_experiment import PROMPT_TEMPLATES
+
+        n = len(dialogues)
+        rng = np.random.default_rng([seed, dialogues[0]['test_id'] if dialogues else 0, 1])
+        history = [
+            '\n'.join(f"{'Student' if turn['role'] == 'user' else 'Tutor'}: {turn['content']}"
+                      for turn in dialogue['full_dialogue'][:-1])
+            for dialogue in dialogues
+        ]
+        table = {
+            'test_id': [dialogue['test_id'] for dialogue in dialogues],
+            'math_level': [dialogue['math_level'] for dialogue in dialogues],
+            'expected_result': [dialogue['expected_result'] for dialogue in dialogues],
+            'conversation_history': history,
+            'student_claim': [dialogue['full_dialogue'][-1]['content'] for dialogue in dialogues],
+            'experiment': 'cot'
+        }
+        prompt_chars = np.array([len(text) for text in history]) + np.array([len(c) for c in table['student_claim']])
+        difficulty = rng.normal(0, 0.5, n)
+
+        for experiment, model in self.cells():
+            prefix = f'{experiment}_{model}'
+            if experiment == 'cot' and f'{prefix}_scratchpad' in self.sentences:
+                scratchpad = self._texts(f'{prefix}_scratchpad', n, rng, length_sigma)
+                final = self._texts(f'{prefix}_final', n, rng, length_sigma)
+                response = [f'{s}\n</scratchpad>\n\n{f}' for s, f in zip(scratchpad, final)]
+                table[f'{prefix}_scratchpad'] = scratchpad
+                table[f'{prefix}_final'] = final
+            else:
+                response = self._texts(f'{prefix}_response', n, rng, length_sigma)
+            table[f'{prefix}_response'] = response
+            head, tail = PROMPT_TEMPLATES[experiment]
+            table[f'{prefix}_input_tokens'] = (prompt_chars + len(head) + len(tail)) // CHARS_PER_TOKEN
+            table[f'{prefix}_output_tokens'] = np.array([len(text) for text in response]) // CHARS_PER_TOKEN
+            table[f'{prefix}_cost'] = np.nan
+            profile = LATENCY_PROFILES.get(model, DEFAULT_LATENCY)
+            seconds = profile['first_token_s'] + table[f'{prefix}_output_tokens'] / profile['tokens_per_s']
+            table[f'{prefix}_latency'] = np.round(seconds * rng.lognormal(0, 0.3, n), 3)
+            if ratings and (experiment, model) in self.ratings:
+                values, probabilities = self.ratings[(experiment, model)]
+                drawn = rng.choice(values, n, p=probabilities) - np.round(difficulty * 2) / 2
+                table[f'{prefix}_rating'] = np.clip(drawn, 1, 5)
+
+        df = recompute_costs(pd.DataFrame(table), DEFAULT_SCENARIO)
+        criteria = pd.DataFrame([CRITERIA_ROW], columns=df.columns)
+        df = pd.concat([criteria, df], ignore_index=True)[sorted(df.columns)]
+        tokens = [column for column in df.columns if column.endswith('_tokens')]
+        df[tokens] = df[tokens].astype('Int64')
+        return df
+
+
+def generate(corpus, scale, output_dir, seed=0, chunk=5000):
+    """Write dialogues JSON, results CSV and evaluation CSV at ``scale`` x the sample.
+
+    Tables are produced ``chunk`` dialogues at a time so memory stays flat.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    n = SAMPLE_SIZE * scale
+    paths = {
+        'dialogues': os.path.join(output_dir, f'dialogues_{scale}x.json'),
+        'results': os.path.join(output_dir, f'results_{scale}x.csv'),
+        'evaluation': os.path.join(output_dir, f'evaluation_{scale}x.csv')
+    }
+    with open(paths['dialogues'], 'w') as f:
+        f.write('[')
+        for start in range(0, n, chunk):
+            dialogues = corpus.dialogues(min(chunk, n - start), seed, start)
+            evaluation = corpus.results(dialogues, seed, ratings=True)
+            results = evaluation.drop(columns=[c for c in evaluation.columns if c.endswith('_rating')])
+            if start:
+                f.write(',')
+                evaluation, results = evaluation.iloc[1:], results.iloc[1:]
+            f.write(json.dumps(dialogues)[1:-1])
+            header = start == 0
+            results.to_csv(paths['results'], mode='w' if header else 'a', header=header, index=False)
+            evaluation.to_csv(paths['evaluation'], mode='w' if header else 'a', header=header, index=False)
+        f.write(']')
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic dialogues, results and ratings.")
+    parser.add_argument('--scale', type=int, action='append',
+                        help="multiple of the 20-dialogue sample (repeatable; default 10 and 100)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output-dir', default='synthetic')
+    parser.add_argument('--results', default='tutoring_results_20250719_140215.csv',
+                        help="results CSV to learn text from")
+    parser.add_argument('--evaluation', default='TutoringExperiment_evaluation_20250719.csv',
+                        help="evaluation CSV to learn rating distributions from")
+    args = parser.parse_args()
+
+    corpus = SyntheticCorpus.from_csv(args.results, args.evaluation)
+    for scale in args.scale or [10, 100]:
+        paths = generate(corpus, scale, args.output_dir, args.seed)
+        sizes = ', '.join(f"{os.path.basename(path)} {os.path.getsize(path) / 2**20:.1f} MB"
+                          for path in paths.values())
+        print(f"✅ {scale}x ({SAMPLE_SIZE * scale:,} dialogues): {sizes}")
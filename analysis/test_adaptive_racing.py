@@ -0,0 +1,32 @@
+"""Chernoff bounds behind adaptive elimination."""
+
+from adaptive_racing import kl_bounds
+
+
+def width(bounds):
+    return bounds[1] - bounds[0]
+
+
+def test_kl_bounds_contain_the_observed_rate():
+    for successes, trials in [(0, 10), (3, 10), (10, 10), (47, 50)]:
+        lower, upper = kl_bounds(successes, trials, n_arms=9, delta=0.05)
+        assert 0.0 <= lower <= successes / trials <= upper <= 1.0
+    assert kl_bounds(0, 0, n_arms=9, delta=0.05) == (0.0, 1.0)
+
+
+def test_kl_bounds_narrow_with_more_trials():
+    widths = [width(kl_bounds(int(0.8 * trials), trials, 9, 0.05)) for trials in (10, 20, 40, 80, 160)]
+    assert widths == sorted(widths, reverse=True)
+
+
+def test_kl_bounds_widen_with_confidence_arms_and_looks():
+    base = width(kl_bounds(16, 20, 9, 0.05))
+    assert width(kl_bounds(16, 20, 9, 0.01)) > base
+    assert width(kl_bounds(16, 20, 27, 0.05)) > base
+    assert width(kl_bounds(16, 20, 9, 0.05, check=5)) > base
+
+
+def test_kl_bounds_move_up_with_successes():
+    bounds = [kl_bounds(successes, 20, 9, 0.05) for successes in range(21)]
+    lowers, uppers = zip(*bounds)
+    assert list(lowers) == sorted(lowers) and list(uppers) == sorted(uppers)
@@ -0,0 +1,58 @@
+"""Blob store round trips and offloaded-text guards."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from blob_store import BlobStore, attach_text, offload_text, read_results
+from pricing import estimate_token_columns
+
+RESULTS = pd.DataFrame({
+    'test_id': ['1', '2', '3'],
+    'cot_gpt4o_mini_response': ["<scratchpad>7 × 8</scratchpad> Try 56 — ✓", np.nan, "ERROR: timeout"],
+    'cot_gpt4o_mini_final': ["Try 56 — ✓", np.nan, ''],
+    'cot_gpt4o_mini_cost': [0.0002, np.nan, 0.0]
+})
+
+
+def test_offload_and_attach_round_trip(tmp_path):
+    blob_path = str(tmp_path / 'responses.blob')
+    packed = offload_text(RESULTS, blob_path)
+    assert 'cot_gpt4o_mini_response' not in packed.columns
+    assert {'cot_gpt4o_mini_response_offset', 'cot_gpt4o_mini_response_length'} <= set(packed.columns)
+
+    csv_path = tmp_path / 'packed.csv'
+    packed.to_csv(csv_path, index=False)
+    restored = read_results(csv_path, blob_path)
+    pd.testing.assert_frame_equal(restored[RESULTS.columns], RESULTS.astype({'test_id': int}), check_dtype=False)
+
+    with BlobStore(blob_path) as store:
+        assert store.get('3', 'cot', 'gpt4o_mini') == "ERROR: timeout"
+        assert store.get('1', 'cot', 'gpt4o_mini', 'final') == "Try 56 — ✓"
+
+
+def test_attach_only_named_columns(tmp_path):
+    packed = offload_text(RESULTS, str(tmp_path / 'responses.blob'))
+    finals = attach_text(packed, str(tmp_path / 'responses.blob'), ['cot_gpt4o_mini_final'])
+    assert 'cot_gpt4o_mini_final' in finals.columns and 'cot_gpt4o_mini_response_offset' in finals.columns
+
+
+def test_read_only_named_text_columns(tmp_path):
+    packed = offload_text(RESULTS, str(tmp_path / 'responses.blob'))
+    packed.to_csv(tmp_path / 'packed.csv', index=False)
+    RESULTS.to_csv(tmp_path / 'plain.csv', index=False)
+    for name in ('packed.csv', 'plain.csv'):
+        # numbers only: no text, no offsets and no blob needed
+        assert list(read_results(tmp_path / name, columns=())) == ['test_id', 'cot_gpt4o_mini_cost']
+    finals = read_results(tmp_path / 'packed.csv', str(tmp_path / 'responses.blob'), ['cot_gpt4o_mini_final'])
+    assert list(finals) == ['test_id', 'cot_gpt4o_mini_final', 'cot_gpt4o_mini_cost']
+
+
+def test_offloaded_text_without_a_blob_fails_loudly(tmp_path):
+    packed = offload_text(RESULTS, str(tmp_path / 'responses.blob'))
+    with pytest.raises(ValueError, match='blob offsets'):
+        attach_text(packed, None)
+    # token estimates need the response text, so they cannot silently skip the cell
+    with pytest.raises(ValueError, match='blob offsets'):
+        estimate_token_columns(packed)
+    assert 'cot_gpt4o_mini_input_tokens' in estimate_token_columns(packed, str(tmp_path / 'responses.blob')).columns
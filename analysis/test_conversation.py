@@ -0,0 +1,59 @@
+"""Conversation rendering and the simulated student's view of it."""
+
+from run_experiment import Conversation, ModelStudent, STUDENT_PROMPT_HEAD, STUDENT_PROMPT_TAIL
+
+TURNS = [
+    {'role': 'assistant', 'content': "What is 2 + 3 × 4?"},
+    {'role': 'user', 'content': "20"},
+    {'role': 'assistant', 'content': "Which operation comes first?"},
+    {'role': 'user', 'content': "Addition, so it is 20."}
+]
+
+
+class RecordingRunner:
+    def __init__(self):
+        self.prompts = []
+
+    def make_api_request(self, model_key, prompt, **kwargs):
+        self.prompts.append(prompt)
+        return {'success': True, 'content': " Oh, multiplication first? ", 'cost': 0.0}
+
+
+def test_formatted_is_history_plus_student_claim():
+    conversation = Conversation(TURNS)
+    assert conversation.history == "Tutor: What is 2 + 3 × 4?\nStudent: 20\nTutor: Which operation comes first?"
+    assert conversation.student_claim == "Addition, so it is 20."
+    assert conversation.formatted() == conversation.history + "\nStudent: Addition, so it is 20."
+
+
+def test_segments_concatenate_to_formatted_and_keep_their_prefix():
+    conversation = Conversation(TURNS)
+    segments = conversation.segments()
+    assert "".join(segments) == conversation.formatted()
+    assert len(segments) == len(TURNS)
+
+    longer = conversation.fork()
+    longer.append('assistant', "Try multiplying first.")
+    longer.append('user', "14!")
+    assert longer.segments()[:len(segments) - 1] == segments[:-1]
+    assert "".join(longer.segments()) == longer.formatted()
+    # the fork does not touch the original
+    assert len(conversation) == len(TURNS)
+
+
+def test_tutor_last_turn_is_dropped_from_formatted_but_kept_in_transcript():
+    conversation = Conversation(TURNS)
+    conversation.append('assistant', "Try multiplying first.")
+    assert conversation.student_claim == ""
+    assert "Try multiplying first." not in conversation.formatted()
+    assert conversation.transcript().endswith("Tutor: Try multiplying first.")
+
+
+def test_model_student_sees_the_tutor_reply_it_answers():
+    conversation = Conversation(TURNS)
+    conversation.append('assistant', "Try multiplying first.")
+    runner = RecordingRunner()
+    reply, _ = ModelStudent('gpt4o_mini').respond(runner, {}, conversation, 0)
+    assert reply == "Oh, multiplication first?"
+    assert runner.prompts == [STUDENT_PROMPT_HEAD + conversation.transcript() + STUDENT_PROMPT_TAIL]
+    assert "Tutor: Try multiplying first." in runner.prompts[0]
@@ -0,0 +1,120 @@
+"""Experiment spec installation and task planning."""
+
+from experiment_spec import EXPERIMENTS, ExperimentSpec, ScratchpadStream, parse_scratchpad
+from pricing import PRICING
+from run_experiment import MODELS, PROMPT_TEMPLATES
+
+EXTRA = {
+    'models': {'llama_8b': {'name': "Llama 3.1 8B", 'model_id': 'meta-llama/llama-3.1-8b-instruct',
+                            'cost_per_1k_input': 0.00002, 'cost_per_1k_output': 0.00005}},
+    'strategies': {'socratic': {'extends': 'few_shot', 'head': "Ask, don't tell.\n"}}
+}
+
+
+def test_install_restores_every_table():
+    before = (dict(MODELS), dict(PROMPT_TEMPLATES), list(EXPERIMENTS),
+              {name: dict(scenario['models']) for name, scenario in PRICING.items()})
+    spec = ExperimentSpec.from_dict(EXTRA)
+
+    with spec.install():
+        assert 'llama_8b' in MODELS and 'socratic' in PROMPT_TEMPLATES and 'socratic' in EXPERIMENTS
+        assert all('llama_8b' in scenario['models'] for scenario in PRICING.values())
+
+    assert (dict(MODELS), dict(PROMPT_TEMPLATES), list(EXPERIMENTS),
+            {name: dict(scenario['models']) for name, scenario in PRICING.items()}) == before
+
+
+DIALOGUES = [{'test_id': 1, 'full_dialogue': []}, {'test_id': 2, 'full_dialogue': []}]
+
+
+def plan_for(data):
+    spec = ExperimentSpec.from_dict(data)
+    tasks = spec.plan(DIALOGUES, lambda dialogue: "Tutor: What is 7 × 8?\nStudent: 54")
+    return spec, tasks
+
+
+def test_plan_shares_identical_deterministic_requests():
+    spec, tasks = plan_for({'strategies': {'raw_cot': {'extends': 'cot', 'parser': 'plain'}}})
+    cells = [cell for task in tasks for cell in task.cells]
+    assert len(cells) == len(DIALOGUES) * len(spec.cells())
+    # the same conversation for both dialogues, and raw_cot only changes the parser
+    shared = [task for task in tasks if task.strategy in ('cot', 'raw_cot')]
+    assert len(shared) == len(spec.model_keys())
+    assert all(len(task.cells) == 2 * len(DIALOGUES) for task in shared)
+    assert all(task.prompt == spec.prompt(task.strategy, task.conversation, task.model) for task in tasks)
+
+
+def test_plan_gives_sampled_cells_their_own_request():
+    spec, tasks = plan_for({'strategies': {'warm': {'extends': 'zero_shot', 'temperature': 0.7},
+                                           'tepid': {'extends': 'zero_shot', 'temperature': 0.7}}})
+    warm = [task for task in tasks if task.strategy in ('warm', 'tepid')]
+    assert len(warm) == 2 * len(DIALOGUES) * len(spec.model_keys())
+    assert all(len(task.cells) == 1 for task in warm)
+
+
+def test_plan_shares_sampled_requests_with_a_fixed_seed():
+    spec, tasks = plan_for({'generation': {'temperature': 0.7, 'seed': 7}})
+    assert len(tasks) == len(spec.cells())
+
+
+def test_plan_skips_done_cells():
+    spec = ExperimentSpec.from_dict({})
+    done = [(test_id, strategy, model) for test_id in (1, 2) for strategy, model in spec.cells()[1:]]
+    remaining = spec.plan(DIALOGUES, lambda dialogue: "", done)
+    assert [task.cells[0][1:] for task in remaining] == [spec.cells()[0]]
+    assert len(remaining[0].cells) == 2
+
+
+RAMBLING = "<scratchpad>7 × 8 is 56, not 54.</scratchpad>\nAlmost! What is 7 × 8?\nStudent: 56\nTutor: Yes!"
+
+
+def feed_in_chunks(text, size, opened=False):
+    stream = ScratchpadStream(opened=opened)
+    stopped = False
+    for start in range(0, len(text), size):
+        stopped = stream.feed(text[start:start + size])
+        if stopped:
+            break
+    return stopped, stream.result()
+
+
+def test_scratchpad_stream_stops_at_markers_split_across_chunks():
+    for size in range(1, len(RAMBLING) + 1):
+        assert feed_in_chunks(RAMBLING, size) == (True, ("7 × 8 is 56, not 54.", "Almost! What is 7 × 8?", None))
+
+
+def test_scratchpad_stream_with_prefilled_opening_tag():
+    text = "Check the product.\n</scratchpad>\nTutor: Good try!\n### Next"
+    for size in (1, 2, 5, len(text)):
+        assert feed_in_chunks(text, size, opened=True) == (True, ("Check the product.", "Tutor: Good try!", None))
+    assert feed_in_chunks("no closing tag", 3, opened=True)[1] == ("no closing tag", '', 'unclosed_scratchpad')
+
+
+def test_complete_responses_keep_text_after_stop_markers():
+    scratchpad, final, error = parse_scratchpad(RAMBLING)
+    assert final == "Almost! What is 7 × 8?\nStudent: 56\nTutor: Yes!" and error is None
+
+    spec = ExperimentSpec.from_dict({'strategies': {'streamed': {'extends': 'cot', 'stream': True}}})
+    assert spec.parse('cot', RAMBLING, 'gpt4o_mini')[1] == final
+    assert spec.parse('streamed', RAMBLING, 'gpt4o_mini')[1] == "Almost! What is 7 × 8?"
+
+
+def test_preflight_counts_the_calls_plan_makes():
+    from collections import Counter
+    from preflight import estimate_run
+
+    spec = ExperimentSpec.from_dict({'strategies': {'raw_cot': {'extends': 'cot', 'parser': 'plain'},
+                                                    'warm': {'extends': 'zero_shot', 'temperature': 0.7}}})
+    dialogues = [{'test_id': i, 'full_dialogue': []} for i in range(6)]
+    text = lambda dialogue: f"Tutor: What is 7 × 8?\nStudent: {dialogue['test_id'] % 2}"
+    calls = Counter((task.strategy, task.model) for task in spec.plan(dialogues, text))
+    plan, _ = estimate_run(dialogues, spec, text)
+    assert dict(zip(zip(plan['experiment'], plan['model']), plan['prompts'])) == calls
+    assert plan['cells'].sum() == len(dialogues) * len(spec.cells())
+
+
+def test_runner_parses_cot_after_the_prefilled_opening_tag():
+    from run_experiment import ExperimentRunner
+
+    content = "Student said 54.\n</scratchpad>\nTutor: Check 7 × 8 again."
+    assert ExperimentRunner().parse_cot_response(content) == ("Student said 54.", "Tutor: Check 7 × 8 again.")
@@ -0,0 +1,29 @@
+"""Near-duplicate clustering of tutor responses."""
+
+import pandas as pd
+
+from near_duplicates import find_near_duplicates
+
+BASE = "Good effort! Let's look at the order of operations together. Which operation should come first here?"
+
+
+def cells(texts):
+    return pd.DataFrame({'test_id': [str(i) for i in range(len(texts))], 'experiment': 'few_shot',
+                         'model': 'gpt4o_mini', 'text': texts})
+
+
+def test_near_copies_share_a_cluster_and_different_texts_do_not():
+    texts = [BASE, BASE.replace("here?", "here today?"),
+             "Nice work. Can you explain how you found the area of the rectangle step by step?"]
+    result = find_near_duplicates(cells(texts), threshold=0.7)
+    assert result['cluster'][0] == result['cluster'][1]
+    assert result['cluster'][2] != result['cluster'][0]
+    assert result['sketched'].all()
+
+
+def test_empty_short_and_error_responses_are_not_clustered():
+    texts = ["", "   ", "", "ERROR: 429 Too Many Requests", "ERROR: 429 Too Many Requests", "Okay!", "Okay!", BASE]
+    result = find_near_duplicates(cells(texts))
+    assert result['sketched'].tolist() == [False] * 7 + [True]
+    assert (result['cluster_size'] == 1).all()
+    assert result['cluster'].is_unique
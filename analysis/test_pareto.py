@@ -0,0 +1,47 @@
+"""Dominance and constrained-best queries on a hand-built grid."""
+
+import numpy as np
+import pandas as pd
+
+from pareto import _dominated, best_under
+
+# (approach, model): mean rating, cost per 1k sessions, p95 latency
+GRID = {
+    ('few_shot', 'gpt4o_mini'): (4.2, 0.20, 3.0),
+    ('cot', 'claude_haiku'): (4.5, 2.00, 6.0),
+    ('zero_shot', 'phi3_mini'): (3.1, 0.05, 2.0),
+    ('zero_shot', 'gpt4o_mini'): (3.9, 0.25, 3.5),   # worse than few_shot/gpt4o_mini everywhere
+    ('cot', 'gpt4o_mini'): (4.2, 0.30, 3.0)          # ties on rating and latency, costs more
+}
+
+
+def test_dominated_on_a_hand_built_grid():
+    quality, cost, latency = (np.array(values) for values in zip(*GRID.values()))
+    assert _dominated(quality, cost, latency).tolist() == [False, False, False, True, True]
+
+
+def test_identical_points_do_not_dominate_each_other():
+    same = np.array([1.0, 1.0])
+    assert not _dominated(same, same, same).any()
+
+
+def test_dominated_broadcasts_over_groups():
+    quality = np.array([[4.0, 3.0], [3.0, 4.0]])
+    cost = np.array([[1.0, 1.0], [1.0, 1.0]])
+    latency = np.array([[1.0, 1.0], [1.0, 1.0]])
+    assert _dominated(quality, cost, latency).tolist() == [[False, True], [True, False]]
+
+
+def test_best_under_budgets_and_latency_limits():
+    metrics = pd.DataFrame([{'scenario': 'list', 'subject': 'All subjects', 'approach': approach, 'model': model,
+                             'mean_rating': rating, 'cost_per_1k_sessions': cost, 'p95_latency': p95}
+                            for (approach, model), (rating, cost, p95) in GRID.items()])
+    best = best_under(metrics, budgets=[0.01, 0.25, 5.0], latency_limits=[4.0, 10.0])
+    picks = {(row.max_cost_per_1k_sessions, row.max_p95_latency): (row.approach, row.model)
+             for row in best.itertuples()}
+    assert picks[(0.01, 4.0)] == ('', '') and picks[(0.01, 10.0)] == ('', '')
+    # the rating tie with cot/gpt4o_mini goes to the cheaper combination
+    assert picks[(0.25, 4.0)] == ('few_shot', 'gpt4o_mini')
+    assert picks[(5.0, 4.0)] == ('few_shot', 'gpt4o_mini')
+    assert picks[(5.0, 10.0)] == ('cot', 'claude_haiku')
+    assert np.isnan(best.loc[best['approach'] == '', 'mean_rating']).all()
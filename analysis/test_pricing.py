@@ -0,0 +1,32 @@
+"""Repricing keeps what was billed."""
+
+import numpy as np
+import pandas as pd
+
+from pricing import DEFAULT_SCENARIO, PRICING, recompute_costs, scenario_costs
+
+BATCH = 'batch-discount-2025-07-19'
+
+
+def results(cost, input_tokens, output_tokens):
+    return pd.DataFrame({'test_id': ['1', '2'], 'few_shot_claude_haiku_cost': cost,
+                         'few_shot_claude_haiku_input_tokens': input_tokens,
+                         'few_shot_claude_haiku_output_tokens': output_tokens})
+
+
+def test_billing_scenario_keeps_stored_costs():
+    # the second call was shared by two cells, so each recorded half its cost
+    df = results([0.0016, 0.0008], [1000, 1000], [200, 200])
+    assert np.allclose(recompute_costs(df, DEFAULT_SCENARIO)['few_shot_claude_haiku_cost'], [0.0016, 0.0008])
+
+
+def test_other_scenarios_scale_to_the_bill():
+    # token counts 10% too high, as from a chars/4 estimate
+    df = results([0.0016, np.nan], [1100, 1000], [220, 200])
+    batch = recompute_costs(df, BATCH)['few_shot_claude_haiku_cost']
+    prices = PRICING[BATCH]['models']['claude_haiku']
+    assert np.isclose(batch[0], 0.0016 / 2)
+    assert np.isclose(batch[1], (1000 * prices['input'] + 200 * prices['output']) / 1000)
+
+    means = scenario_costs(df, [DEFAULT_SCENARIO, BATCH]).set_index('scenario')['mean_cost']
+    assert np.isclose(means[BATCH], (batch[0] + batch[1]) / 2)
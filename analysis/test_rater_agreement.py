@@ -0,0 +1,27 @@
+"""Agreement statistics against published reference values."""
+
+import numpy as np
+
+from rater_agreement import krippendorff_alpha
+
+NA = np.nan
+# Krippendorff (2011), "Computing Krippendorff's Alpha-Reliability": 4 observers, 12 units
+REFERENCE = np.array([
+    [1, 2, 3, 3, 2, 1, 4, 1, 2, NA, NA, NA],
+    [1, 2, 3, 3, 2, 2, 4, 1, 2, 5, NA, 3],
+    [NA, 3, 3, 3, 2, 3, 4, 2, 2, 5, 1, NA],
+    [1, 2, 3, 3, 2, 4, 4, 1, 2, 5, 1, NA]
+])
+
+
+def test_krippendorff_alpha_matches_the_published_example():
+    assert round(krippendorff_alpha(REFERENCE, 'nominal'), 3) == 0.743
+    assert round(krippendorff_alpha(REFERENCE, 'ordinal'), 3) == 0.815
+    assert round(krippendorff_alpha(REFERENCE, 'interval'), 3) == 0.849
+
+
+def test_krippendorff_alpha_edge_cases():
+    assert krippendorff_alpha(np.array([[1, 2, 3, 4], [1, 2, 3, 4]])) == 1.0
+    # no cell has two ratings, or every rating is the same
+    assert np.isnan(krippendorff_alpha(np.array([[1, NA], [NA, 2]])))
+    assert np.isnan(krippendorff_alpha(np.array([[3, 3], [3, 3]])))
@@ -0,0 +1,55 @@
+"""ResultTable layout and its CSV round trip."""
+
+import csv
+
+from result_records import ResultTable
+
+EXPERIMENTS = ['zero_shot', 'cot']
+MODELS = ['phi3_mini', 'gpt4o_mini']
+
+
+def sample_table():
+    table = ResultTable(EXPERIMENTS, MODELS, capacity=1)
+    for test_id in ('7', '12', '3'):
+        record = table.row(test_id)
+        record.set_meta(test_id=test_id, math_level='Algebra', expected_result='Answer Accepted',
+                        conversation_history="Tutor: What is 7 × 8?", student_claim="54, \"I think\"")
+        record.set('zero_shot', 'gpt4o_mini', response="Close!\nCheck 7 × 8 again.", cost=0.00012,
+                   input_tokens=310, output_tokens=12, latency=0.84)
+    table.row('12').set('cot', 'phi3_mini', response="<scratchpad>x", scratchpad="x", final='',
+                        parse_error='unclosed_scratchpad', cost=0.0, output_tokens=0)
+    table.row('3').set('zero_shot', 'gpt4o_mini', response="ERROR: timeout", cost=0.0)
+    return table
+
+
+def write_csv(table, path):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=table.fieldnames())
+        writer.writeheader()
+        writer.writerows(table.records())
+
+
+def test_fieldnames_list_only_cells_that_were_set():
+    names = sample_table().fieldnames()
+    assert 'cot_phi3_mini_parse_error' in names and 'zero_shot_gpt4o_mini_latency' in names
+    assert not any(name.startswith(('cot_gpt4o_mini', 'zero_shot_phi3_mini')) for name in names)
+    assert 'experiment' not in names
+    assert names == sorted(names)
+
+
+def test_csv_round_trip(tmp_path):
+    table = sample_table()
+    path = tmp_path / 'tutoring_results.csv'
+    write_csv(table, path)
+    restored = ResultTable.from_csv(path, EXPERIMENTS, MODELS)
+
+    assert list(restored.rows) == ['7', '12', '3']
+    assert restored.fieldnames() == table.fieldnames()
+    # a CSV cannot tell unset from empty: both come back as None
+    expected = {dialogue_id: {name: record.get(name) if record.get(name) != '' else None
+                              for name in table.fieldnames()}
+                for dialogue_id, record in table.to_dicts().items()}
+    read_back = restored.to_dicts()
+    assert read_back == expected
+    assert isinstance(read_back['7']['zero_shot_gpt4o_mini_input_tokens'], int)
+    assert read_back['3']['cot_phi3_mini_cost'] is None
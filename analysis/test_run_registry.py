@@ -0,0 +1,9 @@
+"""Run ids from output file names."""
+
+from run_registry import run_id_for
+
+
+def test_run_id_from_full_and_date_only_stamps():
+    assert run_id_for('out/tutoring_results_20250719_140215.csv') == '20250719_140215'
+    assert run_id_for('TutoringExperiment_evaluation_20250719.csv') == '20250719'
+    assert run_id_for('tutoring_results_20250719_140215_packed.csv') == '20250719_140215'